@@ -0,0 +1,147 @@
+# accounts/authentication.py
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import CSRFCheck
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core.cache import get_version
+
+# Сколько пользователей держать в памяти процесса и сколько секунд.
+# TTL — верхняя граница устаревания (деактивация, смена прав), если кэш
+# версий не общий между процессами
+AUTH_USER_CACHE_SIZE = getattr(settings, 'AUTH_USER_CACHE_SIZE', 10000)
+AUTH_USER_CACHE_TTL = getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+
+
+class LRUCache:
+    """Потокобезопасный LRU-словарь с ограничением размера и временем жизни."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_users = LRUCache(AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_TTL)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication без запроса пользователя на каждый запрос: объект
+    берётся из LRU-кэша процесса по (id, версия записи). Версию поднимают
+    CustomUser.save и CustomUserQuerySet.update при смене
+    is_active/is_staff/is_superuser/пароля — такой пользователь загружается
+    из БД заново.
+
+    Насколько быстро это видят другие процессы, зависит от CACHES:
+    с общим бэкендом (Redis, Memcached) — со следующего запроса; с LocMem
+    (по умолчанию) новую версию видит только изменивший процесс, остальные
+    отдают старый объект до истечения AUTH_USER_CACHE_TTL секунд
+    (см. проверку core.W001 в check --deploy). Правки в обход ORM (SQL,
+    другие сервисы) тоже видны только по TTL.
+
+    Токен — из заголовка Authorization, а без него — из куки access_token
+    (её ставят вход/подтверждение регистрации и JWTRefreshMiddleware).
+    """
+
+    def authenticate(self, request):
+        if self.get_header(request) is not None:
+            return super().authenticate(request)
+
+        raw_token = request.COOKIES.get(settings.JWT_COOKIE_NAME)
+        if not raw_token:
+            return None
+        try:
+            validated_token = self.get_validated_token(raw_token)
+            user = self.get_user(validated_token)
+        except exceptions.AuthenticationFailed:
+            # протухшая кука или деактивированный пользователь не должны
+            # ломать публичные эндпоинты (вход и т.п.)
+            return None
+        # куку браузер подставляет сам, поэтому CSRF-проверка нужна всегда:
+        # SameSite=Lax/Strict не защищает от соседних поддоменов и старых браузеров
+        self.enforce_csrf(request)
+        return user, validated_token
+
+    def enforce_csrf(self, request):
+        """Как у SessionAuthentication: CSRF для небезопасных методов."""
+        def dummy_get_response(request):
+            return None
+
+        check = CSRFCheck(dummy_get_response)
+        check.process_request(request)
+        reason = check.process_view(request, None, (), {})
+        if reason:
+            raise exceptions.PermissionDenied(f"CSRF Failed: {reason}")
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        key = (str(user_id), get_version(self.user_model, user_id))
+        user = _users.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            _users.set(key, user)
+        elif api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        # копия — чтобы изменения request.user в одном запросе не утекли в другие
+        return copy.copy(user)
+
+
+def set_jwt_cookies(response, access, refresh=None):
+    """Ставит куки access (и refresh, если передан) с настройками JWT_COOKIE_*."""
+    cookie_kwargs = {
+        'httponly': settings.JWT_COOKIE_HTTPONLY,
+        'secure': settings.JWT_COOKIE_SECURE,
+        'samesite': settings.JWT_COOKIE_SAMESITE,
+        'path': '/',
+    }
+    response.set_cookie(
+        settings.JWT_COOKIE_NAME, access,
+        max_age=api_settings.ACCESS_TOKEN_LIFETIME.total_seconds(), **cookie_kwargs
+    )
+    if refresh is not None:
+        response.set_cookie(
+            settings.JWT_REFRESH_COOKIE_NAME, refresh,
+            max_age=api_settings.REFRESH_TOKEN_LIFETIME.total_seconds(), **cookie_kwargs
+        )
@@ -0,0 +1,180 @@
+# accounts/blacklist.py
+
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# Ожидаемое число «живых» записей чёрного списка и доля ложных срабатываний
+BLACKLIST_BLOOM_CAPACITY = getattr(settings, 'BLACKLIST_BLOOM_CAPACITY', 1_000_000)
+BLACKLIST_BLOOM_ERROR_RATE = getattr(settings, 'BLACKLIST_BLOOM_ERROR_RATE', 0.001)
+# Как часто (сек.) догружать новые записи, даже если версия в кэше не менялась
+# (LocMem не общий между процессами — это верхняя граница отставания)
+BLACKLIST_BLOOM_SYNC_INTERVAL = getattr(settings, 'BLACKLIST_BLOOM_SYNC_INTERVAL', 5)
+# Насколько (сек.) назад по blacklisted_at перечитывать при догрузке: запись
+# видна только после коммита, а время у неё — момента вставки
+BLACKLIST_BLOOM_SYNC_OVERLAP = getattr(settings, 'BLACKLIST_BLOOM_SYNC_OVERLAP', 60)
+# Как часто (сек.) строить фильтр заново — на случай транзакций дольше
+# перекрытия и чтобы выбросить истёкшие токены
+BLACKLIST_BLOOM_REBUILD_INTERVAL = getattr(settings, 'BLACKLIST_BLOOM_REBUILD_INTERVAL', 3600)
+
+
+class BloomFilter:
+    """Фильтр Блума: «точно нет» или «возможно есть». Без удаления элементов."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # двойное хеширование: k позиций из одного 128-битного дайджеста
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        """Добавляет элемент; True — если его (вероятно) ещё не было."""
+        new = False
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not self.bits[pos >> 3] & mask:
+                self.bits[pos >> 3] |= mask
+                new = True
+        self.count += new
+        return new
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class BlacklistIndex:
+    """
+    Фильтр Блума по jti непросроченных токенов из BlacklistedToken — в памяти
+    процесса. Отрицательный ответ точен, положительный проверяется в БД, так
+    что проверка refresh-токена обычно не делает запроса к чёрному списку.
+
+    Новые записи догружаются по blacklisted_at (индекс из миграции accounts
+    0007) начиная с момента прошлого чтения минус sync_overlap: запись,
+    вставленная до чтения, а закоммиченная после, попадёт в следующую
+    догрузку. Догрузка — сразу после смены версии в кэше (её поднимает
+    blacklist()) и не реже sync_interval; раз в rebuild_interval, при
+    переполнении и после чистки таблиц (invalidate) фильтр строится заново.
+
+    Версия в кэше ускоряет догрузку только при общем кэше (Redis,
+    Memcached): с LocMem её видит лишь процесс, отозвавший токен, а
+    остальные узнают об отзыве не позже чем через sync_interval
+    (см. проверку core.W001 в check --deploy).
+    """
+    VERSION_KEY = 'jwt-blacklist:version'
+    GENERATION_KEY = 'jwt-blacklist:generation'
+
+    def __init__(self, capacity, error_rate, sync_interval, sync_overlap, rebuild_interval):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.sync_overlap = timedelta(seconds=sync_overlap)
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._bloom = None
+        self._read_at = None
+        self._version = self._generation = None
+        self._synced_at = self._built_at = 0.0
+
+    def might_contain(self, jti):
+        self._sync()
+        return jti in self._bloom
+
+    def add(self, jti):
+        self._sync()
+        with self._lock:
+            self._bloom.add(jti)
+        transaction.on_commit(lambda: _incr(self.VERSION_KEY))
+
+    def invalidate(self):
+        """Все процессы перестроят фильтр при следующей проверке."""
+        _incr(self.GENERATION_KEY)
+
+    def _sync(self):
+        version = cache.get(self.VERSION_KEY)
+        generation = cache.get(self.GENERATION_KEY)
+        bloom = self._bloom
+        if (
+            bloom is not None
+            and (version, generation) == (self._version, self._generation)
+            and time.monotonic() - self._synced_at < self.sync_interval
+        ):
+            return
+        with self._lock:
+            if bloom is not self._bloom:
+                return  # пока ждали блокировку, синхронизировал другой поток
+            if (
+                bloom is None
+                or generation != self._generation
+                or bloom.count > bloom.capacity
+                or time.monotonic() - self._built_at >= self.rebuild_interval
+            ):
+                self._rebuild()
+            else:
+                read_at = timezone.now()
+                self._load(BlacklistedToken.objects.filter(
+                    blacklisted_at__gte=self._read_at - self.sync_overlap
+                ))
+                self._read_at = read_at
+            self._version, self._generation = version, generation
+            self._synced_at = time.monotonic()
+
+    def _rebuild(self):
+        read_at = timezone.now()
+        live = BlacklistedToken.objects.filter(token__expires_at__gt=read_at)
+        capacity = max(self.capacity, 2 * live.count())
+        self._bloom = BloomFilter(capacity, self.error_rate)
+        self._load(live)
+        self._read_at = read_at
+        self._built_at = time.monotonic()
+
+    def _load(self, queryset):
+        jtis = queryset.order_by().values_list('token__jti', flat=True)
+        for jti in jtis.iterator(chunk_size=10000):
+            self._bloom.add(jti)
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+blacklist_index = BlacklistIndex(
+    BLACKLIST_BLOOM_CAPACITY, BLACKLIST_BLOOM_ERROR_RATE, BLACKLIST_BLOOM_SYNC_INTERVAL,
+    BLACKLIST_BLOOM_SYNC_OVERLAP, BLACKLIST_BLOOM_REBUILD_INTERVAL,
+)
+
+
+class BloomRefreshToken(RefreshToken):
+    """RefreshToken, проверяющий чёрный список через blacklist_index."""
+
+    def check_blacklist(self):
+        if blacklist_index.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_index.add(self.payload[api_settings.JTI_CLAIM])
+        return result
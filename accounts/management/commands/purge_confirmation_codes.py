@@ -0,0 +1,33 @@
+# accounts/management/commands/purge_confirmation_codes.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import ConfirmationCode
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет использованные и просроченные коды подтверждения небольшими "
+        "пачками по id, чтобы не держать долгих блокировок. Запускать по cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.0, help="Пауза между пачками, сек.")
+
+    def handle(self, *args, **options):
+        deleted = 0
+        while True:
+            ids = list(
+                ConfirmationCode.objects.purgeable()
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            count, _ = ConfirmationCode.objects.filter(id__in=ids).delete()
+            deleted += count
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(f"Удалено кодов: {deleted}"))
@@ -0,0 +1,40 @@
+# accounts/management/commands/purge_expired_tokens.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from accounts.blacklist import blacklist_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет просроченные refresh-токены (OutstandingToken) вместе с их "
+        "записями в чёрном списке небольшими пачками по id, затем просит все "
+        "процессы перестроить фильтр Блума. Замена flushexpiredtokens для "
+        "больших таблиц. Запускать по cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--pause', type=float, default=0.0, help="Пауза между пачками, сек.")
+
+    def handle(self, *args, **options):
+        # токены выдаются с одинаковым сроком жизни, поэтому просроченные — это
+        # самые старые id: обход по первичному ключу быстро набирает пачку
+        expired = OutstandingToken.objects.filter(expires_at__lt=timezone.now()).order_by('id')
+        deleted = 0
+        while True:
+            ids = list(expired.values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            # BlacklistedToken удаляется каскадом
+            count, _ = OutstandingToken.objects.filter(id__in=ids).delete()
+            deleted += count
+            if options['pause']:
+                time.sleep(options['pause'])
+        if deleted:
+            blacklist_index.invalidate()
+        self.stdout.write(self.style.SUCCESS(f"Удалено записей: {deleted}"))
@@ -0,0 +1,66 @@
+# accounts/middleware.py
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ValidationError
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import set_jwt_cookies
+
+# За сколько до истечения access-токена выдавать новый
+JWT_REFRESH_THRESHOLD = getattr(settings, 'JWT_REFRESH_THRESHOLD', timedelta(minutes=5))
+
+
+class JWTRefreshMiddleware:
+    """
+    Продлевает access-токен из кук прямо в текущем запросе: если куки
+    access_token нет (браузер удалил её по max_age) или до истечения меньше
+    JWT_REFRESH_THRESHOLD, а есть refresh_token — получает новый access через
+    TOKEN_REFRESH_SERIALIZER, подставляет его в request.COOKIES (запрос
+    аутентифицируется уже им) и ставит новые куки в ответ. Клиенту не нужен
+    отдельный вызов /api/auth/token/refresh/ и повтор запроса после 401.
+    Запросы с заголовком Authorization не трогает.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.serializer_class = import_string(api_settings.TOKEN_REFRESH_SERIALIZER)
+
+    def __call__(self, request):
+        tokens = self._refresh(request)
+        response = self.get_response(request)
+        # вьюха сама поставила или удалила куки (вход, выход) — не перебиваем
+        if tokens and settings.JWT_COOKIE_NAME not in response.cookies:
+            set_jwt_cookies(response, tokens['access'], tokens.get('refresh'))
+        return response
+
+    def _refresh(self, request):
+        if request.META.get(api_settings.AUTH_HEADER_NAME):
+            return None
+        refresh = request.COOKIES.get(settings.JWT_REFRESH_COOKIE_NAME)
+        if not refresh or not self._expiring(request.COOKIES.get(settings.JWT_COOKIE_NAME)):
+            return None
+
+        serializer = self.serializer_class(data={'refresh': refresh})
+        try:
+            serializer.is_valid(raise_exception=True)
+        except (TokenError, ValidationError):
+            # refresh истёк или отозван — пусть запрос идёт как анонимный
+            return None
+        tokens = serializer.validated_data
+        request.COOKIES[settings.JWT_COOKIE_NAME] = tokens['access']
+        return tokens
+
+    def _expiring(self, access):
+        if not access:
+            return True
+        try:
+            expires = AccessToken(access, verify=False)['exp']
+        except (TokenError, KeyError):
+            return True
+        return expires - time.time() < JWT_REFRESH_THRESHOLD.total_seconds()
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:39
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_customuser_email'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='phone',
+            field=models.CharField(help_text='Телефон в формате +7XXXXXXXXXX', max_length=12, unique=True, validators=[django.core.validators.RegexValidator(message='Телефон должен быть в формате +7XXXXXXXXXX (11 цифр после +7).', regex='^\\+7\\d{10}$')]),
+        ),
+        migrations.AddIndex(
+            model_name='confirmationcode',
+            index=models.Index(condition=models.Q(('is_used', False)), fields=['user', 'type', 'code', 'created_at'], name='confirmation_code_lookup_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_alter_customuser_phone_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='confirmationcode',
+            index=models.Index(fields=['created_at'], name='confirmation_code_created_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# accounts/migrations/0007_blacklistedtoken_blacklisted_at_idx.py
+
+from django.db import migrations, models
+
+# Таблица принадлежит simplejwt — индекс добавляем вручную, чтобы не
+# заводить миграцию в чужом приложении. По нему BlacklistIndex догружает
+# новые записи (blacklisted_at >= прошлое чтение − перекрытие).
+INDEX = models.Index(fields=['blacklisted_at'], name='blacklisted_token_at_idx')
+
+
+def add_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('token_blacklist', 'BlacklistedToken'), INDEX)
+
+
+def remove_index(apps, schema_editor):
+    schema_editor.remove_index(apps.get_model('token_blacklist', 'BlacklistedToken'), INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_customuser_manager'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_index, remove_index),
+    ]
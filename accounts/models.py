@@ -1,13 +1,38 @@
+from datetime import timedelta
+
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.core.validators import RegexValidator
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+
+from core.cache import bump_version
+
+
+class ConfirmationCodeQuerySet(models.QuerySet):
+    def live(self):
+        """Неиспользованные и ещё не просроченные коды."""
+        return self.filter(
+            is_used=False,
+            created_at__gte=timezone.now() - ConfirmationCode.LIFETIME,
+        )
+
+    def purgeable(self):
+        """Использованные или просроченные — их можно удалять."""
+        return self.filter(
+            models.Q(is_used=True)
+            | models.Q(created_at__lt=timezone.now() - ConfirmationCode.LIFETIME)
+        )
+
 
 class ConfirmationCode(models.Model):
     """
     Хранит разовые коды для подтверждения email/телефона при регистрации
     и для сброса пароля.
     """
+    # Сколько действует код
+    LIFETIME = timedelta(minutes=15)
+
     TYPE_CHOICES = [
         ('registration', 'Registration'),
         ('password_reset', 'Password Reset'),
@@ -22,9 +47,48 @@ class ConfirmationCode(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_used = models.BooleanField(default=False)
 
+    objects = ConfirmationCodeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # ровно под поиск кода: user + type + code среди неиспользованных
+            models.Index(
+                fields=['user', 'type', 'code', 'created_at'],
+                condition=models.Q(is_used=False),
+                name='confirmation_code_lookup_idx',
+            ),
+            # purge_confirmation_codes: просроченные по created_at
+            models.Index(fields=['created_at'], name='confirmation_code_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} – {self.type} – {self.code}"
 
+def _bump_users(model, pks):
+    for pk in pks:
+        bump_version(model, pk)
+
+
+class CustomUserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        """
+        UPDATE в обход save(): если меняются поля из AUTH_FIELDS, затронутые
+        пользователи тоже сбрасываются из кэша CachedJWTAuthentication.
+        """
+        if not set(kwargs) & set(self.model.AUTH_FIELDS):
+            return super().update(**kwargs)
+        model = self.model
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            transaction.on_commit(lambda: _bump_users(model, pks), using=self.db)
+        return rows
+
+
+class CustomUserManager(UserManager.from_queryset(CustomUserQuerySet)):
+    pass
+
+
 class CustomUser(AbstractUser):
     phone = models.CharField(
         max_length=12,
@@ -50,5 +114,35 @@ class CustomUser(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    # смена этих полей (save() или QuerySet.update()) сбрасывает пользователя
+    # из кэша CachedJWTAuthentication
+    AUTH_FIELDS = ('is_active', 'is_staff', 'is_superuser', 'password')
+
+    objects = CustomUserManager()
+
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.username
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._auth_state = instance._get_auth_state()
+        return instance
+
+    def _get_auth_state(self):
+        return tuple(self.__dict__.get(f) for f in self.AUTH_FIELDS)
+
+    def _invalidate_auth_cache(self):
+        model, pk = type(self), self.pk
+        transaction.on_commit(lambda: bump_version(model, pk))
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding and getattr(self, '_auth_state', None) != self._get_auth_state():
+            self._invalidate_auth_cache()
+        self._auth_state = self._get_auth_state()
+
+    def delete(self, *args, **kwargs):
+        self._invalidate_auth_cache()
+        return super().delete(*args, **kwargs)
\ No newline at end of file
@@ -1,9 +1,11 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from .models import ConfirmationCode, CustomUser
-from django.utils import timezone
-from datetime import timedelta
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import (
+    TokenBlacklistSerializer, TokenObtainPairSerializer, TokenRefreshSerializer,
+)
+
+from .blacklist import BloomRefreshToken
 
 User = get_user_model()
 
@@ -61,26 +63,36 @@ class RegistrationSerializer(serializers.ModelSerializer):
         return user
 
 
+def _get_live_code(email, code, code_type):
+    """
+    Ищет действующий код конкретного пользователя (email + code),
+    чтобы одинаковые коды у разных людей не пересекались.
+    """
+    obj = (
+        ConfirmationCode.objects.live()
+        .select_related('user')
+        .filter(user__email=email, code=code, type=code_type)
+        .order_by('-created_at')
+        .first()
+    )
+    if obj is None:
+        raise serializers.ValidationError({'code': "Неверный или просроченный код."})
+    return obj
+
+
 class RegistrationConfirmSerializer(serializers.Serializer):
     """
-    Подтверждает регистрацию: принимает код и активирует пользователя.
+    Подтверждает регистрацию: принимает email и код, активирует пользователя.
     """
+    email = serializers.EmailField()
     code = serializers.CharField(max_length=6)
 
-    def validate_code(self, code):
-        try:
-            obj = ConfirmationCode.objects.get(
-                code=code,
-                type='registration',
-                is_used=False,
-                created_at__gte=timezone.now() - timedelta(minutes=15)
-            )
-        except ConfirmationCode.DoesNotExist:
-            raise serializers.ValidationError("Неверный или просроченный код.")
-        return obj
+    def validate(self, attrs):
+        attrs['confirmation'] = _get_live_code(attrs['email'], attrs['code'], 'registration')
+        return attrs
 
     def save(self):
-        obj = self.validated_data['code']
+        obj = self.validated_data['confirmation']
         user = obj.user
         user.is_active = True
         user.save()
@@ -104,25 +116,18 @@ class PasswordResetSerializer(serializers.Serializer):
 
 class PasswordResetConfirmSerializer(serializers.Serializer):
     """
-    Подтверждение сброса пароля: код + новый пароль.
+    Подтверждение сброса пароля: email + код + новый пароль.
     """
+    email = serializers.EmailField()
     code = serializers.CharField(max_length=6)
     new_password = serializers.CharField(write_only=True, min_length=8)
 
-    def validate_code(self, code):
-        try:
-            obj = ConfirmationCode.objects.get(
-                code=code,
-                type='password_reset',
-                is_used=False,
-                created_at__gte=timezone.now() - timedelta(minutes=15)
-            )
-        except ConfirmationCode.DoesNotExist:
-            raise serializers.ValidationError("Неверный или просроченный код.")
-        return obj
+    def validate(self, attrs):
+        attrs['confirmation'] = _get_live_code(attrs['email'], attrs['code'], 'password_reset')
+        return attrs
 
     def save(self):
-        obj = self.validated_data['code']
+        obj = self.validated_data['confirmation']
         user = obj.user
         user.set_password(self.validated_data['new_password'])
         user.save()
@@ -133,4 +138,14 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
 
 class EmailTokenObtainPairSerializer(TokenObtainPairSerializer):
     # Сообщаем сериализатору, что он должен искать пользователя по полю 'email'
-    username_field = 'email'
\ No newline at end of file
+    username_field = 'email'
+
+
+class BloomTokenRefreshSerializer(TokenRefreshSerializer):
+    """Обновление access-токена: чёрный список сначала проверяется фильтром Блума."""
+    token_class = BloomRefreshToken
+
+
+class BloomTokenBlacklistSerializer(TokenBlacklistSerializer):
+    """Выход: отозванный jti сразу попадает в фильтр Блума этого процесса."""
+    token_class = BloomRefreshToken
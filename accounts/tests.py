@@ -1,3 +1,377 @@
-from django.test import TestCase
+import io
+import multiprocessing
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from core.models import OutgoingEmail
+
+from .authentication import AUTH_USER_CACHE_TTL, CachedJWTAuthentication, _users
+from .blacklist import BloomRefreshToken, blacklist_index
+from .models import ConfirmationCode
+
+User = get_user_model()
+
+
+class AuthTestCase(APITestCase):
+    """Кэши (LocMem, фильтр чёрного списка) переживают тесты — начинаем с пустых."""
+
+    def setUp(self):
+        cache.clear()
+        blacklist_index.reset()
+
+
+class QueuedAuthMailTests(AuthTestCase):
+    def test_registration_queues_code_email(self):
+        response = self.client.post('/api/auth/register/', {
+            'username': 'new', 'email': 'new@example.com',
+            'password': 'pass12345', 'phone': '+77010000001',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        email = OutgoingEmail.objects.get()
+        code = ConfirmationCode.objects.get(user__email='new@example.com', type='registration')
+        self.assertEqual(email.recipients, ['new@example.com'])
+        self.assertIn(code.code, email.body)
+
+    def test_password_reset_queues_code_email(self):
+        User.objects.create_user(
+            username='old', email='old@example.com', phone='+77010000002', password='pass12345'
+        )
+        response = self.client.post('/api/auth/password_reset/', {'email': 'old@example.com'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mail.outbox, [])
+        code = ConfirmationCode.objects.get(type='password_reset')
+        self.assertIn(code.code, OutgoingEmail.objects.get().body)
+
+
+class ConfirmationCodeTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user(
+            username='alice', email='alice@example.com', phone='+77010000011',
+            password='pass12345', is_active=False,
+        )
+        self.bob = User.objects.create_user(
+            username='bob', email='bob@example.com', phone='+77010000012',
+            password='pass12345', is_active=False,
+        )
+
+    def _confirm(self, email, code):
+        return self.client.post('/api/auth/register/confirm/', {'email': email, 'code': code})
+
+    def test_same_code_is_scoped_to_its_user(self):
+        ConfirmationCode.objects.create(user=self.alice, code='111111', type='registration')
+        ConfirmationCode.objects.create(user=self.bob, code='111111', type='registration')
+        self.assertEqual(self._confirm('bob@example.com', '111111').status_code, 200)
+        self.bob.refresh_from_db()
+        self.alice.refresh_from_db()
+        self.assertTrue(self.bob.is_active)
+        self.assertFalse(self.alice.is_active)
+        self.assertFalse(ConfirmationCode.objects.get(user=self.alice).is_used)
+
+    def test_expired_and_used_codes_are_rejected(self):
+        expired = ConfirmationCode.objects.create(user=self.alice, code='222222', type='registration')
+        ConfirmationCode.objects.filter(pk=expired.pk).update(
+            created_at=timezone.now() - ConfirmationCode.LIFETIME - timedelta(seconds=1)
+        )
+        self.assertEqual(self._confirm('alice@example.com', '222222').status_code, 400)
+
+        ConfirmationCode.objects.create(user=self.alice, code='333333', type='registration')
+        self.assertEqual(self._confirm('alice@example.com', '333333').status_code, 200)
+        self.assertEqual(self._confirm('alice@example.com', '333333').status_code, 400)
+
+    def test_purge_deletes_only_used_and_expired(self):
+        live = ConfirmationCode.objects.create(user=self.alice, code='444444', type='registration')
+        ConfirmationCode.objects.create(user=self.alice, code='555555', type='registration', is_used=True)
+        expired = ConfirmationCode.objects.create(user=self.bob, code='666666', type='password_reset')
+        ConfirmationCode.objects.filter(pk=expired.pk).update(
+            created_at=timezone.now() - timedelta(days=1)
+        )
+        call_command('purge_confirmation_codes', '--batch-size', '1', stdout=io.StringIO())
+        self.assertEqual(list(ConfirmationCode.objects.values_list('pk', flat=True)), [live.pk])
+
+
+class OtherProcess:
+    """
+    Второй воркер: дочерний процесс (fork) со своей копией LRU-кэша
+    пользователей. По команде проверяет, отдаст ли get_user пользователя
+    из своего кэша или пойдёт за ним в БД (её в процессе подменяет отказ
+    «пользователь неактивен» — in-memory БД теста дочернему не видна).
+    """
+
+    def __init__(self):
+        self._conn, child = multiprocessing.get_context('fork').Pipe()
+        self._process = multiprocessing.get_context('fork').Process(target=self._serve, args=(child,))
+        self._process.start()
+
+    @staticmethod
+    def _serve(conn):
+        auth = CachedJWTAuthentication()
+        while True:
+            command = conn.recv()
+            if command is None:
+                return
+            token, shift = command
+            now = time.monotonic() + shift
+            with mock.patch.object(JWTAuthentication, 'get_user', side_effect=AuthenticationFailed()), \
+                    mock.patch('accounts.authentication.time.monotonic', return_value=now):
+                try:
+                    auth.get_user(token)
+                    conn.send('cached')
+                except AuthenticationFailed:
+                    conn.send('reloaded')
+
+    def get_user(self, token, shift=0):
+        self._conn.send((token, shift))
+        return self._conn.recv()
+
+    def stop(self):
+        self._conn.send(None)
+        self._process.join(5)
+
+
+class CachedUserTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username='cached', email='cached@example.com', phone='+77010000021', password='pass12345',
+        )
+        self.token = AccessToken.for_user(self.user)
+        self.auth = CachedJWTAuthentication()
+        _users.clear()
+        self.addCleanup(_users.clear)
+
+    def _deactivate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+    def _start_other_process(self):
+        # кэш пользователя «прогрет» до fork — он есть у обоих процессов
+        self.auth.get_user(self.token)
+        other = OtherProcess()
+        self.addCleanup(other.stop)
+        self.assertEqual(other.get_user(self.token), 'cached')
+        return other
+
+    def test_cached_until_auth_fields_change(self):
+        self.auth.get_user(self.token)
+        with self.assertNumQueries(0):
+            self.auth.get_user(self.token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Другое'
+            self.user.save()
+        with self.assertNumQueries(0):
+            self.auth.get_user(self.token)
+        self._deactivate()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.get_user(self.token)
+
+    def test_queryset_update_invalidates(self):
+        self.auth.get_user(self.token)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.get_user(self.token)
+
+    def test_deactivation_reaches_other_process_with_shared_cache(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location,
+        }}):
+            other = self._start_other_process()
+            self._deactivate()
+            self.assertEqual(other.get_user(self.token), 'reloaded')
+
+    def test_process_local_cache_is_stale_for_at_most_ttl(self):
+        other = self._start_other_process()
+        self._deactivate()
+        self.assertEqual(other.get_user(self.token), 'cached')
+        self.assertEqual(other.get_user(self.token, shift=AUTH_USER_CACHE_TTL + 1), 'reloaded')
+
+
+class CookieAuthTests(AuthTestCase):
+    me = '/api/auth/me/'
+
+    def setUp(self):
+        super().setUp()
+        _users.clear()
+        self.user = User.objects.create_user(
+            username='cookie', email='cookie@example.com', phone='+77010000031', password='pass12345',
+        )
+        self.client = APIClient(enforce_csrf_checks=True)
+
+    def _login(self):
+        response = self.client.post(
+            '/api/auth/token/', {'email': 'cookie@example.com', 'password': 'pass12345'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def _set_tokens(self, access=None, refresh=None):
+        for name, token in ((settings.JWT_COOKIE_NAME, access), (settings.JWT_REFRESH_COOKIE_NAME, refresh)):
+            if token is None:
+                self.client.cookies.pop(name, None)
+            else:
+                self.client.cookies[name] = str(token)
+
+    def test_login_sets_cookies_and_authenticates(self):
+        response = self._login()
+        self.assertNotIn('access', response.json())
+        for name in (settings.JWT_COOKIE_NAME, settings.JWT_REFRESH_COOKIE_NAME):
+            self.assertEqual(response.cookies[name]['samesite'], settings.JWT_COOKIE_SAMESITE)
+        self.assertIn('csrftoken', response.cookies)
+        self.assertEqual(self.client.get(self.me).json()['email'], 'cookie@example.com')
+
+    def test_unsafe_cookie_requests_need_csrf_token(self):
+        self._login()
+        response = self.client.post('/api/uploads/', {}, format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('CSRF', response.json()['detail'])
+
+        csrf = self.client.cookies['csrftoken'].value
+        response = self.client.post('/api/uploads/', {}, format='json', HTTP_X_CSRFTOKEN=csrf)
+        self.assertEqual(response.status_code, 400)
+
+    def test_header_auth_needs_no_csrf_token(self):
+        access = AccessToken.for_user(self.user)
+        response = self.client.post('/api/uploads/', {}, format='json', HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.status_code, 400)
+
+    def test_inactive_users_cookie_is_ignored(self):
+        self._set_tokens(access=AccessToken.for_user(self.user))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(self.me).status_code, 401)
+        # публичный эндпоинт работает и со «старой» кукой
+        other = User.objects.create_user(
+            username='other', email='other@example.com', phone='+77010000032', password='pass12345',
+        )
+        response = self.client.post(
+            '/api/auth/token/', {'email': other.email, 'password': 'pass12345'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_register_confirm_sets_cookies(self):
+        self.user.is_active = False
+        self.user.save()
+        ConfirmationCode.objects.create(user=self.user, code='123456', type='registration')
+        response = self.client.post(
+            '/api/auth/register/confirm/', {'email': self.user.email, 'code': '123456'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(settings.JWT_COOKIE_NAME, response.cookies)
+        self.assertEqual(self.client.get(self.me).status_code, 200)
+
+    def test_missing_or_expiring_access_is_refreshed_inline(self):
+        refresh = RefreshToken.for_user(self.user)
+        expiring = AccessToken.for_user(self.user)
+        expiring.set_exp(lifetime=timedelta(seconds=30))
+        for access in (None, expiring):
+            with self.subTest(access=access):
+                self._set_tokens(access=access, refresh=refresh)
+                response = self.client.get(self.me)
+                self.assertEqual(response.status_code, 200)
+                new_access = AccessToken(response.cookies[settings.JWT_COOKIE_NAME].value)
+                self.assertEqual(new_access['user_id'], str(self.user.pk))
+
+    def test_fresh_access_is_not_refreshed(self):
+        self._set_tokens(access=AccessToken.for_user(self.user), refresh=RefreshToken.for_user(self.user))
+        response = self.client.get(self.me)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(settings.JWT_COOKIE_NAME, response.cookies)
+
+    def test_revoked_refresh_leaves_request_anonymous(self):
+        refresh = BloomRefreshToken.for_user(self.user)
+        refresh.blacklist()
+        self._set_tokens(refresh=refresh)
+        response = self.client.get(self.me)
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn(settings.JWT_COOKIE_NAME, response.cookies)
+
+
+class BlacklistIndexTests(AuthTestCase):
+    refresh_url = '/api/auth/token/refresh/'
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            username='bloom', email='bloom@example.com', phone='+77010000041', password='pass12345',
+        )
+
+    def _refresh(self, token):
+        return self.client.post(self.refresh_url, {'refresh': str(token)}, format='json')
+
+    def _revoke_elsewhere(self, blacklisted_at):
+        """Отзыв в другом процессе: запись есть в БД, версия в кэше не менялась."""
+        token = RefreshToken.for_user(self.user)
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+        BlacklistedToken.objects.filter(token__jti=token['jti']).update(blacklisted_at=blacklisted_at)
+        return token
+
+    def _after(self, seconds):
+        return mock.patch('accounts.blacklist.time.monotonic', return_value=time.monotonic() + seconds)
+
+    def test_live_token_is_refreshed_without_blacklist_query(self):
+        token = BloomRefreshToken.for_user(self.user)
+        blacklist_index.might_contain('')  # фильтр построен
+        with CaptureQueriesContext(connection) as queries:
+            response = self._refresh(token)
+        self.assertEqual(response.status_code, 200)
+        table = BlacklistedToken._meta.db_table
+        self.assertFalse([q for q in queries.captured_queries if table in q['sql']])
+
+    def test_revoked_token_is_rejected(self):
+        token = BloomRefreshToken.for_user(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            token.blacklist()
+        self.assertEqual(self._refresh(token).status_code, 401)
+
+    def test_false_positive_is_checked_in_database(self):
+        token = BloomRefreshToken.for_user(self.user)
+        with mock.patch.object(blacklist_index, 'might_contain', return_value=True):
+            self.assertEqual(self._refresh(token).status_code, 200)
+
+    def test_late_commit_is_picked_up_by_overlap(self):
+        blacklist_index.might_contain('')
+        # запись вставлена до прошлого чтения, а закоммичена после него
+        token = self._revoke_elsewhere(timezone.now() - timedelta(seconds=10))
+        self.assertEqual(self._refresh(token).status_code, 200)  # ещё в пределах sync_interval
+        with self._after(blacklist_index.sync_interval + 1):
+            self.assertEqual(self._refresh(token).status_code, 401)
+
+    def test_commit_later_than_overlap_is_picked_up_by_rebuild(self):
+        blacklist_index.might_contain('')
+        token = self._revoke_elsewhere(timezone.now() - blacklist_index.sync_overlap * 2)
+        with self._after(blacklist_index.sync_interval + 1):
+            self.assertEqual(self._refresh(token).status_code, 200)
+        with self._after(blacklist_index.rebuild_interval + 1):
+            self.assertEqual(self._refresh(token).status_code, 401)
+
+    def test_purge_removes_expired_and_rebuilds(self):
+        expired = BloomRefreshToken.for_user(self.user)
+        live = BloomRefreshToken.for_user(self.user)
+        for token in (expired, live):
+            token.blacklist()
+        OutstandingToken.objects.filter(jti=expired['jti']).update(expires_at=timezone.now() - timedelta(days=1))
+        self.assertTrue(blacklist_index.might_contain(expired['jti']))
+
+        call_command('purge_expired_tokens', stdout=io.StringIO())
+        self.assertFalse(OutstandingToken.objects.filter(jti=expired['jti']).exists())
+        self.assertFalse(blacklist_index.might_contain(expired['jti']))
+        self.assertTrue(blacklist_index.might_contain(live['jti']))
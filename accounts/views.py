@@ -3,11 +3,11 @@
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenBlacklistView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from rest_framework_simplejwt.settings import api_settings
 from rest_framework.generics import GenericAPIView
-from sarbaz_plus_backend.settings import JWT_COOKIE_HTTPONLY, JWT_COOKIE_NAME, JWT_COOKIE_SAMESITE, JWT_COOKIE_SECURE, JWT_REFRESH_COOKIE_NAME
 from django.conf import settings
+from django.middleware.csrf import get_token
 from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import set_jwt_cookies
 from .serializers import EmailTokenObtainPairSerializer, RegistrationSerializer
 
 
@@ -26,30 +26,9 @@ class CookieTokenObtainPairView(TokenObtainPairView):
             data = response.data
             # Очищаем тело ответа (не передаём токены в JSON)
             response.data = {"detail": "Успешный вход"}
-
-            # Устанавливаем access_token
-            access_exp = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
-            response.set_cookie(
-                JWT_COOKIE_NAME,
-                data["access"],
-                max_age=access_exp,
-                httponly=JWT_COOKIE_HTTPONLY,
-                secure=JWT_COOKIE_SECURE,
-                samesite=JWT_COOKIE_SAMESITE,
-                path="/",            # доступно для всех путей API
-            )
-
-            # Устанавливаем refresh_token
-            refresh_exp = api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
-            response.set_cookie(
-                JWT_REFRESH_COOKIE_NAME,
-                data["refresh"],
-                max_age=refresh_exp,
-                httponly=JWT_COOKIE_HTTPONLY,
-                secure=JWT_COOKIE_SECURE,
-                samesite=JWT_COOKIE_SAMESITE,
-                path="/",            # чтобы /api/token/refresh/ его видел
-            )
+            set_jwt_cookies(response, data["access"], data["refresh"])
+            # кука csrftoken: запросы с JWT-кукой проходят CSRF-проверку
+            get_token(request)
         return response
 
 class CookieTokenBlacklistView(TokenBlacklistView):
@@ -60,8 +39,8 @@ class CookieTokenBlacklistView(TokenBlacklistView):
         # 1) баним refresh (стандартный функционал)
         resp = super().post(request, *args, **kwargs)
         # 2) чистим куки
-        resp.delete_cookie('access_token', path='/')
-        resp.delete_cookie('refresh_token', path='/')
+        resp.delete_cookie(settings.JWT_COOKIE_NAME, path='/')
+        resp.delete_cookie(settings.JWT_REFRESH_COOKIE_NAME, path='/')
         resp.delete_cookie('sessionid', path='/')
         # (не нужно трогать csrftoken, он может понадобиться дальше)
         resp.data = {'detail': 'Вы успешно вышли'}
@@ -79,25 +58,25 @@ class RegisterView(GenericAPIView):
         # 1) создаем пользователя без JWT и без активации
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.save()  # пользователь is_active=False
 
-        # 2) генерируем одноразовый код и сохраняем его
-        code = f"{random.randint(0, 999999):06d}"
-        ConfirmationCode.objects.create(
-            user=user,
-            code=code,
-            type='registration',
-            created_at=timezone.now()
-        )
+        with transaction.atomic():
+            user = serializer.save()  # пользователь is_active=False
 
-        # 3) шлём письмо
-        send_mail(
-            subject="Код подтверждения регистрации Sarbaz+",
-            message=f"Ваш код: {code}\nОн действителен 15 минут.",
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
+            # 2) генерируем одноразовый код и сохраняем его
+            code = f"{random.randint(0, 999999):06d}"
+            ConfirmationCode.objects.create(
+                user=user,
+                code=code,
+                type='registration',
+                created_at=timezone.now()
+            )
+
+            # 3) ставим письмо в очередь (отправит send_queued_mail)
+            queue_mail(
+                subject="Код подтверждения регистрации Sarbaz+",
+                message=f"Ваш код: {code}\nОн действителен 15 минут.",
+                recipient_list=[user.email],
+            )
 
         return Response(
             {"detail": "Пользователь создан, код подтверждения выслан на email."},
@@ -107,7 +86,8 @@ class RegisterView(GenericAPIView):
 import random
 from django.utils import timezone
 from datetime import timedelta
-from django.core.mail import send_mail
+from django.db import transaction
+from core.mail import queue_mail
 from rest_framework.generics import RetrieveAPIView, GenericAPIView
 from rest_framework.permissions import IsAuthenticated
 from .serializers import (
@@ -118,16 +98,15 @@ from .serializers import (
 )
 from .models import ConfirmationCode
 
+@transaction.atomic
 def _send_confirmation_code(user, to_email, code, code_type):
-    send_mail(
+    ConfirmationCode.objects.create(
+        user=user, code=code, type=code_type
+    )
+    queue_mail(
         subject="Ваш код подтверждения",
         message=f"Ваш код: {code}",
-        from_email=settings.DEFAULT_FROM_EMAIL,
         recipient_list=[to_email],
-        fail_silently=False
-    )
-    ConfirmationCode.objects.create(
-        user=user, code=code, type=code_type
     )
 
 class MeView(RetrieveAPIView):
@@ -140,7 +119,7 @@ class MeView(RetrieveAPIView):
 
 class RegisterConfirmView(GenericAPIView):
     """
-    POST /api/auth/register/confirm/ — принимает {"code":"123456"},
+    POST /api/auth/register/confirm/ — принимает {"email": "...", "code":"123456"},
     активирует пользователя, выдаёт JWT-куки.
     """
     serializer_class = RegistrationConfirmSerializer
@@ -158,18 +137,8 @@ class RegisterConfirmView(GenericAPIView):
 
         # собираем ответ с куки
         response = Response({'detail': 'Регистрация подтверждена'}, status=status.HTTP_200_OK)
-        cookie_kwargs = {
-            'httponly': settings.JWT_COOKIE_HTTPONLY,
-            'secure': settings.JWT_COOKIE_SECURE,
-            'samesite': settings.JWT_COOKIE_SAMESITE,
-            'path': '/',
-        }
-        response.set_cookie(settings.JWT_COOKIE_NAME, str(access),
-                            max_age=refresh.access_token.lifetime.total_seconds(),
-                            **cookie_kwargs)
-        response.set_cookie(settings.JWT_REFRESH_COOKIE_NAME, str(refresh),
-                            max_age=refresh.lifetime.total_seconds(),
-                            **cookie_kwargs)
+        set_jwt_cookies(response, str(access), str(refresh))
+        get_token(request)
         return response
 
 class PasswordResetView(GenericAPIView):
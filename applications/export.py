@@ -0,0 +1,95 @@
+# applications/export.py
+
+import csv
+import tempfile
+
+# Сколько заявок забирать из серверного курсора за раз
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = [
+    'ID', 'Дата подачи', 'ФИО', 'ИИН', 'Дата рождения', 'Email', 'Телефон',
+    'Тип службы', 'Статус', 'Город рождения', 'Адрес',
+    'Образование', 'Специализация', 'Место обучения', 'GPA',
+    'Приписное свидетельство', 'Военный билет', 'Военная кафедра',
+    'Звание', 'Род войск', 'Состояние здоровья',
+    'Отсрочка', 'Причина отсрочки', 'Желаемые города', 'Комментарий администратора',
+]
+
+
+def _name(obj):
+    return obj.name if obj is not None else ''
+
+
+def _flag(value):
+    return 'да' if value else 'нет'
+
+
+def export_rows(queryset):
+    """
+    Построчно отдаёт заявки для выгрузки. Справочники приходят JOIN'ами
+    (ApplicationQuerySet.for_export), города — одним запросом на пачку.
+    """
+    for app in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            app.id,
+            app.created_at.isoformat(),
+            app.full_name,
+            app.iin,
+            app.date_of_birth.isoformat(),
+            app.email,
+            app.phone,
+            _name(app.service_type),
+            _name(app.status),
+            _name(app.birth_city),
+            app.address,
+            _name(app.education_level),
+            _name(app.specialization),
+            app.graduation_place,
+            app.gpa if app.gpa is not None else '',
+            _flag(app.has_conscript_certificate),
+            _flag(app.has_military_ticket),
+            _flag(app.has_military_faculty),
+            _name(app.current_rank),
+            _name(app.preferred_branch),
+            _name(app.health_status),
+            _flag(app.has_deferment),
+            app.deferment_reason,
+            '; '.join(ac.city.name for ac in app.desired_cities.all()),
+            app.admin_comment,
+        ]
+
+
+class _Echo:
+    """Псевдо-буфер для csv.writer: write() просто возвращает строку."""
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset):
+    """
+    Генератор строк CSV. BOM в начале — чтобы Excel понял UTF-8 (кириллица).
+    """
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(EXPORT_COLUMNS)
+    for row in export_rows(queryset):
+        yield writer.writerow(row)
+
+
+def build_xlsx(queryset):
+    """
+    Пишет XLSX в режиме write_only (строки сразу уходят во временный файл)
+    и возвращает открытый файл, готовый к отдаче.
+    Требует openpyxl.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Заявки')
+    sheet.append(EXPORT_COLUMNS)
+    for row in export_rows(queryset):
+        sheet.append(row)
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
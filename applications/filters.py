@@ -0,0 +1,101 @@
+# applications/filters.py
+
+import django_filters
+from django.db.models import Count, Q
+
+from core.cache import get_reference_map
+from .models import (
+    Application, ApplicationStatus, EducationLevel, HealthStatusChoice,
+    MilitaryBranch, ServiceType,
+)
+
+
+class ApplicationFilter(django_filters.FilterSet):
+    """
+    Фильтры админского списка заявок (и выгрузки, и фасетов).
+    Справочники — по коду (status, service_type) или id, как в ApplicationSerializer.
+    """
+    status = django_filters.ModelChoiceFilter(
+        queryset=ApplicationStatus.objects.all(), to_field_name='code'
+    )
+    service_type = django_filters.ModelChoiceFilter(
+        queryset=ServiceType.objects.all(), to_field_name='code'
+    )
+    health_status = django_filters.ModelChoiceFilter(queryset=HealthStatusChoice.objects.all())
+    education_level = django_filters.ModelChoiceFilter(queryset=EducationLevel.objects.all())
+    preferred_branch = django_filters.ModelChoiceFilter(queryset=MilitaryBranch.objects.all())
+    has_conscript_certificate = django_filters.BooleanFilter()
+    has_military_ticket = django_filters.BooleanFilter()
+    has_military_faculty = django_filters.BooleanFilter()
+    has_deferment = django_filters.BooleanFilter()
+    date_of_birth_from = django_filters.DateFilter(field_name='date_of_birth', lookup_expr='gte')
+    date_of_birth_to = django_filters.DateFilter(field_name='date_of_birth', lookup_expr='lte')
+
+    class Meta:
+        model = Application
+        fields = []
+
+
+# Фасет -> (справочник, поле кода в ответе) для FK; None — булев флаг
+FACETS = {
+    'status': (ApplicationStatus, 'code'),
+    'service_type': (ServiceType, 'code'),
+    'health_status': (HealthStatusChoice, 'pk'),
+    'education_level': (EducationLevel, 'pk'),
+    'preferred_branch': (MilitaryBranch, 'pk'),
+    'has_conscript_certificate': None,
+    'has_military_ticket': None,
+    'has_military_faculty': None,
+    'has_deferment': None,
+}
+
+
+def filter_q(filterset, exclude=(), only=None):
+    """
+    Активные фильтры filterset как одно Q-условие: кроме фильтров из
+    exclude и, если задан only, только из only.
+    """
+    q = Q()
+    for name, value in filterset.form.cleaned_data.items():
+        if name in exclude or (only is not None and name not in only) or value in (None, ''):
+            continue
+        flt = filterset.filters[name]
+        q &= Q(**{f"{flt.field_name}__{flt.lookup_expr}": value})
+    return q
+
+
+def facet_counts(queryset, filterset):
+    """
+    Количество заявок для каждого значения каждого фасета — одним запросом
+    с COUNT(*) FILTER (WHERE ...). Счётчики фасета учитывают все прочие
+    активные фильтры, но не его собственный — чтобы было видно, сколько
+    даст выбор другого значения.
+    Общие для всех счётчиков условия (фильтры не по фасетам, exist из
+    менеджера) идут в WHERE, чтобы работали индексы; в FILTER — только
+    фильтры по фасетам.
+    """
+    queryset = queryset.filter(filter_q(filterset, exclude=FACETS))
+    aggregates = {'total': Count('pk', filter=filter_q(filterset, only=FACETS) or None)}
+    options = {}
+    for facet, reference in FACETS.items():
+        others = filter_q(filterset, exclude={facet}, only=FACETS)
+        if reference is None:
+            values = [(True, True), (False, False)]
+        else:
+            model, key = reference
+            values = [(getattr(obj, key), obj.pk) for obj in get_reference_map(model).values()]
+        options[facet] = values
+        for i, (_, pk) in enumerate(values):
+            aggregates[f"{facet}__{i}"] = Count('pk', filter=others & Q(**{facet: pk}))
+
+    counts = queryset.order_by().aggregate(**aggregates)
+    return {
+        'total': counts['total'],
+        'facets': {
+            facet: [
+                {'value': value, 'count': counts[f"{facet}__{i}"]}
+                for i, (value, _) in enumerate(values)
+            ]
+            for facet, values in options.items()
+        },
+    }
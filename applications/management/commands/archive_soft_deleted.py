@@ -0,0 +1,83 @@
+# applications/management/commands/archive_soft_deleted.py
+
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.archive import copy_to_archive
+from applications.models import Application, ApplicationCity, Attachment, UploadSession
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит в архивные таблицы (*_archive) заявки, soft-удалённые дольше "
+        "--days дней, вместе с их городами и вложениями, а также давно удалённые "
+        "вложения живых заявок. Пачками, каждая — своей транзакцией. Запускать по cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_RETENTION_DAYS)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.0, help="Пауза между пачками, сек.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        applications = self._archive_batches(
+            Application.all_objects.filter(exist=False, deleted_at__lt=cutoff),
+            self._archive_applications, options,
+        )
+        attachments = self._archive_batches(
+            Attachment.all_objects.filter(exist=False, deleted_at__lt=cutoff),
+            self._archive_attachments, options,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"В архив перенесено заявок: {applications}, отдельных вложений: {attachments}"
+        ))
+
+    def _archive_batches(self, queryset, archive, options):
+        moved = 0
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    queryset.order_by('pk').select_for_update(skip_locked=True)
+                    .values_list('pk', flat=True)[:options['batch_size']]
+                )
+                if not ids:
+                    break
+                archive(ids)
+            moved += len(ids)
+            if options['pause']:
+                time.sleep(options['pause'])
+        return moved
+
+    def _archive_applications(self, ids):
+        copy_to_archive(Application.all_objects.filter(pk__in=ids))
+        copy_to_archive(ApplicationCity.objects.filter(application_id__in=ids))
+        copy_to_archive(Attachment.all_objects.filter(application_id__in=ids))
+
+        # незавершённые загрузки архивной заявке уже не нужны
+        sessions = UploadSession.objects.filter(application_id__in=ids)
+        paths = [session.temp_path for session in sessions.only('pk')]
+        sessions.delete()
+        transaction.on_commit(lambda: _remove_files(paths))
+
+        ApplicationCity.objects.filter(application_id__in=ids).delete()
+        Attachment.all_objects.filter(application_id__in=ids).delete()
+        Application.all_objects.filter(pk__in=ids).delete()
+
+    def _archive_attachments(self, ids):
+        copy_to_archive(Attachment.all_objects.filter(pk__in=ids))
+        Attachment.all_objects.filter(pk__in=ids).delete()
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
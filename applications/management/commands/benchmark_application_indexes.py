@@ -0,0 +1,173 @@
+# applications/management/commands/benchmark_application_indexes.py
+
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from applications.models import Application, ApplicationStatus, ServiceType
+
+# Индексы до пересмотра (миграция 0012): одиночные по флагам, exist и created_at
+OLD_INDEXES = [
+    models.Index(fields=[field], name=f"bench_old_{field}"[:30])
+    for field in (
+        'exist', 'created_at', 'has_conscript_certificate', 'has_military_ticket',
+        'has_military_faculty', 'has_deferment',
+    )
+]
+# Индексы после пересмотра: 0012 и составной индекс фильтров из 0011
+NEW_INDEX_NAMES = (
+    'application_user_live_idx', 'application_live_created_idx', 'application_status_live_idx',
+    'application_type_status_idx',
+)
+
+PAGE = 50
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает старый и новый набор индексов Application на синтетических "
+        "данных: время типовых запросов списков и стоимость вставки. "
+        "Всё выполняется в транзакции и откатывается (данные и DDL) в конце. "
+        "Показательны замеры на PostgreSQL с объёмом, близким к боевому "
+        "(миллионы строк); на SQLite и десятках тысяч строк разница между "
+        "наборами индексов почти не видна."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2_000_000)
+        parser.add_argument('--users', type=int, default=50_000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--insert-rows', type=int, default=20_000,
+                            help="Сколько строк вставлять при замере стоимости записи")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        with transaction.atomic():
+            self._generate(options)
+            self.stdout.write("Новые индексы:")
+            after = self._measure(options)
+            self._swap_to_old_indexes()
+            self.stdout.write("Старые индексы:")
+            before = self._measure(options)
+            transaction.set_rollback(True)
+
+        self.stdout.write("")
+        self.stdout.write(f"{'замер':<32}{'до, мс':>12}{'после, мс':>12}")
+        for name in after:
+            self.stdout.write(f"{name:<32}{before[name]:>12.2f}{after[name]:>12.2f}")
+
+    # --- данные ---
+
+    def _generate(self, options):
+        User = get_user_model()
+        statuses = list(ApplicationStatus.objects.all()) or [
+            ApplicationStatus.objects.create(code=f"bench-{i}", name=f"bench {i}") for i in range(5)
+        ]
+        service_types = list(ServiceType.objects.all()) or [
+            ServiceType.objects.create(code=f"bench-{i}", name=f"bench {i}", description='')
+            for i in range(3)
+        ]
+        users = User.objects.bulk_create([
+            User(username=f"bench{i}", email=f"bench{i}@bench.invalid", phone=f"+79{i:09d}")
+            for i in range(options['users'])
+        ], batch_size=options['batch_size'])
+        self.sample = {'users': users, 'statuses': statuses, 'service_types': service_types}
+
+        started = time.perf_counter()
+        total = options['rows']
+        self.next_id = 0
+        for start in range(0, total, options['batch_size']):
+            batch = Application.objects.bulk_create(
+                self._applications(min(options['batch_size'], total - start))
+            )
+            self._backdate(batch)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE "{Application._meta.db_table}"')
+        self.stdout.write(f"Сгенерировано {total} заявок за {time.perf_counter() - started:.1f} с")
+
+    def _applications(self, count):
+        rnd = self.random
+        start, self.next_id = self.next_id, self.next_id + count
+        for i in range(start, start + count):
+            yield Application(
+                user=rnd.choice(self.sample['users']),
+                service_type=rnd.choice(self.sample['service_types']),
+                status=rnd.choice(self.sample['statuses']),
+                full_name=f"Bench {i}",
+                date_of_birth=date(1995, 1, 1) + timedelta(days=rnd.randrange(3650)),
+                email=f"app{i}@bench.invalid",
+                phone=f"+78{i % 10**9:09d}",
+                address='-',
+                iin=f"9{i:011d}",
+                has_conscript_certificate=rnd.random() < 0.5,
+                has_military_ticket=rnd.random() < 0.3,
+                has_military_faculty=rnd.random() < 0.1,
+                has_deferment=rnd.random() < 0.05,
+                # ~5% soft-deleted, как в живой базе
+                exist=rnd.random() >= 0.05,
+            )
+
+    def _backdate(self, batch):
+        """
+        Разносит даты подачи по трём годам. auto_now_add при вставке ставит
+        «сейчас», поэтому даты проставляются отдельным bulk_update (pk у
+        объектов есть: PostgreSQL и SQLite возвращают их из bulk_create).
+        """
+        now = timezone.now()
+        for application in batch:
+            application.created_at = now - timedelta(seconds=self.random.randrange(3 * 365 * 86400))
+        Application.objects.bulk_update(batch, ['created_at'], batch_size=1000)
+
+    def _swap_to_old_indexes(self):
+        # без «with»: только DDL индексов внутри уже открытой транзакции
+        # (контекст schema_editor в SQLite запрещён внутри atomic)
+        editor = connection.schema_editor(atomic=False)
+        for index in Application._meta.indexes:
+            if index.name in NEW_INDEX_NAMES:
+                editor.remove_index(Application, index)
+        for index in OLD_INDEXES:
+            editor.add_index(Application, index)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE "{Application._meta.db_table}"')
+
+    # --- замеры ---
+
+    def _measure(self, options):
+        user = self.random.choice(self.sample['users'])
+        status = self.random.choice(self.sample['statuses'])
+        ordering = ('-created_at', '-id')
+        queries = {
+            'список пользователя': lambda: Application.objects.filter(user=user).order_by(*ordering),
+            'админ: все': lambda: Application.objects.order_by(*ordering),
+            'админ: по статусу': lambda: Application.objects.filter(status=status).order_by(*ordering),
+            'админ: флаг + статус': lambda: Application.objects.filter(
+                status=status, has_deferment=True).order_by(*ordering),
+        }
+        results = {}
+        for name, build in queries.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(build()[:PAGE])
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+            self.stdout.write(f"  {name}: {results[name]:.2f} мс")
+
+        started = time.perf_counter()
+        Application.objects.bulk_create(
+            self._applications(options['insert_rows']), batch_size=options['batch_size']
+        )
+        elapsed = (time.perf_counter() - started) * 1000
+        results['вставка, мс на 1000 строк'] = elapsed / options['insert_rows'] * 1000
+        self.stdout.write(f"  вставка: {results['вставка, мс на 1000 строк']:.2f} мс на 1000 строк")
+        return results
@@ -0,0 +1,69 @@
+# applications/management/commands/create_status_event_partitions.py
+
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from applications.models import ApplicationStatusEvent
+
+
+def add_months(day, months):
+    year, month = divmod(day.month - 1 + months, 12)
+    return date(day.year + year, month + 1, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт месячные секции истории статусов (PostgreSQL). Строки, уже "
+        "попавшие в секцию DEFAULT, переносятся в новую секцию. Запускать по cron "
+        "раз в месяц, с запасом вперёд."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3)
+        parser.add_argument('--start', help="Первый месяц YYYY-MM (по умолчанию — текущий)")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write("Секционирование доступно только в PostgreSQL — пропускаем.")
+            return
+
+        if options['start']:
+            try:
+                first = datetime.strptime(options['start'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError("--start должен быть в формате YYYY-MM")
+        else:
+            first = timezone.now().date().replace(day=1)
+        last = add_months(timezone.now().date().replace(day=1), options['months_ahead'])
+
+        month = first
+        while month <= last:
+            if self.create_partition(month):
+                self.stdout.write(f"Создана секция за {month:%Y-%m}")
+            month = add_months(month, 1)
+
+    @transaction.atomic
+    def create_partition(self, month):
+        table = ApplicationStatusEvent._meta.db_table
+        name = f"{table}_{month:%Y_%m}"
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0] is not None:
+                return False
+
+            # границы — в UTC, значения формируем сами (даты), не из ввода
+            lower = f"'{month.isoformat()} 00:00:00+00'"
+            upper = f"'{add_months(month, 1).isoformat()} 00:00:00+00'"
+            in_range = f'"changed_at" >= {lower} AND "changed_at" < {upper}'
+            cursor.execute(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS)')
+            # строки этого месяца, уже лежащие в DEFAULT, иначе ATTACH не пройдёт
+            cursor.execute(f'INSERT INTO "{name}" SELECT * FROM "{table}_default" WHERE {in_range}')
+            cursor.execute(f'DELETE FROM "{table}_default" WHERE {in_range}')
+            cursor.execute(
+                f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" '
+                f'FOR VALUES FROM ({lower}) TO ({upper})'
+            )
+        return True
@@ -0,0 +1,130 @@
+# applications/management/commands/gc_attachment_blobs.py
+
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+
+from applications.models import ArchivedAttachment, Attachment
+from core.storage import content_addressed_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет из хранилища файлы вложений (и их превью), на которые "
+        "ссылаются только soft-deleted вложения (число «живых» ссылок = 0). "
+        "Живыми считаются вложения в таблице и вложения, ушедшие в архив "
+        "вместе с удалённой заявкой (exist=True); архивные копии вложений, "
+        "удалённых до архивации, файлы не держат."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--grace', type=int, default=3600,
+            help="Не трогать файлы, использованные за последние N секунд "
+                 "(новая ссылка могла ещё не закоммититься)",
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        storage = content_addressed_storage
+        cutoff = time.time() - options['grace']
+        removed = freed = 0
+        batch = []
+        for row in self._dead_blobs(options['batch_size']):
+            batch.append(row)
+            if len(batch) >= options['batch_size']:
+                r, f = self._collect(storage, batch, cutoff, options['dry_run'])
+                removed, freed, batch = removed + r, freed + f, []
+        if batch:
+            r, f = self._collect(storage, batch, cutoff, options['dry_run'])
+            removed, freed = removed + r, freed + f
+
+        r, f = self._collect_previews(storage, options['batch_size'], cutoff, options['dry_run'])
+        removed, freed = removed + r, freed + f
+
+        verb = "Будет удалено" if options['dry_run'] else "Удалено"
+        self.stdout.write(self.style.SUCCESS(f"{verb} файлов: {removed}, {freed / 1024 / 1024:.1f} МБ"))
+
+    def _dead_blobs(self, chunk_size):
+        """
+        Пары (хэш, имя файла) с нулём живых ссылок — по таблице вложений и по
+        архиву: иначе файл вложения, удалённого и затем заархивированного,
+        не попал бы в кандидаты никогда. Итог перепроверяет _collect по обеим.
+        """
+        for queryset in (Attachment.all_objects.all(), ArchivedAttachment.objects.all()):
+            dead = (
+                queryset.exclude(sha256='')
+                .values('sha256', 'file')
+                .annotate(live=Count('id', filter=Q(exist=True)))
+                .filter(live=0)
+                .order_by()
+            )
+            yield from dead.iterator(chunk_size=chunk_size)
+
+    def _collect_previews(self, storage, batch_size, cutoff, dry_run):
+        """Превью и миниатюры удалённых вложений, если их не используют живые."""
+        removed = freed = 0
+        names = []
+        for preview, thumbnail in self._dead_previews(batch_size):
+            names += [n for n in (preview, thumbnail) if n]
+            if len(names) >= batch_size:
+                r, f = self._delete_unused(storage, names, cutoff, dry_run)
+                removed, freed, names = removed + r, freed + f, []
+        if names:
+            r, f = self._delete_unused(storage, names, cutoff, dry_run)
+            removed, freed = removed + r, freed + f
+        return removed, freed
+
+    def _dead_previews(self, chunk_size):
+        for queryset in (Attachment.all_objects.all(), ArchivedAttachment.objects.all()):
+            dead = queryset.filter(exist=False).exclude(preview='').values_list('preview', 'thumbnail')
+            yield from dead.iterator(chunk_size=chunk_size)
+
+    def _delete_unused(self, storage, names, cutoff, dry_run):
+        alive = Attachment.objects.filter(
+            Q(preview__in=names) | Q(thumbnail__in=names) | Q(file__in=names)
+        ).values_list('preview', 'thumbnail', 'file')
+        archived = ArchivedAttachment.objects.filter(exist=True).filter(
+            Q(preview__in=names) | Q(thumbnail__in=names) | Q(file__in=names)
+        ).values_list('preview', 'thumbnail', 'file')
+        alive = {name for row in [*alive, *archived] for name in row}
+        removed = freed = 0
+        for name in set(names) - alive:
+            if not storage.exists(name):
+                continue
+            path = storage.path(name)
+            if os.path.getmtime(path) > cutoff:
+                continue
+            freed += os.path.getsize(path)
+            removed += 1
+            if not dry_run:
+                storage.delete(name)
+        return removed, freed
+
+    def _collect(self, storage, rows, cutoff, dry_run):
+        # перепроверяем: за время обхода на файл могли сослаться заново
+        hashes = [r['sha256'] for r in rows]
+        alive = set(
+            Attachment.objects.filter(sha256__in=hashes).values_list('sha256', flat=True)
+        )
+        # вложения удалённых заявок, ушедшие в архив живыми, хранят свои файлы
+        alive.update(
+            ArchivedAttachment.objects.filter(exist=True, sha256__in=hashes)
+            .values_list('sha256', flat=True)
+        )
+        removed = freed = 0
+        for row in rows:
+            name = row['file']
+            if row['sha256'] in alive or not storage.exists(name):
+                continue
+            path = storage.path(name)
+            if os.path.getmtime(path) > cutoff:
+                continue
+            freed += os.path.getsize(path)
+            removed += 1
+            if not dry_run:
+                storage.delete(name)
+        return removed, freed
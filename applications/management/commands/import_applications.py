@@ -0,0 +1,223 @@
+# applications/management/commands/import_applications.py
+
+import csv
+import json
+import time
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.cache import get_reference_map
+from core.fields import parse_pk
+from applications.models import (
+    City, ServiceType, ApplicationStatus, EducationLevel, Specialization,
+    MilitaryBranch, Rank, HealthStatusChoice, Application, ApplicationCity,
+    ApplicationCounter, ApplicationStatusEvent,
+)
+from applications.serializers import ApplicationImportSerializer
+
+# Поле строки -> (модель, по какому полю ищем). Коды — как в ApplicationSerializer.
+REFERENCE_FIELDS = {
+    'service_type': (ServiceType, 'code'),
+    'status': (ApplicationStatus, 'code'),
+    'birth_city': (City, 'pk'),
+    'education_level': (EducationLevel, 'pk'),
+    'specialization': (Specialization, 'pk'),
+    'current_rank': (Rank, 'pk'),
+    'preferred_branch': (MilitaryBranch, 'pk'),
+    'health_status': (HealthStatusChoice, 'pk'),
+}
+REQUIRED_REFERENCES = {'service_type'}
+
+
+def _read_csv(path):
+    """(номер строки файла, строка, ошибки чтения) для каждой записи CSV."""
+    with open(path, newline='', encoding='utf-8-sig') as fh:
+        reader = csv.DictReader(fh)
+        for row in reader:
+            # пустые ячейки = поле не задано
+            row = {k: v for k, v in row.items() if k and v not in ('', None)}
+            if 'new_cities' in row:
+                row['new_cities'] = [c for c in row['new_cities'].split(';') if c.strip()]
+            yield reader.line_num, row, None
+
+
+def _read_jsonl(path):
+    """
+    (номер строки файла, объект, ошибки чтения) для каждой непустой строки
+    JSONL. Битый JSON или не-объект — ошибка этой строки, а не всего импорта.
+    """
+    with open(path, encoding='utf-8') as fh:
+        for line_no, line in enumerate(fh, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_no, None, {'json': [f"Некорректный JSON: {exc.msg} (символ {exc.pos + 1})."]}
+                continue
+            if not isinstance(row, dict):
+                yield line_no, None, {'json': [f"Ожидается объект, получен {type(row).__name__}."]}
+                continue
+            yield line_no, row, None
+
+
+class Command(BaseCommand):
+    help = (
+        "Импорт заявок из CSV/JSONL: построчная проверка, пакетная вставка "
+        "через bulk_create (Application, ApplicationCity и история статусов)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Путь к файлу .csv или .jsonl")
+        parser.add_argument(
+            '--user', required=True,
+            help="Email пользователя, от имени которого создаются заявки",
+        )
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="По умолчанию — по расширению файла")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Только проверить, ничего не записывать")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            self.user = User.objects.get(email=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"Пользователь {options['user']} не найден")
+
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        rows = _read_jsonl(path) if file_format == 'jsonl' else _read_csv(path)
+
+        self.maps = {
+            field: get_reference_map(model, key)
+            for field, (model, key) in REFERENCE_FIELDS.items()
+        }
+        self.city_ids = set(get_reference_map(City))
+        self.seen_iins = set()
+
+        created = failed = total = 0
+        started = time.monotonic()
+        while True:
+            batch = list(islice(rows, options['batch_size']))
+            if not batch:
+                break
+            total += len(batch)
+            valid = self._validate_batch(batch)
+            failed += len(batch) - len(valid)
+            if valid and not options['dry_run']:
+                self._insert(valid)
+            created += len(valid)
+
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else total
+        verb = "Проверено" if options['dry_run'] else "Создано"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb}: {created}, с ошибками: {failed}, всего строк: {total} "
+            f"за {elapsed:.1f} с ({rate:.0f} строк/с)"
+        ))
+
+    def _report(self, line_no, errors):
+        details = "; ".join(
+            f"{field}: {' '.join(str(m) for m in messages)}"
+            for field, messages in errors.items()
+        )
+        self.stderr.write(f"строка {line_no}: {details}")
+
+    def _validate_batch(self, batch):
+        """
+        Возвращает [(номер строки, Application, [city_id, ...])] для корректных строк.
+        """
+        valid = []
+        for line_no, row, read_errors in batch:
+            if read_errors:
+                self._report(line_no, read_errors)
+                continue
+            serializer = ApplicationImportSerializer(data=row)
+            errors = {} if serializer.is_valid() else dict(serializer.errors)
+
+            refs = {}
+            for field, mapping in self.maps.items():
+                value = row.get(field)
+                if value in (None, ''):
+                    if field in REQUIRED_REFERENCES:
+                        errors[field] = ["Обязательное поле."]
+                    continue
+                if REFERENCE_FIELDS[field][1] != 'pk':
+                    key = str(value)
+                else:
+                    key = parse_pk(value)
+                    if key is None:
+                        errors[field] = [f"Ожидается целый id, получено «{value}»."]
+                        continue
+                obj = mapping.get(key)
+                if obj is None:
+                    errors[field] = [f"Неизвестное значение «{value}»."]
+                else:
+                    refs[field] = obj
+
+            city_ids = row.get('new_cities') or []
+            if not isinstance(city_ids, list):
+                errors['new_cities'] = ["Ожидается список id городов."]
+                city_ids = []
+            parsed = [parse_pk(c) for c in city_ids]
+            invalid = [c for c, pk in zip(city_ids, parsed) if pk is None]
+            city_ids = [pk for pk in parsed if pk is not None]
+            unknown = [c for c in city_ids if c not in self.city_ids]
+            if invalid:
+                errors['new_cities'] = [f"Ожидаются целые id городов, получено: {invalid}"]
+            elif unknown:
+                errors['new_cities'] = [f"Неизвестные города: {unknown}"]
+
+            if errors:
+                self._report(line_no, errors)
+                continue
+
+            data = serializer.validated_data
+            app = Application(
+                **data, **refs,
+                user=self.user, created_by=self.user, modified_by=self.user,
+            )
+            valid.append((line_no, app, list(dict.fromkeys(city_ids))))
+
+        # уникальность ИИН — внутри файла и одним запросом к БД на пачку
+        existing = set(
+            Application.all_objects
+            .filter(iin__in=[app.iin for _, app, _ in valid])
+            .values_list('iin', flat=True)
+        )
+        result = []
+        for line_no, app, city_ids in valid:
+            if app.iin in existing or app.iin in self.seen_iins:
+                self._report(line_no, {'iin': ["Заявка с таким ИИН уже существует."]})
+                continue
+            self.seen_iins.add(app.iin)
+            result.append((line_no, app, city_ids))
+        return result
+
+    @transaction.atomic
+    def _insert(self, valid):
+        apps = Application.objects.bulk_create([app for _, app, _ in valid])
+        ApplicationCity.objects.bulk_create([
+            ApplicationCity(application=app, city_id=city_id)
+            for app, (_, _, city_ids) in zip(apps, valid)
+            for city_id in city_ids
+        ])
+        ApplicationStatusEvent.objects.bulk_create([
+            ApplicationStatusEvent(
+                application_id=app.pk,
+                to_status_id=app.status_id,
+                changed_by_id=self.user.pk,
+                changed_at=app.created_at,
+            )
+            for app in apps
+        ])
+        deltas = Counter()
+        for app, (_, _, city_ids) in zip(apps, valid):
+            deltas.update(app.counter_buckets())
+            deltas.update((ApplicationCounter.DESIRED_CITY, city_id) for city_id in city_ids)
+        ApplicationCounter.objects.apply(deltas)
@@ -0,0 +1,103 @@
+# applications/management/commands/process_attachment_previews.py
+
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+
+from applications.models import Attachment
+from applications.previews import render_previews
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит сжатые превью и миниатюры для фото и сканов в пуле процессов "
+        "(Pillow). Обрабатывает вложения с preview_status=pending."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="По умолчанию — число CPU")
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help="Работать постоянно")
+        parser.add_argument('--interval', type=float, default=10.0, help="Пауза при пустой очереди, сек.")
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help="Поставить в очередь старые изображения без превью и зависшие в processing",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            import PIL  # noqa: F401
+        except ImportError:
+            raise CommandError("Для превью нужен Pillow: pip install Pillow")
+
+        if options['backfill']:
+            self.stdout.write(f"Поставлено в очередь: {self.backfill()}")
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                done, failed = self.process_batch(pool, options['batch_size'])
+                if done or failed:
+                    self.stdout.write(f"Готово: {done}, ошибок: {failed}")
+                if not options['loop']:
+                    break
+                if not (done or failed):
+                    time.sleep(options['interval'])
+
+    def backfill(self):
+        is_image = Q()
+        for ext in Attachment.IMAGE_EXTENSIONS:
+            is_image |= Q(file__iendswith=ext)
+        return Attachment.objects.filter(
+            Q(preview_status='', preview='') & is_image
+            | Q(preview_status=Attachment.PREVIEW_PROCESSING)
+        ).update(preview_status=Attachment.PREVIEW_PENDING)
+
+    def _claim(self, batch_size):
+        # забираем пачку, чтобы параллельные воркеры её не взяли
+        with transaction.atomic():
+            ids = list(
+                Attachment.objects.select_for_update(skip_locked=True)
+                .filter(preview_status=Attachment.PREVIEW_PENDING)
+                .values_list('id', flat=True)[:batch_size]
+            )
+            Attachment.all_objects.filter(id__in=ids).update(
+                preview_status=Attachment.PREVIEW_PROCESSING
+            )
+        return list(Attachment.all_objects.filter(id__in=ids))
+
+    def process_batch(self, pool, batch_size):
+        attachments = self._claim(batch_size)
+        if not attachments:
+            return 0, 0
+
+        futures = {
+            pool.submit(render_previews, attachment.file.path): attachment
+            for attachment in attachments
+        }
+        done = failed = 0
+        for future in as_completed(futures):
+            attachment = futures[future]
+            try:
+                variants = future.result()
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f"Вложение {attachment.pk}: {type(exc).__name__}: {exc}")
+                Attachment.all_objects.filter(pk=attachment.pk).update(
+                    preview_status=Attachment.PREVIEW_FAILED
+                )
+                continue
+
+            for name, (content, ext) in variants.items():
+                field = getattr(attachment, name)
+                field.save(f"{attachment.pk}_{name}{ext}", ContentFile(content), save=False)
+            Attachment.all_objects.filter(pk=attachment.pk).update(
+                preview=attachment.preview.name,
+                thumbnail=attachment.thumbnail.name,
+                preview_status=Attachment.PREVIEW_DONE,
+            )
+            done += 1
+        return done, failed
@@ -0,0 +1,16 @@
+# applications/management/commands/rebuild_application_counters.py
+
+from django.core.management.base import BaseCommand
+
+from applications.models import ApplicationCounter
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает счётчики заявок (по статусу, типу службы, городам) "
+        "с нуля. Нужна после ручных правок в БД в обход модели."
+    )
+
+    def handle(self, *args, **options):
+        total = ApplicationCounter.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано счётчиков: {total}"))
@@ -0,0 +1,61 @@
+# applications/management/commands/rollup_application_stats.py
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from applications.models import Application, ApplicationDailyStat
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит суточную сводку заявок (ApplicationDailyStat). По умолчанию — "
+        "ночной прогон: последние --days дней плюс дни подачи заявок, изменённых "
+        "за это время. --since/--until — пересчёт (backfill) диапазона дат."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2)
+        parser.add_argument('--since', type=date.fromisoformat, help="YYYY-MM-DD")
+        parser.add_argument('--until', type=date.fromisoformat, help="YYYY-MM-DD, по умолчанию сегодня")
+        parser.add_argument(
+            '--chunk-days', type=int, default=31,
+            help="Сколько дней пересчитывать одной транзакцией при backfill",
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['since']:
+            until = options['until'] or today
+            if options['since'] > until:
+                raise CommandError("--since позже --until")
+            self._backfill(options['since'], until, options['chunk_days'])
+            return
+
+        start = today - timedelta(days=options['days'] - 1)
+        days = {start + timedelta(days=i) for i in range(options['days'])}
+        # старую заявку могли изменить (статус, тип службы) или удалить —
+        # пересчитываем и дни её подачи; soft-delete не трогает modified_at,
+        # поэтому смотрим и на deleted_at
+        changed_since = timezone.now() - timedelta(days=options['days'])
+        days.update(
+            Application.all_objects
+            .filter(Q(modified_at__gte=changed_since) | Q(deleted_at__gte=changed_since))
+            .dates('created_at', 'day')
+        )
+        rows = 0
+        for day in sorted(days):
+            rows += ApplicationDailyStat.objects.rebuild(day, day)
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано дней: {len(days)}, строк: {rows}"))
+
+    def _backfill(self, since, until, chunk_days):
+        rows = 0
+        start = since
+        while start <= until:
+            end = min(start + timedelta(days=chunk_days - 1), until)
+            rows += ApplicationDailyStat.objects.rebuild(start, end)
+            self.stdout.write(f"{start} — {end}: строк {rows}")
+            start = end + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f"Готово, строк: {rows}"))
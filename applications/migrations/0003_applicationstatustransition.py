@@ -0,0 +1,25 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0002_application_deferment_reason_application_gpa_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationStatusTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transitions_from', to='applications.applicationstatus')),
+                ('to_status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transitions_to', to='applications.applicationstatus')),
+            ],
+            options={
+                'unique_together': {('from_status', 'to_status')},
+            },
+        ),
+    ]
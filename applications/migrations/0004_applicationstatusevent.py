@@ -0,0 +1,67 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+TABLE = 'applications_applicationstatusevent'
+
+POSTGRES_SQL = f"""
+CREATE TABLE "{TABLE}" (
+    "id" bigserial NOT NULL,
+    "changed_at" timestamp with time zone NOT NULL,
+    "application_id" bigint NOT NULL,
+    "from_status_id" bigint NULL,
+    "to_status_id" bigint NOT NULL,
+    "changed_by_id" bigint NULL,
+    PRIMARY KEY ("id", "changed_at")
+) PARTITION BY RANGE ("changed_at");
+CREATE TABLE "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT;
+CREATE INDEX "status_event_app_idx" ON "{TABLE}" ("application_id", "changed_at");
+"""
+
+
+def create_event_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_SQL)
+    else:
+        schema_editor.create_model(apps.get_model('applications', 'ApplicationStatusEvent'))
+
+
+def drop_event_table(apps, schema_editor):
+    cascade = ' CASCADE' if schema_editor.connection.vendor == 'postgresql' else ''
+    schema_editor.execute(f'DROP TABLE "{TABLE}"{cascade}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('applications', '0003_applicationstatustransition'),
+    ]
+
+    operations = [
+        # Состояние — обычная модель; в PostgreSQL сама таблица создаётся
+        # секционированной по месяцам (PARTITION BY RANGE changed_at).
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ApplicationStatusEvent',
+                    fields=[
+                        ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                        ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('application', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='status_events', to='applications.application')),
+                        ('changed_by', models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                        ('from_status', models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='applications.applicationstatus')),
+                        ('to_status', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='applications.applicationstatus')),
+                    ],
+                    options={
+                        'indexes': [models.Index(fields=['application', 'changed_at'], name='status_event_app_idx')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_event_table, drop_event_table),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('applications', '0004_applicationstatusevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('modified_at', models.DateTimeField(auto_now=True)),
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('attachment_type', models.CharField(blank=True, choices=[('resume', 'Резюме'), ('photo', 'Фото'), ('diploma', 'Диплом'), ('attestat', 'Аттестат'), ('id_document', 'Удостоверение личности'), ('conscript_ticket', 'Приписной билет')], max_length=20, null=True)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField(help_text='Полный размер файла в байтах')),
+                ('offset', models.PositiveBigIntegerField(default=0, help_text='Сколько байт уже получено')),
+                ('sha256', models.CharField(blank=True, help_text='SHA-256 файла (hex): от клиента — для проверки, после finalize — вычисленный', max_length=64)),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='applications.application')),
+                ('attachment', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_session', to='applications.attachment')),
+                ('created_by', models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_created', to=settings.AUTH_USER_MODEL)),
+                ('modified_by', models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='%(class)s_modified', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
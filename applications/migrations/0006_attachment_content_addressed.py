@@ -0,0 +1,24 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:44
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0005_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 содержимого (пусто для файлов, загруженных до дедупликации)', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='attachment',
+            name='file',
+            field=models.FileField(storage=core.storage.attachment_storage, upload_to='applications/%Y/%m/'),
+        ),
+    ]
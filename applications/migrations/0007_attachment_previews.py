@@ -0,0 +1,33 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:44
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0006_attachment_content_addressed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attachment',
+            name='preview',
+            field=models.FileField(blank=True, editable=False, storage=core.storage.attachment_storage, upload_to='previews/%Y/%m/'),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='preview_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Ожидает обработки'), ('processing', 'Обрабатывается'), ('done', 'Готово'), ('failed', 'Ошибка')], editable=False, help_text='Пусто — превью для этого файла не строится', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='thumbnail',
+            field=models.FileField(blank=True, editable=False, storage=core.storage.attachment_storage, upload_to='previews/%Y/%m/'),
+        ),
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(condition=models.Q(('preview_status', 'pending')), fields=['preview_status'], name='attachment_preview_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:46
+
+from django.db import migrations, models
+
+
+def fill_counters(apps, schema_editor):
+    # начальное заполнение — те же GROUP BY, что и в ApplicationCounter.objects.rebuild()
+    Application = apps.get_model('applications', 'Application')
+    ApplicationCity = apps.get_model('applications', 'ApplicationCity')
+    ApplicationCounter = apps.get_model('applications', 'ApplicationCounter')
+    live = Application.objects.filter(exist=True).order_by()
+    links = ApplicationCity.objects.filter(application__exist=True).order_by()
+    sources = [
+        ('status', live, 'status_id'),
+        ('service_type', live, 'service_type_id'),
+        ('birth_city', live, 'birth_city_id'),
+        ('desired_city', links, 'city_id'),
+    ]
+    ApplicationCounter.objects.bulk_create([
+        ApplicationCounter(dimension=dimension, bucket=bucket or 0, count=count)
+        for dimension, queryset, field in sources
+        for bucket, count in queryset.values_list(field).annotate(n=models.Count('pk'))
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0007_attachment_previews'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('status', 'Статус'), ('service_type', 'Тип службы'), ('birth_city', 'Город рождения'), ('desired_city', 'Желаемый город')], max_length=20)),
+                ('bucket', models.BigIntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('dimension', 'bucket')},
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
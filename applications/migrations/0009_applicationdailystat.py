@@ -0,0 +1,27 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0008_applicationcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField()),
+                ('service_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='applications.servicetype')),
+                ('status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='applications.applicationstatus')),
+            ],
+            options={
+                'unique_together': {('day', 'service_type', 'status')},
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:50
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+TABLE = 'applications_application'
+
+SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce({row}full_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce({row}email, '')), 'B')"
+)
+
+# Конфигурация 'simple' — без стемминга: ФИО на кириллице и латинице
+# ищутся одинаково. Триггер держит search_vector в актуальном состоянии
+# при любой записи, включая bulk_create и QuerySet.update().
+POSTGRES_SQL = f"""
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE FUNCTION application_search_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {SEARCH_DOCUMENT.format(row='NEW.')};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER application_search_update
+    BEFORE INSERT OR UPDATE OF full_name, email, search_vector ON "{TABLE}"
+    FOR EACH ROW EXECUTE FUNCTION application_search_update();
+
+UPDATE "{TABLE}" SET search_vector = {SEARCH_DOCUMENT.format(row='')};
+
+CREATE INDEX application_search_idx ON "{TABLE}" USING gin (search_vector);
+CREATE INDEX application_full_name_trgm_idx ON "{TABLE}" USING gin (full_name gin_trgm_ops);
+"""
+
+POSTGRES_REVERSE_SQL = f"""
+DROP INDEX IF EXISTS application_full_name_trgm_idx;
+DROP INDEX IF EXISTS application_search_idx;
+DROP TRIGGER IF EXISTS application_search_update ON "{TABLE}";
+DROP FUNCTION IF EXISTS application_search_update();
+"""
+
+
+def create_search_support(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_SQL)
+
+
+def drop_search_support(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_REVERSE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0009_applicationdailystat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # триггер и индексы поиска — только в PostgreSQL
+        migrations.RunPython(create_search_support, drop_search_support),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0010_application_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(condition=models.Q(('exist', True)), fields=['service_type', 'status', '-created_at'], name='application_type_status_idx'),
+        ),
+    ]
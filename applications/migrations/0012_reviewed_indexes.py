@@ -0,0 +1,100 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0011_application_filter_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='advantage',
+            name='exist',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='exist',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='has_conscript_certificate',
+            field=models.BooleanField(default=False, help_text='Наличие приписного свидетельства (для срочной службы)'),
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='has_deferment',
+            field=models.BooleanField(default=False, help_text='Наличие отсрочки'),
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='has_military_faculty',
+            field=models.BooleanField(default=False, help_text='Наличие прохождения военной кафедры (для контрактной службы)'),
+        ),
+        migrations.AlterField(
+            model_name='application',
+            name='has_military_ticket',
+            field=models.BooleanField(default=False, help_text='Наличие военного билета (для контрактной службы)'),
+        ),
+        migrations.AlterField(
+            model_name='applicationstatus',
+            name='exist',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='attachment',
+            name='exist',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='educationlevel',
+            name='exist',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='healthstatuschoice',
+            name='exist',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='militarybranch',
+            name='exist',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='rank',
+            name='exist',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='servicetype',
+            name='exist',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='specialization',
+            name='exist',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(condition=models.Q(('exist', True)), fields=['user', '-created_at', '-id'], name='application_user_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(condition=models.Q(('exist', True)), fields=['-created_at', '-id'], name='application_live_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(condition=models.Q(('exist', True)), fields=['status', '-created_at', '-id'], name='application_status_live_idx'),
+        ),
+    ]
@@ -0,0 +1,152 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:55
+
+import core.storage
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def fill_deleted_at(apps, schema_editor):
+    # до этой миграции момент удаления не хранился — берём последнее изменение
+    for model in apps.get_app_config('applications').get_models():
+        if any(f.name == 'deleted_at' for f in model._meta.fields):
+            model._base_manager.filter(exist=False).update(deleted_at=models.F('modified_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0012_reviewed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedApplication',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_by_id', models.BigIntegerField(null=True)),
+                ('modified_by_id', models.BigIntegerField(null=True)),
+                ('modified_at', models.DateTimeField()),
+                ('exist', models.BooleanField(default=True)),
+                ('deleted_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('user_id', models.BigIntegerField(db_index=True)),
+                ('service_type_id', models.BigIntegerField()),
+                ('status_id', models.BigIntegerField()),
+                ('full_name', models.CharField(max_length=255)),
+                ('date_of_birth', models.DateField()),
+                ('email', models.EmailField(max_length=254)),
+                ('phone', models.CharField(max_length=12)),
+                ('birth_city_id', models.BigIntegerField(null=True)),
+                ('address', models.CharField(max_length=255)),
+                ('comment', models.TextField(blank=True)),
+                ('education_level_id', models.BigIntegerField(null=True)),
+                ('specialization_id', models.BigIntegerField(null=True)),
+                ('graduation_place', models.CharField(blank=True, max_length=255)),
+                ('sports_achievements', models.TextField(blank=True)),
+                ('height_cm', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('weight_kg', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('has_conscript_certificate', models.BooleanField(default=False, help_text='Наличие приписного свидетельства (для срочной службы)')),
+                ('has_military_ticket', models.BooleanField(default=False, help_text='Наличие военного билета (для контрактной службы)')),
+                ('has_military_faculty', models.BooleanField(default=False, help_text='Наличие прохождения военной кафедры (для контрактной службы)')),
+                ('current_rank_id', models.BigIntegerField(null=True)),
+                ('preferred_branch_id', models.BigIntegerField(null=True)),
+                ('health_status_id', models.BigIntegerField(null=True)),
+                ('health_comment', models.TextField(blank=True, help_text='Комментрарии по состоянию здоровья (описание болезней и т.п.)')),
+                ('admin_comment', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('iin', models.CharField(db_index=True, help_text='Индивидуальный идентификационный номер (12 цифр)', max_length=12)),
+                ('has_deferment', models.BooleanField(default=False, help_text='Наличие отсрочки')),
+                ('deferment_reason', models.TextField(blank=True, help_text='Причина отсрочки (если есть)')),
+                ('gpa', models.DecimalField(blank=True, decimal_places=2, help_text='GPA (например, 3.75)', max_digits=4, null=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'applications_application_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedApplicationCity',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('application_id', models.BigIntegerField(db_index=True)),
+                ('city_id', models.BigIntegerField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'applications_applicationcity_archive',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedAttachment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_by_id', models.BigIntegerField(null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('modified_by_id', models.BigIntegerField(null=True)),
+                ('modified_at', models.DateTimeField()),
+                ('exist', models.BooleanField(default=True)),
+                ('deleted_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('application_id', models.BigIntegerField(db_index=True, null=True)),
+                ('file', models.FileField(storage=core.storage.attachment_storage, upload_to='applications/%Y/%m/')),
+                ('attachment_type', models.CharField(blank=True, choices=[('resume', 'Резюме'), ('photo', 'Фото'), ('diploma', 'Диплом'), ('attestat', 'Аттестат'), ('id_document', 'Удостоверение личности'), ('conscript_ticket', 'Приписной билет')], help_text='Тип вложения', max_length=20, null=True)),
+                ('sha256', models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 содержимого (пусто для файлов, загруженных до дедупликации)', max_length=64)),
+                ('preview', models.FileField(blank=True, editable=False, storage=core.storage.attachment_storage, upload_to='previews/%Y/%m/')),
+                ('thumbnail', models.FileField(blank=True, editable=False, storage=core.storage.attachment_storage, upload_to='previews/%Y/%m/')),
+                ('preview_status', models.CharField(blank=True, choices=[('pending', 'Ожидает обработки'), ('processing', 'Обрабатывается'), ('done', 'Готово'), ('failed', 'Ошибка')], editable=False, help_text='Пусто — превью для этого файла не строится', max_length=10)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'applications_attachment_archive',
+            },
+        ),
+        migrations.AddField(
+            model_name='advantage',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='applicationstatus',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='attachment',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='educationlevel',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='healthstatuschoice',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='militarybranch',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='rank',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='servicetype',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='specialization',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_deleted_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-17 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0013_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(condition=models.Q(('exist', False)), fields=['deleted_at'], name='application_deleted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attachment',
+            index=models.Index(condition=models.Q(('exist', False)), fields=['deleted_at'], name='attachment_deleted_idx'),
+        ),
+    ]
@@ -1,9 +1,19 @@
 # applications/models.py
 
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, time, timedelta
+
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models, transaction
 from django.core.validators import RegexValidator
-from core.models import AuditModel, City, SoftDeleteModel
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from core.archive import archive_model
+from core.models import AuditModel, City, SoftDeleteManager, SoftDeleteModel
+from core.storage import ContentAddressedStorage, attachment_storage
 
 # Справочник состояний здоровья
 class HealthStatusChoice(AuditModel, SoftDeleteModel):
@@ -18,6 +28,8 @@ class HealthStatusChoice(AuditModel, SoftDeleteModel):
         help_text="Читаемое название статуса (годен, негоден, годен с ограничениями и т.п.)"
     )
 
+    cache_versioned = True
+
     def __str__(self):
         return self.name
 
@@ -28,6 +40,8 @@ class ServiceType(AuditModel, SoftDeleteModel):
     name = models.CharField(max_length=100, db_index=True)
     description = models.TextField()
 
+    cache_versioned = True
+
     def __str__(self):
         return self.name
 
@@ -37,6 +51,8 @@ class Advantage(AuditModel, SoftDeleteModel):
     name = models.CharField(max_length=150)
     description = models.TextField(blank=True)
 
+    cache_versioned = True
+
     def __str__(self):
         return self.name
 
@@ -57,14 +73,37 @@ class ApplicationStatus(AuditModel, SoftDeleteModel):
     code = models.SlugField(max_length=50, unique=True, db_index=True)
     name = models.CharField(max_length=100)
 
+    cache_versioned = True
+
     def __str__(self):
         return self.name
 
 
+class ApplicationStatusTransition(models.Model):
+    """
+    Разрешённые переходы между статусами заявки.
+    Если для исходного статуса не задано ни одного перехода — он без ограничений.
+    """
+    from_status = models.ForeignKey(
+        ApplicationStatus, on_delete=models.CASCADE, related_name="transitions_from"
+    )
+    to_status = models.ForeignKey(
+        ApplicationStatus, on_delete=models.CASCADE, related_name="transitions_to"
+    )
+
+    class Meta:
+        unique_together = ("from_status", "to_status")
+
+    def __str__(self):
+        return f"{self.from_status_id} → {self.to_status_id}"
+
+
 class EducationLevel(AuditModel, SoftDeleteModel):
     code = models.SlugField(max_length=50, unique=True, db_index=True)
     name = models.CharField(max_length=100)
 
+    cache_versioned = True
+
     def __str__(self):
         return self.name
 
@@ -72,6 +111,8 @@ class EducationLevel(AuditModel, SoftDeleteModel):
 class Specialization(AuditModel, SoftDeleteModel):
     name = models.CharField(max_length=150, unique=True)
 
+    cache_versioned = True
+
     def __str__(self):
         return self.name
 
@@ -79,6 +120,8 @@ class Specialization(AuditModel, SoftDeleteModel):
 class MilitaryBranch(AuditModel, SoftDeleteModel):
     name = models.CharField(max_length=150, unique=True)
 
+    cache_versioned = True
+
     def __str__(self):
         return self.name
 
@@ -86,10 +129,53 @@ class MilitaryBranch(AuditModel, SoftDeleteModel):
 class Rank(AuditModel, SoftDeleteModel):
     name = models.CharField(max_length=100, unique=True)
 
+    cache_versioned = True
+
     def __str__(self):
         return self.name
 
 
+class ApplicationQuerySet(models.QuerySet):
+    def with_related(self):
+        """
+        Всё, что рендерит ApplicationSerializer, за фиксированное число запросов:
+        JOIN для service_type/status и по одному prefetch на города и вложения
+        (только «живые»), независимо от количества заявок.
+        """
+        return self.select_related('service_type', 'status').prefetch_related(
+            models.Prefetch(
+                'desired_cities',
+                queryset=ApplicationCity.objects.filter(city__exist=True),
+            ),
+            models.Prefetch(
+                'attachments',
+                queryset=Attachment.objects.all(),
+            ),
+        )
+
+    def for_export(self):
+        """
+        Для выгрузки: названия справочников — JOIN'ами,
+        желаемые города — prefetch вместе с City.
+        """
+        return self.select_related(
+            'service_type', 'status', 'birth_city', 'education_level',
+            'specialization', 'current_rank', 'preferred_branch', 'health_status',
+        ).prefetch_related(
+            models.Prefetch(
+                'desired_cities',
+                queryset=ApplicationCity.objects.filter(city__exist=True).select_related('city'),
+            ),
+        )
+
+
+class ApplicationManager(SoftDeleteManager.from_queryset(ApplicationQuerySet)):
+    def get_queryset(self):
+        # search_vector нужен только в WHERE; не тянем его в Python
+        # (и не перезаписываем при save — его ведёт триггер)
+        return super().get_queryset().defer('search_vector')
+
+
 class Application(AuditModel, SoftDeleteModel):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
@@ -143,19 +229,16 @@ class Application(AuditModel, SoftDeleteModel):
     # Для срочной службы — наличие приписного свидетельства
     has_conscript_certificate = models.BooleanField(
         default=False,
-        db_index=True,
         help_text="Наличие приписного свидетельства (для срочной службы)"
     )
     # Для контрактной службы — наличие военного билета
     has_military_ticket = models.BooleanField(
         default=False,
-        db_index=True,
         help_text="Наличие военного билета (для контрактной службы)"
     )
     # Для контрактной службы — прохождение военной кафедры
     has_military_faculty = models.BooleanField(
         default=False,
-        db_index=True,
         help_text="Наличие прохождения военной кафедры (для контрактной службы)"
     )
 
@@ -185,7 +268,7 @@ class Application(AuditModel, SoftDeleteModel):
     # Комментарий администратора при review
     admin_comment = models.TextField(blank=True)
 
-    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
 
         # ИИН: 12 цифр
     iin = models.CharField(
@@ -197,7 +280,6 @@ class Application(AuditModel, SoftDeleteModel):
 
     has_deferment = models.BooleanField(
         default=False,
-        db_index=True,
         help_text="Наличие отсрочки"
     )
     deferment_reason = models.TextField(
@@ -213,12 +295,113 @@ class Application(AuditModel, SoftDeleteModel):
         help_text="GPA (например, 3.75)"
     )
 
+    # tsvector по ФИО и email для поиска; в PostgreSQL заполняется триггером
+    # (миграция 0010), на других СУБД остаётся пустым
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ApplicationManager()
+
     class Meta:
         ordering = ["-created_at"]
+        # Только составные частичные (WHERE exist) индексы под реальные запросы:
+        # одиночные индексы по булевым флагам и exist почти не отсекают строк,
+        # но удорожают каждую вставку. Порядок (-created_at, -id) — как у
+        # курсорной пагинации, чтобы первая страница читалась прямо из индекса.
+        indexes = [
+            # «мои заявки» (ApplicationViewSet)
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                condition=models.Q(exist=True),
+                name="application_user_live_idx",
+            ),
+            # админский список без фильтров, суточная сводка по created_at
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(exist=True),
+                name="application_live_created_idx",
+            ),
+            # админский список по статусу
+            models.Index(
+                fields=["status", "-created_at", "-id"],
+                condition=models.Q(exist=True),
+                name="application_status_live_idx",
+            ),
+            # фильтры админки по типу службы (+ статусу) среди «живых» заявок
+            models.Index(
+                fields=["service_type", "status", "-created_at"],
+                condition=models.Q(exist=True),
+                name="application_type_status_idx",
+            ),
+            # archive_soft_deleted: давно удалённые заявки
+            models.Index(
+                fields=["deleted_at"],
+                condition=models.Q(exist=False),
+                name="application_deleted_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.full_name} ({self.service_type.name})"
 
+    # поля, за сменой которых следят история статусов и счётчики
+    TRACKED_FIELDS = ('status_id', 'service_type_id', 'birth_city_id', 'exist')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # запоминаем значения из БД, чтобы при save() заметить их смену
+        # (отложенные через only()/defer() поля не отслеживаем)
+        instance._loaded = {
+            f: instance.__dict__[f] for f in cls.TRACKED_FIELDS if f in instance.__dict__
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        loaded = {} if adding else getattr(self, '_loaded', {})
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding or self.status_id != loaded.get('status_id', self.status_id):
+                ApplicationStatusEvent.objects.create(
+                    application_id=self.pk,
+                    from_status_id=loaded.get('status_id'),
+                    to_status_id=self.status_id,
+                    changed_by_id=self.modified_by_id,
+                )
+            ApplicationCounter.objects.apply(self._counter_deltas(adding, loaded))
+        self._loaded = {
+            f: self.__dict__[f] for f in self.TRACKED_FIELDS if f in self.__dict__
+        }
+
+    def counter_buckets(self):
+        """Корзины счётчиков, в которые попадает заявка (без желаемых городов)."""
+        return ApplicationCounter.buckets(self.status_id, self.service_type_id, self.birth_city_id)
+
+    def _counter_deltas(self, adding, loaded):
+        deltas = Counter()
+        if adding:
+            if self.exist:
+                deltas.update(self.counter_buckets())
+            return deltas
+
+        # отложенные (only/defer) поля не сохраняются — считаем их неизменными
+        current = {f: getattr(self, f) for f in self.TRACKED_FIELDS}
+        old = {**current, **loaded}
+        if old == current:
+            return deltas
+        if old['exist']:
+            deltas.subtract(ApplicationCounter.buckets(
+                old['status_id'], old['service_type_id'], old['birth_city_id']
+            ))
+        if current['exist']:
+            deltas.update(self.counter_buckets())
+        if old['exist'] != current['exist']:
+            # удаление/восстановление заявки — и её желаемые города
+            sign = 1 if current['exist'] else -1
+            for city_id in self.desired_cities.values_list('city_id', flat=True):
+                deltas[(ApplicationCounter.DESIRED_CITY, city_id)] += sign
+        return deltas
+
 
 class ApplicationCity(models.Model):
     application = models.ForeignKey(
@@ -243,13 +426,27 @@ class Attachment(AuditModel, SoftDeleteModel):
         ("id_document", "Удостоверение личности"),
         ("conscript_ticket", "Приписной билет"),
     ]
+    PREVIEW_PENDING = "pending"
+    PREVIEW_PROCESSING = "processing"
+    PREVIEW_DONE = "done"
+    PREVIEW_FAILED = "failed"
+    PREVIEW_STATUS_CHOICES = [
+        (PREVIEW_PENDING, "Ожидает обработки"),
+        (PREVIEW_PROCESSING, "Обрабатывается"),
+        (PREVIEW_DONE, "Готово"),
+        (PREVIEW_FAILED, "Ошибка"),
+    ]
+    # для каких файлов строим превью (фото и сканы документов)
+    IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff", ".gif"}
+
     application = models.ForeignKey(
         Application, on_delete=models.CASCADE,
         related_name="attachments",
         null=True,
         blank=True,
     )
-    file = models.FileField(upload_to="applications/%Y/%m/")
+    # одинаковые файлы хранятся один раз (см. core.storage)
+    file = models.FileField(upload_to="applications/%Y/%m/", storage=attachment_storage)
     attachment_type = models.CharField(
         max_length=20,
         choices=ATTACHMENT_TYPE_CHOICES,
@@ -257,6 +454,272 @@ class Attachment(AuditModel, SoftDeleteModel):
         blank=True,
         help_text="Тип вложения"
     )
+    sha256 = models.CharField(
+        max_length=64, blank=True, db_index=True, editable=False,
+        help_text="SHA-256 содержимого (пусто для файлов, загруженных до дедупликации)"
+    )
+
+    # Сжатые копии для просмотра (строит команда process_attachment_previews)
+    preview = models.FileField(
+        upload_to="previews/%Y/%m/", storage=attachment_storage, blank=True, editable=False
+    )
+    thumbnail = models.FileField(
+        upload_to="previews/%Y/%m/", storage=attachment_storage, blank=True, editable=False
+    )
+    preview_status = models.CharField(
+        max_length=10, choices=PREVIEW_STATUS_CHOICES, blank=True, editable=False,
+        help_text="Пусто — превью для этого файла не строится"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["preview_status"],
+                condition=models.Q(preview_status="pending"),
+                name="attachment_preview_queue_idx",
+            ),
+            # archive_soft_deleted: давно удалённые вложения
+            models.Index(
+                fields=["deleted_at"],
+                condition=models.Q(exist=False),
+                name="attachment_deleted_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.attachment_type} for {self.application_id}"
+
+    def save(self, *args, **kwargs):
+        if self.file and not self.file._committed:
+            # то же, что делает FileField.pre_save, но раньше — чтобы знать хэш
+            self.file.save(self.file.name, self.file.file, save=False)
+        self.sha256 = ContentAddressedStorage.digest_from_name(self.file.name)
+        if self._state.adding and not self.preview_status and self.is_image:
+            self.preview_status = self.PREVIEW_PENDING
+        super().save(*args, **kwargs)
+
+    @property
+    def is_image(self):
+        return os.path.splitext(self.file.name or "")[1].lower() in self.IMAGE_EXTENSIONS
+
+
+class ApplicationStatusEvent(models.Model):
+    """
+    Append-only история смены статусов заявки: только id и время.
+    В PostgreSQL таблица секционирована по месяцам по changed_at
+    (см. миграцию и команду create_status_event_partitions).
+    Внешние ключи без ограничений в БД — история переживает удаление заявок.
+    """
+    id = models.BigAutoField(primary_key=True)
+    application = models.ForeignKey(
+        Application, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+        related_name="status_events"
+    )
+    from_status = models.ForeignKey(
+        ApplicationStatus, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+        null=True, related_name="+"
+    )
+    to_status = models.ForeignKey(
+        ApplicationStatus, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+        related_name="+"
+    )
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False,
+        null=True, related_name="+"
+    )
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["application", "changed_at"], name="status_event_app_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.application_id}: {self.from_status_id} → {self.to_status_id}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("История статусов только дополняется, изменять записи нельзя")
+        super().save(*args, **kwargs)
+
+
+class UploadSession(AuditModel):
+    """
+    Сессия докачиваемой загрузки вложения: клиент шлёт файл кусками
+    по смещению (offset), после finalize создаётся Attachment заявки.
+    Владелец — created_by.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    application = models.ForeignKey(
+        Application, on_delete=models.CASCADE,
+        related_name="upload_sessions"
+    )
+    attachment_type = models.CharField(
+        max_length=20,
+        choices=Attachment.ATTACHMENT_TYPE_CHOICES,
+        null=True,
+        blank=True,
+    )
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(help_text="Полный размер файла в байтах")
+    offset = models.PositiveBigIntegerField(default=0, help_text="Сколько байт уже получено")
+    sha256 = models.CharField(
+        max_length=64, blank=True,
+        help_text="SHA-256 файла (hex): от клиента — для проверки, после finalize — вычисленный"
+    )
+    attachment = models.OneToOneField(
+        Attachment, on_delete=models.SET_NULL,
+        null=True, blank=True, related_name="upload_session"
+    )
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def temp_path(self):
+        return os.path.join(settings.UPLOAD_SESSION_DIR, f"{self.pk}.part")
+
+
+class ApplicationCounterManager(models.Manager):
+    def rebuild(self):
+        """
+        Пересчитывает все счётчики с нуля GROUP BY-запросами и подменяет
+        содержимое таблицы одной транзакцией. Возвращает число счётчиков.
+        """
+        live = Application.objects.order_by()
+        links = ApplicationCity.objects.filter(application__exist=True).order_by()
+        sources = [
+            (self.model.STATUS, live, 'status_id'),
+            (self.model.SERVICE_TYPE, live, 'service_type_id'),
+            (self.model.BIRTH_CITY, live, 'birth_city_id'),
+            (self.model.DESIRED_CITY, links, 'city_id'),
+        ]
+        with transaction.atomic(using=self.db):
+            counters = [
+                self.model(dimension=dimension, bucket=bucket or 0, count=count)
+                for dimension, queryset, field in sources
+                for bucket, count in queryset.values_list(field).annotate(n=models.Count('pk'))
+            ]
+            self.all().delete()
+            self.bulk_create(counters)
+        return len(counters)
+
+    def apply(self, deltas):
+        """
+        Прибавляет дельты {(dimension, bucket): n} к счётчикам одним
+        INSERT ... ON CONFLICT DO UPDATE (PostgreSQL, SQLite).
+        """
+        rows = sorted((key, n) for key, n in deltas.items() if n)
+        if not rows:
+            return
+        connection = connections[self.db]
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            for (dimension, bucket), n in rows:
+                self.get_or_create(dimension=dimension, bucket=bucket)
+                self.filter(dimension=dimension, bucket=bucket).update(count=models.F('count') + n)
+            return
+
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        values = ", ".join(["(%s, %s, %s)"] * len(rows))
+        params = [p for (dimension, bucket), n in rows for p in (dimension, bucket, n)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (dimension, bucket, count) VALUES {values} "
+                f"ON CONFLICT (dimension, bucket) DO UPDATE "
+                f"SET count = {table}.count + EXCLUDED.count",
+                params,
+            )
+
+
+class ApplicationCounter(models.Model):
+    """
+    Предрасчитанные количества «живых» заявок по статусу, типу службы,
+    городу рождения и желаемому городу. Обновляются инкрементально при
+    создании, смене полей и soft-delete; пересобираются командой
+    rebuild_application_counters.
+    """
+    STATUS = "status"
+    SERVICE_TYPE = "service_type"
+    BIRTH_CITY = "birth_city"
+    DESIRED_CITY = "desired_city"
+    DIMENSION_CHOICES = [
+        (STATUS, "Статус"),
+        (SERVICE_TYPE, "Тип службы"),
+        (BIRTH_CITY, "Город рождения"),
+        (DESIRED_CITY, "Желаемый город"),
+    ]
+
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    # id записи справочника; 0 — значение не указано
+    bucket = models.BigIntegerField()
+    count = models.BigIntegerField(default=0)
+
+    objects = ApplicationCounterManager()
+
+    class Meta:
+        unique_together = ("dimension", "bucket")
+
+    def __str__(self):
+        return f"{self.dimension}:{self.bucket} = {self.count}"
+
+    @classmethod
+    def buckets(cls, status_id, service_type_id, birth_city_id):
+        return Counter({
+            (cls.STATUS, status_id): 1,
+            (cls.SERVICE_TYPE, service_type_id): 1,
+            (cls.BIRTH_CITY, birth_city_id or 0): 1,
+        })
+
+
+class ApplicationDailyStatManager(models.Manager):
+    def rebuild(self, start, end):
+        """
+        Пересчитывает дни [start, end] (даты включительно) одним GROUP BY по
+        диапазону created_at и подменяет строки этих дней одной транзакцией.
+        Возвращает число записанных строк.
+        """
+        tz = timezone.get_current_timezone()
+        since = timezone.make_aware(datetime.combine(start, time.min), tz)
+        until = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz)
+        rows = (
+            Application.objects.filter(created_at__gte=since, created_at__lt=until)
+            .annotate(day=TruncDate('created_at', tzinfo=tz))
+            .order_by()
+            .values_list('day', 'service_type_id', 'status_id')
+            .annotate(n=models.Count('pk'))
+        )
+        with transaction.atomic(using=self.db):
+            stats = [
+                self.model(day=day, service_type_id=service_type_id, status_id=status_id, count=n)
+                for day, service_type_id, status_id, n in rows
+            ]
+            self.filter(day__range=(start, end)).delete()
+            self.bulk_create(stats)
+        return len(stats)
+
+
+class ApplicationDailyStat(models.Model):
+    """
+    Суточная сводка: сколько «живых» заявок подано в день day по типу службы
+    с их текущим статусом. Строится командой rollup_application_stats.
+    """
+    day = models.DateField()
+    service_type = models.ForeignKey(ServiceType, on_delete=models.CASCADE, related_name="+")
+    status = models.ForeignKey(ApplicationStatus, on_delete=models.CASCADE, related_name="+")
+    count = models.PositiveIntegerField()
+
+    objects = ApplicationDailyStatManager()
+
+    class Meta:
+        unique_together = ("day", "service_type", "status")
+
+    def __str__(self):
+        return f"{self.day} {self.service_type_id}/{self.status_id}: {self.count}"
+
+
+# Архив: заявки, soft-удалённые дольше срока хранения, вместе с городами
+# и вложениями (команда archive_soft_deleted). Читаются через
+# Application.archived_objects / Attachment.archived_objects.
+ArchivedApplication = archive_model(Application, exclude=('search_vector',), indexed=('user', 'iin'))
+ArchivedApplicationCity = archive_model(ApplicationCity, indexed=('application',))
+ArchivedAttachment = archive_model(Attachment, indexed=('application', 'sha256'))
@@ -0,0 +1,58 @@
+# applications/pagination.py
+
+import json
+
+from django.db import connections
+from rest_framework.pagination import CursorPagination
+
+
+def estimate_count(queryset):
+    """
+    Примерное число строк по статистике планировщика PostgreSQL (EXPLAIN),
+    без COUNT(*). На других СУБД — точный count().
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class ApplicationCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация по индексу created_at: страница N стоит столько же,
+    сколько первая. ?with_total=true добавляет в ответ примерное общее
+    количество.
+
+    Курсор DRF хранит только created_at последней строки и смещение — сколько
+    строк с тем же created_at уже отдано; id в условие WHERE не попадает.
+    Одинаковые created_at поэтому разбираются смещением, а -id лишь задаёт
+    среди них постоянный порядок, без которого смещение пропускало бы или
+    повторяло строки. Порядок из ?ordering= (OrderingFilter) не принимается:
+    по неуникальному полю смещение росло бы без границ.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    total_query_param = 'with_total'
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.total_estimate = None
+        if request.query_params.get(self.total_query_param) in ('1', 'true', 'True'):
+            self.total_estimate = estimate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.total_estimate is not None:
+            response.data['total_estimate'] = self.total_estimate
+        return response
@@ -1,5 +1,16 @@
 from rest_framework import permissions
 
+# Пока заявка в этом статусе, владелец может её менять и добавлять файлы
+EDITABLE_STATUS = 'new'
+
+
+def is_editable_by(application, user):
+    """Staff — всегда; владелец — только пока заявка в статусе EDITABLE_STATUS."""
+    if user.is_staff:
+        return True
+    return application.user_id == user.pk and application.status.code == EDITABLE_STATUS
+
+
 class IsOwnerAndEditable(permissions.BasePermission):
     """
     Разрешаем владельцу изменять/удалять заявку только если её status == 'new'.
@@ -28,7 +39,29 @@ class IsOwnerAndEditable(permissions.BasePermission):
         # Для обновления (PUT/PATCH) и удаления (DELETE):
         # разрешаем только владельцу и только если статус "new"
         if view.action in ['update', 'partial_update', 'destroy']:
-            return obj.user == user and obj.status == 'new'
+            return is_editable_by(obj, user)
 
         # По умолчанию запрещаем
         return False
+
+
+class IsAttachmentOwner(IsOwnerAndEditable):
+    """
+    Права на вложение — те же, что на его заявку (см. IsOwnerAndEditable).
+    """
+    def has_object_permission(self, request, view, obj):
+        if obj.application is None:
+            return request.user.is_staff
+        return super().has_object_permission(request, view, obj.application)
+
+
+class IsUploadEditable(permissions.BasePermission):
+    """
+    Сессия загрузки (свои сессии отбирает queryset): смотреть offset и
+    отменять можно всегда, дописывать куски и завершать — только пока
+    заявка редактируема (как у IsOwnerAndEditable).
+    """
+    def has_object_permission(self, request, view, obj):
+        if request.method in permissions.SAFE_METHODS or view.action == 'destroy':
+            return True
+        return is_editable_by(obj.application, request.user)
@@ -0,0 +1,39 @@
+# applications/previews.py
+#
+# Построение превью в отдельных процессах: функции здесь не трогают Django
+# и БД — получают путь к файлу и возвращают готовые байты.
+
+import io
+
+# (имя, максимальная сторона в px, качество)
+VARIANTS = [
+    ('preview', 1600, 80),
+    ('thumbnail', 320, 70),
+]
+
+
+def render_previews(path):
+    """
+    Открывает изображение, поворачивает по EXIF и пересохраняет уменьшенные
+    копии без метаданных (WebP, если Pillow его поддерживает, иначе JPEG).
+    Возвращает {имя варианта: (bytes, расширение)}.
+    """
+    from PIL import Image, ImageOps, features
+
+    fmt, ext = ('WEBP', '.webp') if features.check('webp') else ('JPEG', '.jpg')
+    result = {}
+    with Image.open(path) as source:
+        largest = VARIANTS[0][1]
+        # JPEG умеет декодировать сразу в уменьшенном масштабе — в разы быстрее
+        source.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        for name, size, quality in VARIANTS:
+            copy = image.copy()
+            copy.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            # exif не передаём — метаданные (в т.ч. геолокация) отбрасываются
+            copy.save(buffer, fmt, quality=quality, optimize=fmt == 'JPEG')
+            result[name] = (buffer.getvalue(), ext)
+    return result
@@ -0,0 +1,66 @@
+# applications/search.py
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connections
+from django.db.models import F, FloatField, Q, Value
+
+# Сколько результатов отдаёт поиск по умолчанию и максимум
+SEARCH_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+_DIGITS = re.compile(r'^\+?\d+$')
+_WORDS = re.compile(r'\w+')
+
+
+def _number_q(term):
+    """
+    Префикс ИИН или телефона: LIKE 'xxx%' по индексам *_like
+    (varchar_pattern_ops), которые Django создаёт для unique/db_index полей.
+    Телефон хранится как +7XXXXXXXXXX, поэтому «8700…» и «700…» приводим к нему.
+    Мобильные номера сами начинаются с 7, так что «7701…» может быть и с кодом
+    страны, и без — проверяем оба варианта.
+    """
+    digits = term.lstrip('+')
+    local = digits[1:] if digits.startswith('8') else digits
+    return (
+        Q(iin__startswith=digits)
+        | Q(phone__startswith='+' + digits)
+        | Q(phone__startswith='+7' + local)
+    )
+
+
+def search_applications(queryset, term):
+    """
+    Поиск заявок для администратора. Цифры — префиксный поиск по ИИН/телефону;
+    текст — полнотекстовый (префиксы слов) по ФИО и email плюс нечёткий
+    поиск ФИО по триграммам (порог — pg_trgm.similarity_threshold, 0.3
+    по умолчанию), с сортировкой по релевантности (поле rank).
+    На СУБД кроме PostgreSQL — простой icontains без ранжирования.
+    """
+    term = term.strip()
+    if _DIGITS.match(term):
+        return queryset.filter(_number_q(term)).annotate(
+            rank=Value(1.0, output_field=FloatField())
+        ).order_by('iin')
+
+    words = _WORDS.findall(term)
+    if not words:
+        return queryset.none()
+
+    if connections[queryset.db].vendor != 'postgresql':
+        q = Q()
+        for word in words:
+            q &= Q(full_name__icontains=word) | Q(email__icontains=word)
+        return queryset.filter(q).annotate(
+            rank=Value(1.0, output_field=FloatField())
+        ).order_by('full_name')
+
+    # «иван:* & петр:*» — каждое слово как префикс
+    query = SearchQuery(' & '.join(f"{word.lower()}:*" for word in words), config='simple', search_type='raw')
+    return (
+        queryset.filter(Q(search_vector=query) | Q(full_name__trigram_similar=term))
+        .annotate(rank=SearchRank(F('search_vector'), query) + TrigramSimilarity('full_name', term))
+        .order_by('-rank', '-created_at')
+    )
@@ -1,11 +1,20 @@
 # applications/serializers.py
 
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
+
+from core.cache import get_reference_map
+from core.fields import ReferenceField
+from .permissions import is_editable_by
 from .models import (
     City, ServiceType, Advantage, ServiceTypeAdvantage,
-    ApplicationStatus, EducationLevel, Specialization,
+    ApplicationStatus, ApplicationStatusTransition, EducationLevel, Specialization,
     MilitaryBranch, Rank, HealthStatusChoice,
-    Application, ApplicationCity, Attachment
+    Application, ApplicationCity, ApplicationCounter, Attachment, UploadSession
 )
 
 # 1. Справочники — простые ModelSerializer’ы
@@ -44,6 +53,19 @@ class ApplicationStatusSerializer(serializers.ModelSerializer):
         fields = ['id', 'code', 'name']
 
 
+class ApplicationStatusTransitionSerializer(serializers.ModelSerializer):
+    from_status = serializers.SlugRelatedField(
+        slug_field='code', queryset=ApplicationStatus.objects.all()
+    )
+    to_status = serializers.SlugRelatedField(
+        slug_field='code', queryset=ApplicationStatus.objects.all()
+    )
+
+    class Meta:
+        model = ApplicationStatusTransition
+        fields = ['id', 'from_status', 'to_status']
+
+
 class EducationLevelSerializer(serializers.ModelSerializer):
     class Meta:
         model = EducationLevel
@@ -84,36 +106,23 @@ class ApplicationCitySerializer(serializers.ModelSerializer):
 class AttachmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Attachment
-        fields = ['id', 'file', 'attachment_type']
+        fields = ['id', 'file', 'attachment_type', 'preview', 'thumbnail', 'preview_status']
+        read_only_fields = ['preview', 'thumbnail', 'preview_status']
 
 
 # 3. Главный сериализатор заявки
 class ApplicationSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
-    service_type = serializers.SlugRelatedField(
-        slug_field='code', queryset=ServiceType.objects.all()
-    )
-    status = serializers.SlugRelatedField(
-        slug_field='code', queryset=ApplicationStatus.objects.all(), required=False
-    )
-    birth_city = serializers.PrimaryKeyRelatedField(
-        queryset=City.objects.all(), allow_null=True, required=False
-    )
-    education_level = serializers.PrimaryKeyRelatedField(
-        queryset=EducationLevel.objects.all(), allow_null=True, required=False
-    )
-    specialization = serializers.PrimaryKeyRelatedField(
-        queryset=Specialization.objects.all(), allow_null=True, required=False
-    )
-    current_rank = serializers.PrimaryKeyRelatedField(
-        queryset=Rank.objects.all(), allow_null=True, required=False
-    )
-    preferred_branch = serializers.PrimaryKeyRelatedField(
-        queryset=MilitaryBranch.objects.all(), allow_null=True, required=False
-    )
-    health_status = serializers.PrimaryKeyRelatedField(
-        queryset=HealthStatusChoice.objects.all(), allow_null=True, required=False
-    )
+    # справочники проверяются по закэшированным картам (core.fields.ReferenceField):
+    # создание/изменение заявки не делает SELECT на каждое из этих полей
+    service_type = ReferenceField(ServiceType, key='code')
+    status = ReferenceField(ApplicationStatus, key='code', required=False)
+    birth_city = ReferenceField(City, allow_null=True, required=False)
+    education_level = ReferenceField(EducationLevel, allow_null=True, required=False)
+    specialization = ReferenceField(Specialization, allow_null=True, required=False)
+    current_rank = ReferenceField(Rank, allow_null=True, required=False)
+    preferred_branch = ReferenceField(MilitaryBranch, allow_null=True, required=False)
+    health_status = ReferenceField(HealthStatusChoice, allow_null=True, required=False)
 
     desired_cities = ApplicationCitySerializer(many=True, read_only=True)
     new_cities = serializers.ListField(
@@ -144,11 +153,40 @@ class ApplicationSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id','created_at','created_by','modified_at','modified_by','admin_comment','status']
 
-    def _save_cities(self, application, city_ids):
-        # чистим старые и создаём новые связи
-        ApplicationCity.objects.filter(application=application).delete()
-        for cid in city_ids:
-            ApplicationCity.objects.create(application=application, city_id=cid)
+    def validate_new_cities(self, city_ids):
+        # сверяем с закэшированным справочником — без запроса на каждый id
+        city_ids = list(dict.fromkeys(city_ids))
+        known = get_reference_map(City)
+        unknown = [cid for cid in city_ids if cid not in known]
+        if unknown:
+            raise serializers.ValidationError(f"Неизвестные города: {unknown}")
+        return city_ids
+
+    def _save_cities(self, application, city_ids, adding=False):
+        """
+        Синхронизирует желаемые города по разнице множеств: один bulk INSERT
+        для добавленных, один DELETE для убранных, ничего — если набор тот же.
+        """
+        new = set(city_ids)
+        old = set() if adding else set(
+            ApplicationCity.objects.filter(application=application).values_list('city_id', flat=True)
+        )
+        added, removed = new - old, old - new
+        if not added and not removed:
+            return
+        with transaction.atomic():
+            if removed:
+                ApplicationCity.objects.filter(application=application, city_id__in=removed).delete()
+            if added:
+                ApplicationCity.objects.bulk_create(
+                    [ApplicationCity(application=application, city_id=cid) for cid in added],
+                    ignore_conflicts=True,
+                )
+            if application.exist:
+                deltas = Counter()
+                deltas.subtract((ApplicationCounter.DESIRED_CITY, cid) for cid in removed)
+                deltas.update((ApplicationCounter.DESIRED_CITY, cid) for cid in added)
+                ApplicationCounter.objects.apply(deltas)
 
     def _save_files(self, application, files):
         for f in files:
@@ -164,13 +202,14 @@ class ApplicationSerializer(serializers.ModelSerializer):
         files = validated_data.pop('new_files', [])
         app = super().create(validated_data)
         if city_ids:
-            self._save_cities(app, city_ids)
+            self._save_cities(app, city_ids, adding=True)
         if files:
             self._save_files(app, files)
         return app
 
     def update(self, instance, validated_data):
-        city_ids = validated_data.pop('new_cities', [])
+        # None — поле не передали (PATCH без городов): города не трогаем
+        city_ids = validated_data.pop('new_cities', None)
         files = validated_data.pop('new_files', [])
         app = super().update(instance, validated_data)
         if city_ids is not None:
@@ -178,3 +217,55 @@ class ApplicationSerializer(serializers.ModelSerializer):
         if files:
             self._save_files(app, files)
         return app
+
+
+# 4. Импорт заявок из файла (manage.py import_applications)
+class ApplicationImportSerializer(serializers.ModelSerializer):
+    """
+    Проверяет «простые» поля строки импорта по тем же правилам модели,
+    что и ApplicationSerializer. Связи (service_type, города и т.п.)
+    команда сверяет со справочниками в памяти, а уникальность ИИН —
+    одним запросом на пачку, поэтому здесь нет ни одного обращения к БД.
+    """
+    class Meta:
+        model = Application
+        fields = [
+            'full_name', 'date_of_birth', 'email', 'phone', 'address', 'comment',
+            'graduation_place', 'sports_achievements', 'height_cm', 'weight_kg',
+            'has_conscript_certificate', 'has_military_ticket', 'has_military_faculty',
+            'health_comment', 'iin', 'has_deferment', 'deferment_reason', 'gpa',
+        ]
+        extra_kwargs = {
+            'iin': {'validators': Application._meta.get_field('iin').validators},
+        }
+
+
+# 5. Докачиваемая загрузка вложений
+class UploadSessionSerializer(serializers.ModelSerializer):
+    application = serializers.PrimaryKeyRelatedField(queryset=Application.objects.all())
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'application', 'attachment_type', 'filename', 'size',
+            'sha256', 'offset', 'attachment', 'created_at',
+        ]
+        read_only_fields = ['id', 'offset', 'attachment', 'created_at']
+
+    def validate_application(self, application):
+        user = self.context['request'].user
+        if not user.is_staff and application.user_id != user.pk:
+            raise serializers.ValidationError("Можно загружать файлы только в свои заявки.")
+        if not is_editable_by(application, user):
+            raise serializers.ValidationError("Заявка уже на рассмотрении — файлы добавлять нельзя.")
+        return application
+
+    def validate_size(self, size):
+        if size <= 0 or size > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Размер файла должен быть от 1 байта до {settings.UPLOAD_MAX_SIZE} байт."
+            )
+        return size
+
+    def validate_filename(self, filename):
+        return os.path.basename(filename)
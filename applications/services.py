@@ -0,0 +1,93 @@
+# applications/services.py
+
+from collections import Counter
+
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Application, ApplicationCounter, ApplicationStatusEvent, ApplicationStatusTransition
+
+# Сколько id обновлять одним UPDATE
+BULK_STATUS_CHUNK_SIZE = 1000
+
+
+def allowed_transition_q(new_status):
+    """
+    Условие «переход status -> new_status разрешён», вычисляемое в SQL:
+    есть явное правило, либо для текущего статуса правил нет вовсе.
+    """
+    outgoing = ApplicationStatusTransition.objects.filter(from_status=OuterRef('status'))
+    return Q(Exists(outgoing.filter(to_status=new_status))) | ~Q(Exists(outgoing))
+
+
+def _update_returning(queryset, values):
+    """
+    PostgreSQL: один запрос на пачку — блокируем строки, обновляем и
+    через RETURNING получаем (id, прежний status_id) именно изменённых заявок.
+    """
+    connection = connections[queryset.db]
+    locked = queryset.order_by().select_for_update().values('id', 'status_id')
+    inner_sql, inner_params = locked.query.get_compiler(using=queryset.db).as_sql()
+
+    qn = connection.ops.quote_name
+    table = qn(Application._meta.db_table)
+    assignments = ", ".join(f"{qn(column)} = %s" for column in values)
+    sql = (
+        f"WITH old AS ({inner_sql}) "
+        f"UPDATE {table} AS app SET {assignments} "
+        f"FROM old WHERE app.{qn('id')} = old.{qn('id')} "
+        f"RETURNING app.{qn('id')}, old.{qn('status_id')}"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (*inner_params, *values.values()))
+        return cursor.fetchall()
+
+
+def _update_portable(queryset, values):
+    rows = list(queryset.order_by().select_for_update().values_list('id', 'status_id'))
+    Application.objects.filter(id__in=[row[0] for row in rows]).update(**values)
+    return rows
+
+
+def bulk_change_status(ids, new_status, admin_comment, user):
+    """
+    Переводит заявки ids в new_status одной транзакцией и пишет историю
+    статусов и сдвиг счётчиков той же транзакцией. Пропускает удалённые, уже находящиеся
+    в new_status и те, для которых переход запрещён.
+    Возвращает [(id, прежний status_id)] изменённых заявок.
+    """
+    values = {
+        'status_id': new_status.pk,
+        'admin_comment': admin_comment,
+        'modified_by_id': user.pk,
+        'modified_at': timezone.now(),
+    }
+    changed = []
+    with transaction.atomic():
+        for start in range(0, len(ids), BULK_STATUS_CHUNK_SIZE):
+            chunk = ids[start:start + BULK_STATUS_CHUNK_SIZE]
+            queryset = (
+                Application.objects.filter(id__in=chunk)
+                .exclude(status=new_status)
+                .filter(allowed_transition_q(new_status))
+            )
+            if connections[queryset.db].vendor == 'postgresql':
+                rows = _update_returning(queryset, values)
+            else:
+                rows = _update_portable(queryset, values)
+            ApplicationStatusEvent.objects.bulk_create([
+                ApplicationStatusEvent(
+                    application_id=app_id,
+                    from_status_id=old_status_id,
+                    to_status_id=new_status.pk,
+                    changed_by_id=user.pk,
+                    changed_at=values['modified_at'],
+                )
+                for app_id, old_status_id in rows
+            ])
+            deltas = Counter({(ApplicationCounter.STATUS, new_status.pk): len(rows)})
+            deltas.subtract((ApplicationCounter.STATUS, old_status_id) for _, old_status_id in rows)
+            ApplicationCounter.objects.apply(deltas)
+            changed += rows
+    return changed
@@ -1,3 +1,1101 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import os
+import tempfile
+import unittest
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+try:
+    import openpyxl
+except ImportError:  # XLSX-выгрузка необязательна
+    openpyxl = None
+
+try:
+    from PIL import Image
+except ImportError:  # превью необязательны
+    Image = None
+
+from core.archive import copy_to_archive
+from core.cache import get_reference_map
+from core.models import City
+
+from .export import EXPORT_COLUMNS
+from .management.commands.create_status_event_partitions import add_months
+from .models import (
+    Application, ApplicationCity, ApplicationCounter, ApplicationDailyStat, ApplicationStatus,
+    ApplicationStatusEvent, ApplicationStatusTransition, ArchivedApplication,
+    ArchivedApplicationCity, ArchivedAttachment, Attachment, EducationLevel, HealthStatusChoice,
+    MilitaryBranch, Rank, ServiceType, Specialization,
+)
+from .uploads import write_chunk
+from .views import DICTIONARY_BUNDLE
+
+User = get_user_model()
+
+_numbers = itertools.count(1)
+
+
+def make_user(**kwargs):
+    n = next(_numbers)
+    kwargs.setdefault('username', f'user{n}')
+    kwargs.setdefault('email', f'user{n}@example.com')
+    kwargs.setdefault('phone', f'+7{n:010d}')
+    return User.objects.create_user(password='pass12345', **kwargs)
+
+
+def make_references():
+    """
+    Минимальные справочники. pk статусов заданы явно: «new» должен иметь
+    pk=1 — это default у Application.status.
+    """
+    statuses = {
+        code: ApplicationStatus.objects.create(pk=pk, code=code, name=code)
+        for pk, code in enumerate(('new', 'review', 'approved'), start=1)
+    }
+    service_types = {
+        code: ServiceType.objects.create(code=code, name=code, description='')
+        for code in ('contract', 'conscription')
+    }
+    cities = [City.objects.create(name=name) for name in ('Астана', 'Алматы', 'Шымкент')]
+    return SimpleNamespace(statuses=statuses, service_types=service_types, cities=cities)
+
+
+def make_application(user, refs, **kwargs):
+    n = next(_numbers)
+    kwargs.setdefault('service_type', refs.service_types['contract'])
+    kwargs.setdefault('status', refs.statuses['new'])
+    kwargs.setdefault('full_name', f'Заявитель {n}')
+    kwargs.setdefault('date_of_birth', date(2000, 1, 1))
+    kwargs.setdefault('email', f'app{n}@example.com')
+    kwargs.setdefault('phone', f'+7{n:010d}')
+    kwargs.setdefault('address', '-')
+    kwargs.setdefault('iin', f'{n:012d}')
+    return Application.objects.create(user=user, created_by=user, modified_by=user, **kwargs)
+
+
+class CacheTestCase(APITestCase):
+    """Кэш (LocMem) переживает тесты — начинаем каждый с пустого."""
+
+    def setUp(self):
+        cache.clear()
+
+
+class ReferenceListCacheTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(make_user(is_staff=True))
+        City.objects.create(name='Астана')
+
+    def test_second_list_is_served_from_cache(self):
+        first = self.client.get('/api/cities/', HTTP_ACCEPT='application/json')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/cities/', HTTP_ACCEPT='application/json')
+        self.assertEqual(first.content, second.content)
+
+    def test_change_bumps_version_and_drops_cached_list(self):
+        self.client.get('/api/cities/', HTTP_ACCEPT='application/json')
+        with self.captureOnCommitCallbacks(execute=True):
+            City.objects.create(name='Алматы')
+        names = [c['name'] for c in self.client.get('/api/cities/', HTTP_ACCEPT='application/json').json()]
+        self.assertIn('Алматы', names)
+
+    def test_soft_delete_drops_cached_list(self):
+        city = City.objects.get(name='Астана')
+        self.client.get('/api/cities/', HTTP_ACCEPT='application/json')
+        with self.captureOnCommitCallbacks(execute=True):
+            city.delete()
+        self.assertEqual(self.client.get('/api/cities/', HTTP_ACCEPT='application/json').json(), [])
+
+    def test_other_models_keep_their_cache(self):
+        ApplicationStatus.objects.create(code='new', name='Новая')
+        self.client.get('/api/statuses/', HTTP_ACCEPT='application/json')
+        with self.captureOnCommitCallbacks(execute=True):
+            City.objects.create(name='Алматы')
+        with self.assertNumQueries(0):
+            self.client.get('/api/statuses/', HTTP_ACCEPT='application/json')
+
+
+class DictionaryBundleTests(CacheTestCase):
+    url = '/api/dictionaries/'
+
+    def setUp(self):
+        super().setUp()
+        City.objects.create(name='Астана')
+
+    def test_bundle_contains_all_dictionaries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), set(DICTIONARY_BUNDLE))
+        self.assertEqual(response.json()['cities'][0]['name'], 'Астана')
+
+    def test_matching_etag_returns_304_with_vary(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_etag_changes_with_dictionary(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            City.objects.create(name='Алматы')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_gzip_only_when_accepted(self):
+        cases = {
+            'gzip': True,
+            'br, gzip;q=0.5': True,
+            '*': True,
+            'gzip;q=0': False,
+            'gzip;q=0, *': False,
+            'identity': False,
+            '': False,
+        }
+        for header, compressed in cases.items():
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_ACCEPT_ENCODING=header)
+                self.assertEqual(response.get('Content-Encoding') == 'gzip', compressed)
+                self.assertIn('Accept-Encoding', response['Vary'])
+                body = gzip.decompress(response.content) if compressed else response.content
+                self.assertIn('Астана', json.loads(body)['cities'][0]['name'])
+
+
+class ApplicationListQueryCountTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.refs = make_references()
+        self.owner = make_user()
+
+    def _add_applications(self, count):
+        for _ in range(count):
+            app = make_application(self.owner, self.refs)
+            ApplicationCity.objects.bulk_create(
+                ApplicationCity(application=app, city=city) for city in self.refs.cities[:2]
+            )
+            Attachment.objects.create(application=app, file='applications/x.pdf')
+
+    def _list_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), len(response.json()['results'])
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for url, user in (('/api/applications/', self.owner),
+                          ('/api/admin/applications/', make_user(is_staff=True))):
+            with self.subTest(url=url):
+                self.client.force_authenticate(user)
+                Application.all_objects.all().delete()
+                self._add_applications(1)
+                small, shown = self._list_queries(url)
+                self.assertEqual(shown, 1)
+                self._add_applications(14)
+                large, shown = self._list_queries(url)
+                self.assertEqual(shown, 15)
+                self.assertEqual(small, large)
+
+    def test_list_uses_three_queries(self):
+        # страница заявок (JOIN статуса и типа) + prefetch городов + prefetch вложений
+        self.client.force_authenticate(make_user(is_staff=True))
+        self._add_applications(5)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/admin/applications/')
+        app = response.json()['results'][0]
+        self.assertEqual(len(app['desired_cities']), 2)
+        self.assertEqual(len(app['attachments']), 1)
+
+
+class ApplicationCursorPaginationTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.refs = make_references()
+        self.client.force_authenticate(make_user(is_staff=True))
+        owner = make_user()
+        self.apps = [make_application(owner, self.refs) for _ in range(5)]
+
+    def _walk(self, url):
+        ids = []
+        while url:
+            data = self.client.get(url).json()
+            ids += [item['id'] for item in data['results']]
+            url = data['next']
+        return ids
+
+    def test_pages_cover_all_rows_newest_first(self):
+        ids = self._walk('/api/admin/applications/?page_size=2')
+        expected = [app.pk for app in sorted(
+            self.apps, key=lambda a: (a.created_at, a.pk), reverse=True)]
+        self.assertEqual(ids, expected)
+
+    def test_new_rows_do_not_shift_next_pages(self):
+        first = self.client.get('/api/admin/applications/?page_size=2').json()
+        make_application(make_user(), self.refs)
+        seen = [item['id'] for item in first['results']] + self._walk(first['next'])
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(set(seen), {app.pk for app in self.apps})
+
+    def test_rows_with_equal_created_at_are_paged_once(self):
+        owner = make_user()
+        self.apps += [make_application(owner, self.refs) for _ in range(7)]
+        created_at = timezone.now()
+        Application.objects.update(created_at=created_at)
+        ids = self._walk('/api/admin/applications/?page_size=3')
+        self.assertEqual(ids, sorted((app.pk for app in self.apps), reverse=True))
+
+    def test_ordering_param_is_ignored(self):
+        ids = self._walk('/api/admin/applications/?page_size=2&ordering=full_name')
+        self.assertEqual(ids, self._walk('/api/admin/applications/?page_size=2'))
+
+    def test_total_estimate_only_on_request(self):
+        data = self.client.get('/api/admin/applications/').json()
+        self.assertNotIn('total_estimate', data)
+        data = self.client.get('/api/admin/applications/?with_total=true').json()
+        self.assertEqual(data['total_estimate'], 5)
+
+
+class ApplicationExportTests(CacheTestCase):
+    url = '/api/admin/applications/export/'
+
+    def setUp(self):
+        super().setUp()
+        self.refs = make_references()
+        self.client.force_authenticate(make_user(is_staff=True))
+        owner = make_user()
+        self.app = make_application(owner, self.refs, full_name='Иванов Иван', birth_city=self.refs.cities[0])
+        ApplicationCity.objects.create(application=self.app, city=self.refs.cities[1])
+        make_application(owner, self.refs, status=self.refs.statuses['review'])
+
+    def _csv_rows(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        text = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(text.startswith('\ufeff'))
+        return list(csv.reader(io.StringIO(text.lstrip('\ufeff'))))
+
+    def test_csv_streams_all_rows(self):
+        rows = self._csv_rows(self.client.get(self.url))
+        self.assertEqual(rows[0], EXPORT_COLUMNS)
+        self.assertEqual(len(rows), 3)
+        row = dict(zip(rows[0], next(r for r in rows[1:] if r[0] == str(self.app.pk))))
+        self.assertEqual(row['ФИО'], 'Иванов Иван')
+        self.assertEqual(row['Город рождения'], 'Астана')
+        self.assertEqual(row['Желаемые города'], 'Алматы')
+
+    def test_csv_applies_list_filters(self):
+        rows = self._csv_rows(self.client.get(self.url, {'status': 'review'}))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][rows[0].index('Статус')], 'review')
+
+    @unittest.skipIf(openpyxl is None, "openpyxl не установлен")
+    def test_xlsx(self):
+        response = self.client.get(self.url, {'file_format': 'xlsx'})
+        self.assertEqual(response.status_code, 200)
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        rows = list(workbook.active.values)
+        self.assertEqual(list(rows[0]), EXPORT_COLUMNS)
+        self.assertEqual(len(rows), 3)
+
+    def test_unknown_format_and_non_staff(self):
+        self.assertEqual(self.client.get(self.url, {'file_format': 'pdf'}).status_code, 400)
+        self.client.force_authenticate(make_user())
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class ImportApplicationsTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.refs = make_references()
+        self.user = make_user()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _row(self, n, **extra):
+        return {
+            'service_type': 'contract', 'full_name': f'Импорт {n}', 'date_of_birth': '2000-01-01',
+            'email': f'import{n}@example.com', 'phone': '+77000000000', 'address': '-',
+            'iin': f'9{n:011d}', **extra,
+        }
+
+    def _import(self, name, content, *args):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as fh:
+            fh.write(content)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_applications', path, '--user', self.user.email, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_creates_applications_with_cities_history_and_counters(self):
+        city = self.refs.cities[0]
+        rows = [self._row(1, new_cities=f'{city.pk}'), self._row(2)]
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+        out, err = self._import('apps.csv', buffer.getvalue())
+
+        self.assertEqual(err, '')
+        self.assertEqual(Application.objects.count(), 2)
+        app = Application.objects.get(iin='900000000001')
+        self.assertEqual(list(app.desired_cities.values_list('city_id', flat=True)), [city.pk])
+        self.assertEqual(ApplicationStatusEvent.objects.filter(application=app).count(), 1)
+        self.assertEqual(
+            ApplicationCounter.objects.get(dimension=ApplicationCounter.STATUS, bucket=1).count, 2
+        )
+
+    def test_jsonl_bad_lines_are_reported_and_skipped(self):
+        lines = [
+            json.dumps(self._row(1)),
+            '{"broken": ',
+            '',
+            '["not", "an", "object"]',
+            json.dumps(self._row(2, service_type='unknown')),
+            json.dumps(self._row(3, iin='900000000001')),  # дубль ИИН в файле
+            json.dumps(self._row(4, new_cities='1')),
+            json.dumps(self._row(5)),
+        ]
+        out, err = self._import('apps.jsonl', '\n'.join(lines))
+
+        self.assertEqual(
+            sorted(Application.objects.values_list('iin', flat=True)), ['900000000001', '900000000005']
+        )
+        reported = [int(line.split(':')[0].split()[1]) for line in err.splitlines()]
+        self.assertEqual(sorted(reported), [2, 4, 5, 6, 7])
+        self.assertIn('Некорректный JSON', err)
+        self.assertIn('Ожидается объект', err)
+        self.assertIn('Создано: 2, с ошибками: 5', out)
+
+    def test_non_integer_reference_ids_are_rejected(self):
+        city = self.refs.cities[0].pk
+        lines = [
+            json.dumps(self._row(1, birth_city=city + 0.9)),
+            json.dumps(self._row(2, birth_city=True)),
+            json.dumps(self._row(3, new_cities=[city + 0.9])),
+            json.dumps(self._row(4, new_cities=[True])),
+            json.dumps(self._row(5, birth_city=str(city), new_cities=[city, str(city)])),
+        ]
+        out, err = self._import('apps.jsonl', '\n'.join(lines))
+
+        app = Application.objects.get()
+        self.assertEqual((app.iin, app.birth_city_id), ('900000000005', city))
+        self.assertEqual(list(app.desired_cities.values_list('city_id', flat=True)), [city])
+        self.assertEqual(err.count('birth_city: Ожидается целый id'), 2)
+        self.assertEqual(err.count('new_cities: Ожидаются целые id'), 2)
+        self.assertIn('Создано: 1, с ошибками: 4', out)
+
+    def test_dry_run_writes_nothing(self):
+        out, _ = self._import('apps.jsonl', json.dumps(self._row(1)), '--dry-run')
+        self.assertIn('Проверено: 1', out)
+        self.assertFalse(Application.all_objects.exists())
+
+
+class BulkUpdateStatusTests(CacheTestCase):
+    url = '/api/admin/applications/bulk_update_status/'
+
+    def setUp(self):
+        super().setUp()
+        self.refs = make_references()
+        self.admin = make_user(is_staff=True)
+        self.client.force_authenticate(self.admin)
+        owner = make_user()
+        self.apps = [make_application(owner, self.refs) for _ in range(3)]
+
+    def _post(self, ids, status='review', **kwargs):
+        return self.client.post(self.url, {'ids': ids, 'status': status}, format='json', **kwargs)
+
+    def test_updates_and_reports_per_id(self):
+        a, b, c = self.apps
+        b.delete()
+        response = self._post([a.pk, b.pk, a.pk, 999999])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'updated': 1, 'updated_ids': [a.pk], 'skipped_ids': [b.pk, 999999],
+        })
+        a.refresh_from_db()
+        c.refresh_from_db()
+        self.assertEqual(a.status.code, 'review')
+        self.assertEqual(a.modified_by, self.admin)
+        self.assertEqual(c.status.code, 'new')
+
+        event = ApplicationStatusEvent.objects.filter(application=a).latest('id')
+        self.assertEqual((event.from_status_id, event.to_status_id), (1, 2))
+        counts = dict(ApplicationCounter.objects.filter(
+            dimension=ApplicationCounter.STATUS).values_list('bucket', 'count'))
+        self.assertEqual((counts[1], counts[2]), (1, 1))
+
+    def test_disallowed_transition_is_skipped(self):
+        ApplicationStatusTransition.objects.create(
+            from_status=self.refs.statuses['new'], to_status=self.refs.statuses['review'],
+        )
+        response = self._post([app.pk for app in self.apps], status='approved')
+        self.assertEqual(response.json()['updated'], 0)
+        self.assertFalse(Application.objects.filter(status__code='approved').exists())
+
+    def test_ids_must_be_a_list_of_integers(self):
+        a = self.apps[0]
+        for ids in (str(a.pk), a.pk, [1.9], [True], ['x'], [None], {'id': a.pk}):
+            with self.subTest(ids=ids):
+                self.assertEqual(self._post(ids).status_code, 400)
+        self.assertFalse(Application.objects.filter(status__code='review').exists())
+
+    def test_form_encoded_ids(self):
+        a, b, _ = self.apps
+        response = self.client.post(self.url, {'ids': [str(a.pk), str(b.pk)], 'status': 'review'})
+        self.assertEqual(response.json()['updated_ids'], [a.pk, b.pk])
+
+    def test_unknown_status_and_non_staff(self):
+        self.assertEqual(self._post([self.apps[0].pk], status='nope').status_code, 400)
+        self.client.force_authenticate(make_user())
+        self.assertEqual(self._post([self.apps[0].pk]).status_code, 403)
+
+
+class StatusEventTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.refs = make_references()
+        self.app = make_application(make_user(), self.refs)
+
+    def _events(self):
+        return list(ApplicationStatusEvent.objects.filter(application_id=self.app.pk)
+                    .order_by('id').values_list('from_status_id', 'to_status_id'))
+
+    def test_events_on_create_and_status_change_only(self):
+        self.app.full_name = 'Другое имя'
+        self.app.save()
+        self.app.status = self.refs.statuses['review']
+        self.app.save()
+        self.assertEqual(self._events(), [(None, 1), (1, 2)])
+
+    def test_admin_patch_records_admin_as_author(self):
+        admin = make_user(is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.patch(
+            f'/api/admin/applications/{self.app.pk}/', {'status': 'review'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        event = ApplicationStatusEvent.objects.filter(application_id=self.app.pk).latest('id')
+        self.assertEqual((event.to_status_id, event.changed_by_id), (2, admin.pk))
+
+    def test_history_is_append_only_and_outlives_application(self):
+        event = ApplicationStatusEvent.objects.get(application_id=self.app.pk)
+        with self.assertRaises(ValueError):
+            event.save()
+        Application.all_objects.filter(pk=self.app.pk).delete()
+        self.assertEqual(self._events(), [(None, 1)])
+
+    def test_add_months(self):
+        self.assertEqual(add_months(date(2026, 11, 15), 1), date(2026, 12, 1))
+        self.assertEqual(add_months(date(2026, 12, 1), 1), date(2027, 1, 1))
+        self.assertEqual(add_months(date(2026, 1, 31), 14), date(2027, 3, 1))
+
+    @unittest.skipIf(connection.vendor == 'postgresql', "только для СУБД без секций")
+    def test_partition_command_is_noop_without_postgres(self):
+        out = io.StringIO()
+        call_command('create_status_event_partitions', stdout=out)
+        self.assertIn('только в PostgreSQL', out.getvalue())
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', "секции есть только в PostgreSQL")
+    def test_events_are_routed_to_monthly_partition(self):
+        table = ApplicationStatusEvent._meta.db_table
+        month = timezone.now().date().replace(day=1)
+        call_command('create_status_event_partitions', '--months-ahead', '0', stdout=io.StringIO())
+        self.app.status = self.refs.statuses['review']
+        self.app.save()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT tableoid::regclass::text FROM "{table}" WHERE application_id = %s',
+                [self.app.pk],
+            )
+            partitions = {row[0].strip('"') for row in cursor.fetchall()}
+        # событие создания попало в DEFAULT и было перенесено командой
+        self.assertEqual(partitions, {f"{table}_{month:%Y_%m}"})
+
+
+class MediaTestCase(CacheTestCase):
+    """Файлы вложений и сессий загрузки — во временном каталоге теста."""
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(
+            MEDIA_ROOT=tmp.name, UPLOAD_SESSION_DIR=os.path.join(tmp.name, 'sessions'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+def make_attachment(application, content, name='scan.pdf'):
+    user = application.user
+    return Attachment.objects.create(
+        application=application, file=ContentFile(content, name=name),
+        attachment_type='diploma', created_by=user, modified_by=user,
+    )
+
+
+class UploadSessionTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.refs = make_references()
+        self.owner = make_user()
+        self.app = make_application(self.owner, self.refs)
+        self.client.force_authenticate(self.owner)
+        self.data = b'0123456789abcdef'
+
+    def _start(self, application=None):
+        return self.client.post('/api/uploads/', {
+            'application': (application or self.app).pk, 'attachment_type': 'diploma',
+            'filename': 'scan.pdf', 'size': len(self.data),
+            'sha256': hashlib.sha256(self.data).hexdigest(),
+        }, format='json')
+
+    def _chunk(self, session_id, offset, data):
+        return self.client.generic(
+            'PUT', f'/api/uploads/{session_id}/chunk/', data,
+            content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def _finalize(self, session_id):
+        return self.client.post(f'/api/uploads/{session_id}/finalize/')
+
+    def test_chunks_then_finalize(self):
+        sid = self._start().json()['id']
+        self.assertEqual(self._chunk(sid, 0, self.data[:10]).json()['offset'], 10)
+        self.assertEqual(self._finalize(sid).status_code, 409)
+        self.assertEqual(self._chunk(sid, 10, self.data[10:]).json()['offset'], 16)
+        response = self._finalize(sid)
+        self.assertEqual(response.status_code, 201)
+        attachment = Attachment.objects.get(pk=response.json()['id'])
+        with attachment.file.open('rb') as fh:
+            self.assertEqual(fh.read(), self.data)
+        self.assertEqual(os.listdir(settings.UPLOAD_SESSION_DIR), [])
+
+    def test_wrong_offset_is_rejected(self):
+        sid = self._start().json()['id']
+        self._chunk(sid, 0, self.data[:4])
+        response = self._chunk(sid, 8, self.data[8:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 4)
+
+    def test_concurrent_chunk_loses_compare_and_swap(self):
+        sid = self._start().json()['id']
+
+        def racing_write(session, stream, length):
+            # пока этот запрос принимал байты, другой уже записал кусок с тем же offset
+            result = write_chunk(session, stream, length)
+            patcher.stop()
+            self.assertEqual(self._chunk(sid, 0, self.data[:6]).status_code, 200)
+            return result
+
+        patcher = mock.patch('applications.views.write_chunk', side_effect=racing_write)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        response = self._chunk(sid, 0, b'x' * 10)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 6)
+        self.assertEqual(self._chunk(sid, 6, self.data[6:]).status_code, 200)
+        self.assertEqual(self._finalize(sid).status_code, 201)
+        self.assertEqual(
+            [name for name in os.listdir(settings.UPLOAD_SESSION_DIR) if name.endswith('.chunk')], []
+        )
+
+    def test_application_under_review_is_read_only(self):
+        sid = self._start().json()['id']
+        self._chunk(sid, 0, self.data[:4])
+        Application.objects.filter(pk=self.app.pk).update(status=self.refs.statuses['review'])
+
+        self.assertEqual(self._chunk(sid, 4, self.data[4:]).status_code, 403)
+        self.assertEqual(self._finalize(sid).status_code, 403)
+        self.assertEqual(self.client.get(f'/api/uploads/{sid}/').json()['offset'], 4)
+        self.assertEqual(self._start().status_code, 400)
+
+        other = make_application(self.owner, self.refs)
+        self.assertEqual(self._start(other).status_code, 201)
+
+    def test_owner_edits_only_new_application(self):
+        url = f'/api/applications/{self.app.pk}/'
+        self.assertEqual(self.client.patch(url, {'comment': 'ok'}, format='json').status_code, 200)
+        Application.objects.filter(pk=self.app.pk).update(status=self.refs.statuses['review'])
+        self.assertEqual(self.client.patch(url, {'comment': 'no'}, format='json').status_code, 403)
+
+
+class ContentAddressedStorageTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        refs = make_references()
+        owner = make_user()
+        self.apps = [make_application(owner, refs) for _ in range(2)]
+
+    def _gc(self, *args):
+        call_command('gc_attachment_blobs', '--grace', '0', *args, stdout=io.StringIO())
+
+    def test_same_content_is_stored_once(self):
+        first = make_attachment(self.apps[0], b'same bytes', name='a.pdf')
+        second = make_attachment(self.apps[1], b'same bytes', name='b.pdf')
+        other = make_attachment(self.apps[1], b'other bytes', name='a.pdf')
+
+        digest = hashlib.sha256(b'same bytes').hexdigest()
+        self.assertEqual(first.sha256, digest)
+        self.assertEqual(first.file.name, f'cas/{digest[:2]}/{digest[2:4]}/{digest}.pdf')
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertNotEqual(other.file.name, first.file.name)
+        with second.file.open('rb') as fh:
+            self.assertEqual(fh.read(), b'same bytes')
+
+    def test_gc_removes_blob_without_live_references(self):
+        first = make_attachment(self.apps[0], b'shared')
+        second = make_attachment(self.apps[1], b'shared')
+        storage = first.file.storage
+
+        first.delete()
+        self._gc()
+        self.assertTrue(storage.exists(first.file.name))  # на файл ещё ссылается second
+
+        second.delete()
+        self._gc('--dry-run')
+        self.assertTrue(storage.exists(first.file.name))
+        self._gc()
+        self.assertFalse(storage.exists(first.file.name))
+
+    def test_gc_keeps_only_files_of_live_archived_attachments(self):
+        kept = make_attachment(self.apps[0], b'archived live')
+        dropped = make_attachment(self.apps[1], b'archived dead')
+        dropped.delete()
+        # вложение удалённой заявки уходит в архив живым, удалённое — с exist=False
+        copy_to_archive(Attachment.all_objects.filter(pk__in=[kept.pk, dropped.pk]))
+        Attachment.all_objects.filter(pk__in=[kept.pk, dropped.pk]).delete()
+
+        self._gc()
+        storage = kept.file.storage
+        self.assertTrue(storage.exists(kept.file.name))
+        self.assertFalse(storage.exists(dropped.file.name))
+
+    def test_gc_respects_grace_period(self):
+        attachment = make_attachment(self.apps[0], b'fresh')
+        attachment.delete()
+        call_command('gc_attachment_blobs', stdout=io.StringIO())
+        self.assertTrue(attachment.file.storage.exists(attachment.file.name))
+
+
+@unittest.skipIf(Image is None, "для превью нужен Pillow")
+class AttachmentPreviewTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = make_application(make_user(), make_references())
+
+    def _image(self, size=(2400, 1200)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def _process(self):
+        call_command(
+            'process_attachment_previews', '--workers', '1', stdout=io.StringIO(), stderr=io.StringIO()
+        )
+
+    def test_only_images_are_queued(self):
+        self.assertEqual(make_attachment(self.app, self._image(), 'photo.PNG').preview_status, 'pending')
+        self.assertEqual(make_attachment(self.app, b'%PDF-1.4', 'scan.pdf').preview_status, '')
+
+    def test_previews_are_built_and_downscaled(self):
+        attachment = make_attachment(self.app, self._image(), 'photo.png')
+        self._process()
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.preview_status, Attachment.PREVIEW_DONE)
+        for field, longest in ((attachment.preview, 1600), (attachment.thumbnail, 320)):
+            with field.open('rb') as fh, Image.open(fh) as image:
+                self.assertEqual(max(image.size), longest)
+
+    def test_exif_is_applied_and_stripped(self):
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'  # Make
+        exif[0x0112] = 6  # Orientation: повернуть на 90°
+        buffer = io.BytesIO()
+        Image.new('RGB', (2400, 1200), (200, 30, 30)).save(buffer, 'JPEG', exif=exif)
+        attachment = make_attachment(self.app, buffer.getvalue(), 'photo.jpg')
+        self._process()
+        attachment.refresh_from_db()
+        for field in (attachment.preview, attachment.thumbnail):
+            with field.open('rb') as fh, Image.open(fh) as image:
+                self.assertNotIn('exif', image.info)
+                self.assertEqual(dict(image.getexif()), {})
+                self.assertLess(image.width, image.height)
+
+    def test_broken_image_is_marked_failed(self):
+        attachment = make_attachment(self.app, b'not an image', 'photo.jpg')
+        self._process()
+        attachment.refresh_from_db()
+        self.assertEqual(attachment.preview_status, Attachment.PREVIEW_FAILED)
+        self.assertFalse(attachment.preview)
+
+
+class AttachmentDownloadTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_user()
+        app = make_application(self.owner, make_references())
+        self.attachment = make_attachment(app, b'0123456789')
+        self.url = f'/api/attachments/{self.attachment.pk}/download/'
+        self.client.force_authenticate(self.owner)
+
+    def test_owner_and_staff_download(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertIn(f'diploma_{self.attachment.pk}.pdf', response['Content-Disposition'])
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        self.client.force_authenticate(make_user(is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_other_user_gets_not_found(self):
+        self.client.force_authenticate(make_user())
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_range_requests(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'789')
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=20-').status_code, 416)
+
+    @override_settings(SENDFILE_BACKEND='nginx', SENDFILE_NGINX_PREFIX='/protected-media/')
+    def test_nginx_gets_internal_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.attachment.file.name)
+        self.assertEqual(response.content, b'')
+
+    def test_missing_variant(self):
+        self.assertEqual(self.client.get(self.url, {'variant': 'preview'}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'variant': 'original'}).status_code, 400)
+
+
+class ApplicationCounterTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.refs = make_references()
+        self.owner = make_user()
+
+    def _snapshot(self):
+        return set(ApplicationCounter.objects.filter(count__gt=0)
+                   .values_list('dimension', 'bucket', 'count'))
+
+    def test_incremental_updates_match_rebuild(self):
+        astana, almaty, shymkent = self.refs.cities
+        a = make_application(self.owner, self.refs, birth_city=astana)
+        b = make_application(self.owner, self.refs)
+        c = make_application(self.owner, self.refs, birth_city=almaty)
+
+        self.client.force_authenticate(self.owner)
+        url = f'/api/applications/{a.pk}/'
+        for cities in ([almaty.pk, shymkent.pk], [shymkent.pk]):
+            response = self.client.patch(url, {'new_cities': cities}, format='json')
+            self.assertEqual(response.status_code, 200)
+
+        b.status = self.refs.statuses['review']
+        b.service_type = self.refs.service_types['conscription']
+        b.save()
+        c.delete()
+        a.delete()
+        a.exist = True
+        a.save()
+
+        incremental = self._snapshot()
+        self.assertIn((ApplicationCounter.STATUS, self.refs.statuses['new'].pk, 1), incremental)
+        self.assertIn((ApplicationCounter.DESIRED_CITY, shymkent.pk, 1), incremental)
+        self.assertIn((ApplicationCounter.BIRTH_CITY, 0, 1), incremental)
+        call_command('rebuild_application_counters', stdout=io.StringIO())
+        self.assertEqual(self._snapshot(), incremental)
+
+    def test_counters_endpoint(self):
+        make_application(self.owner, self.refs, birth_city=self.refs.cities[0])
+        make_application(self.owner, self.refs, status=self.refs.statuses['review'])
+        url = '/api/admin/applications/counters/'
+
+        self.client.force_authenticate(self.owner)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.client.force_authenticate(make_user(is_staff=True))
+        data = self.client.get(url).json()
+        self.assertCountEqual(data['status'], [
+            {'id': 1, 'name': 'new', 'count': 1}, {'id': 2, 'name': 'review', 'count': 1},
+        ])
+        self.assertCountEqual(data['birth_city'], [
+            {'id': self.refs.cities[0].pk, 'name': 'Астана', 'count': 1},
+            {'id': None, 'name': None, 'count': 1},
+        ])
+        self.assertEqual(data['desired_city'], [])
+
+
+class DailyStatRollupTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.refs = make_references()
+        owner = make_user()
+        self.old_day = timezone.localdate() - timedelta(days=10)
+        created = timezone.now() - timedelta(days=10)
+        self.old = [make_application(owner, self.refs) for _ in range(2)]
+        # давно поданные и с тех пор не менявшиеся заявки
+        Application.all_objects.filter(pk__in=[a.pk for a in self.old]).update(
+            created_at=created, modified_at=created,
+        )
+        make_application(owner, self.refs)
+
+    def _rollup(self, *args):
+        call_command('rollup_application_stats', *args, stdout=io.StringIO())
+
+    def _counts(self):
+        return dict(ApplicationDailyStat.objects.values_list('day').annotate(n=Sum('count')))
+
+    def test_backfill_and_nightly_run(self):
+        self._rollup('--since', str(self.old_day))
+        self.assertEqual(self._counts(), {self.old_day: 2, timezone.localdate(): 1})
+
+        make_application(self.old[0].user, self.refs)
+        self._rollup()
+        self.assertEqual(self._counts(), {self.old_day: 2, timezone.localdate(): 2})
+
+    def test_soft_delete_of_old_application_is_rolled_up(self):
+        self._rollup('--since', str(self.old_day))
+        self.old[0].delete()
+        self._rollup()
+        self.assertEqual(self._counts()[self.old_day], 1)
+
+    def test_timeseries_endpoint(self):
+        self._rollup('--since', str(self.old_day))
+        self.client.force_authenticate(make_user(is_staff=True))
+        response = self.client.get('/api/admin/applications/timeseries/', {'interval': 'month'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(row['count'] for row in response.json()['results']), 3)
+        self.assertEqual(
+            self.client.get('/api/admin/applications/timeseries/', {'interval': 'year'}).status_code, 400
+        )
+
+
+class ApplicationSearchTests(CacheTestCase):
+    url = '/api/admin/applications/search/'
+
+    def setUp(self):
+        super().setUp()
+        refs = make_references()
+        owner = make_user()
+        self.ivanov = make_application(
+            owner, refs, full_name='Иванов Пётр', email='ivanov@example.com',
+            iin='990101300123', phone='+77011234567',
+        )
+        self.sidorov = make_application(
+            owner, refs, full_name='Сидоров Иван', email='sidorov@example.com',
+            iin='880202400456', phone='+77029876543',
+        )
+        self.client.force_authenticate(make_user(is_staff=True))
+
+    def _found(self, q, **params):
+        response = self.client.get(self.url, {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.json()['results']]
+
+    def test_number_prefix_matches_iin_and_phone(self):
+        self.assertEqual(self._found('990101'), [self.ivanov.pk])
+        for q in ('+7701123', '7701123', '8701123', '701123'):
+            with self.subTest(q=q):
+                self.assertEqual(self._found(q), [self.ivanov.pk])
+
+    def test_soft_deleted_are_not_found(self):
+        self.ivanov.delete()
+        self.assertEqual(self._found('990101'), [])
+
+    @unittest.skipIf(connection.vendor == 'postgresql', "на PostgreSQL — полнотекстовый поиск")
+    def test_text_fallback_matches_all_words(self):
+        self.assertEqual(self._found('Иван'), [self.ivanov.pk, self.sidorov.pk])
+        self.assertEqual(self._found('Иван Пётр'), [self.ivanov.pk])
+        self.assertEqual(self._found('sidorov@'), [self.sidorov.pk])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', "нужны tsvector и pg_trgm")
+    def test_full_text_and_typos(self):
+        self.assertEqual(self._found('петр иван')[0], self.ivanov.pk)
+        self.assertEqual(self._found('Сидоров Иавн')[0], self.sidorov.pk)
+
+    def test_validation_and_limit(self):
+        self.assertEqual(self.client.get(self.url, {'q': 'И'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'Иван', 'limit': 'x'}).status_code, 400)
+        self.assertEqual(len(self._found('+770', limit=1)), 1)
+
+
+class FacetCountTests(CacheTestCase):
+    url = '/api/admin/applications/facets/'
+
+    def setUp(self):
+        super().setUp()
+        self.refs = make_references()
+        owner = make_user()
+        make_application(owner, self.refs, date_of_birth=date(1990, 5, 1))
+        make_application(owner, self.refs, has_deferment=True)
+        make_application(owner, self.refs, status=self.refs.statuses['review'], has_deferment=True)
+        make_application(owner, self.refs, has_deferment=True).delete()
+        self.client.force_authenticate(make_user(is_staff=True))
+
+    def _facets(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        counts = {
+            facet: {option['value']: option['count'] for option in options}
+            for facet, options in data['facets'].items()
+        }
+        return data['total'], counts
+
+    def test_facet_ignores_its_own_filter(self):
+        total, counts = self._facets(status='new', has_deferment='true')
+        self.assertEqual(total, 1)
+        self.assertEqual(counts['status'], {'new': 1, 'review': 1, 'approved': 0})
+        self.assertEqual(counts['has_deferment'], {True: 1, False: 1})
+        self.assertEqual(counts['service_type'], {'contract': 1, 'conscription': 0})
+
+    def test_shared_filters_go_to_where(self):
+        with CaptureQueriesContext(connection) as ctx:
+            total, counts = self._facets(date_of_birth_from='1995-01-01', status='new')
+        self.assertEqual(total, 1)
+        self.assertEqual(counts['status'], {'new': 1, 'review': 1, 'approved': 0})
+        sql = ctx.captured_queries[-1]['sql']
+        where = sql[sql.rindex(' FROM '):]  # после агрегатов с FILTER (WHERE …)
+        self.assertIn('"date_of_birth" >=', where)
+        self.assertIn('"exist"', where)
+
+    def test_invalid_filter(self):
+        self.assertEqual(self.client.get(self.url, {'status': 'nope'}).status_code, 400)
+
+
+class ArchiveSoftDeletedTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.refs = make_references()
+        owner = make_user()
+        self.old = make_application(owner, self.refs)
+        ApplicationCity.objects.create(application=self.old, city=self.refs.cities[0])
+        self.old_file = make_attachment(self.old, b'old')
+        self.recent = make_application(owner, self.refs)
+        self.live = make_application(owner, self.refs)
+        self.live_file = make_attachment(self.live, b'live')
+        self.dropped_file = make_attachment(self.live, b'dropped')
+
+        for obj in (self.old, self.recent, self.dropped_file):
+            obj.delete()
+        long_ago = timezone.now() - timedelta(days=400)
+        Application.all_objects.filter(pk=self.old.pk).update(deleted_at=long_ago)
+        Attachment.all_objects.filter(pk=self.dropped_file.pk).update(deleted_at=long_ago)
+
+    def test_moves_only_long_deleted_rows(self):
+        call_command('archive_soft_deleted', '--days', '30', '--batch-size', '1', stdout=io.StringIO())
+
+        self.assertCountEqual(
+            Application.all_objects.values_list('pk', flat=True), [self.recent.pk, self.live.pk]
+        )
+        self.assertEqual(list(ArchivedApplication.objects.values_list('pk', flat=True)), [self.old.pk])
+        self.assertEqual(ArchivedApplicationCity.objects.get().application_id, self.old.pk)
+        self.assertCountEqual(
+            ArchivedAttachment.objects.values_list('pk', flat=True),
+            [self.old_file.pk, self.dropped_file.pk],
+        )
+        self.assertEqual(list(Attachment.all_objects.values_list('pk', flat=True)), [self.live_file.pk])
+
+    def test_migrations_create_deleted_at_indexes(self):
+        for model, index in ((Application, 'application_deleted_idx'),
+                             (Attachment, 'attachment_deleted_idx')):
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+            with self.subTest(model=model.__name__):
+                self.assertEqual(constraints[index]['columns'], ['deleted_at'])
+
+
+class ApplicationSubmitQueryCountTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.refs = make_references()
+        self.owner = make_user()
+        self.client.force_authenticate(self.owner)
+        self.payload = {
+            'service_type': 'contract', 'full_name': 'Заявитель', 'date_of_birth': '2000-01-01',
+            'email': 'submit@example.com', 'phone': '+77000000001', 'address': '-',
+            'birth_city': self.refs.cities[0].pk,
+            'education_level': EducationLevel.objects.create(code='higher', name='Высшее').pk,
+            'specialization': Specialization.objects.create(name='Связь').pk,
+            'current_rank': Rank.objects.create(name='Рядовой').pk,
+            'preferred_branch': MilitaryBranch.objects.create(name='Сухопутные').pk,
+            'health_status': HealthStatusChoice.objects.create(code='fit', name='Годен').pk,
+            'new_cities': [city.pk for city in self.refs.cities[:2]],
+        }
+
+    def _submit(self, n):
+        return self.client.post(
+            '/api/applications/', {**self.payload, 'iin': f'8{n:011d}'}, format='json'
+        )
+
+    def test_full_submission_with_warm_cache(self):
+        self.assertEqual(self._submit(1).status_code, 201)  # прогрев карт справочников
+        # проверка ИИН, заявка, событие статуса, города, счётчики (с точками
+        # сохранения) и чтение ответа; справочники — ни одного запроса
+        with self.assertNumQueries(13):
+            self.assertEqual(self._submit(2).status_code, 201)
+
+
+class DesiredCitiesTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.refs = make_references()
+        self.owner = make_user()
+        self.app = make_application(self.owner, self.refs)
+        self.url = f'/api/applications/{self.app.pk}/'
+        self.client.force_authenticate(self.owner)
+
+    def _patch(self, data):
+        return self.client.patch(self.url, data, format='json')
+
+    def _cities(self):
+        return set(ApplicationCity.objects.filter(application=self.app).values_list('city_id', flat=True))
+
+    def test_cities_are_synced(self):
+        astana, almaty, shymkent = (city.pk for city in self.refs.cities)
+        self.assertEqual(self._patch({'new_cities': [astana, almaty, astana]}).status_code, 200)
+        self.assertEqual(self._cities(), {astana, almaty})
+        kept = ApplicationCity.objects.get(application=self.app, city_id=almaty).pk
+
+        self._patch({'new_cities': [almaty, shymkent]})
+        self.assertEqual(self._cities(), {almaty, shymkent})
+        # оставшийся город не пересоздаётся
+        self.assertEqual(ApplicationCity.objects.get(application=self.app, city_id=almaty).pk, kept)
+
+        self._patch({'comment': 'без городов'})
+        self.assertEqual(self._cities(), {almaty, shymkent})
+        self._patch({'new_cities': []})
+        self.assertEqual(self._cities(), set())
+
+    def test_unknown_cities_are_rejected_with_one_lookup(self):
+        with mock.patch('applications.serializers.get_reference_map', wraps=get_reference_map) as lookup:
+            response = self._patch({'new_cities': [self.refs.cities[0].pk, 999998, 999999]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('999998', str(response.json()['new_cities']))
+        self.assertEqual(lookup.call_count, 1)
+        self.assertEqual(self._cities(), set())
@@ -0,0 +1,103 @@
+# applications/uploads.py
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+
+from .models import Attachment
+
+# Размер блока при чтении тела запроса и файла
+BLOCK_SIZE = 64 * 1024
+
+
+class _SessionFile(File):
+    """
+    Готовый файл сессии. temporary_file_path() позволяет хранилищу
+    перенести его переименованием, не копируя байты, а sha256 — не
+    пересчитывать уже известный хэш.
+    """
+    def __init__(self, file, sha256):
+        super().__init__(file)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def write_chunk(session, stream, length):
+    """
+    Принимает до length байт из stream в отдельный файл куска рядом с файлом
+    сессии, читая тело запроса блоками. Без транзакции и блокировок: медленный
+    клиент не держит соединение с БД. Возвращает (путь куска, сколько принято).
+    """
+    os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(
+        dir=settings.UPLOAD_SESSION_DIR, prefix=f"{session.pk}.", suffix='.chunk'
+    )
+    received = 0
+    with os.fdopen(fd, 'wb') as fh:
+        while received < length:
+            block = stream.read(min(BLOCK_SIZE, length - received))
+            if not block:
+                break
+            fh.write(block)
+            received += len(block)
+    return path, received
+
+
+def append_chunk(session, chunk_path, offset):
+    """
+    Переносит принятый кусок в файл сессии с позиции offset. Вызывать
+    только после того, как смещение сессии удалось сдвинуть с offset
+    (compare-and-swap), — тогда пишет ровно один запрос.
+    """
+    mode = 'r+b' if os.path.exists(session.temp_path) else 'wb'
+    with open(session.temp_path, mode) as fh, open(chunk_path, 'rb') as chunk:
+        # всё, что дальше offset, — остатки оборванного куска
+        fh.seek(offset)
+        fh.truncate()
+        shutil.copyfileobj(chunk, fh, BLOCK_SIZE)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize_upload(session, user):
+    """
+    Проверяет контрольную сумму, переносит файл в хранилище и создаёт
+    Attachment, привязанный к заявке сессии.
+    """
+    checksum = file_sha256(session.temp_path)
+    if session.sha256 and session.sha256.lower() != checksum:
+        # файл испорчен — начинаем загрузку заново
+        os.remove(session.temp_path)
+        session.offset = 0
+        session.save(update_fields=['offset', 'modified_at'])
+        raise ValueError("Контрольная сумма не совпадает, загрузите файл заново")
+
+    attachment = Attachment(
+        application=session.application,
+        attachment_type=session.attachment_type,
+        created_by=user,
+        modified_by=user,
+    )
+    with open(session.temp_path, 'rb') as fh:
+        attachment.file.save(session.filename, _SessionFile(fh, checksum), save=False)
+    attachment.save()
+    if os.path.exists(session.temp_path):
+        os.remove(session.temp_path)
+
+    session.sha256 = checksum
+    session.attachment = attachment
+    session.modified_by = user
+    session.save(update_fields=['sha256', 'attachment', 'modified_by', 'modified_at'])
+    return attachment
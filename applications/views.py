@@ -1,37 +1,66 @@
 # applications/views.py
 
+import gzip
+import hashlib
+import json
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DateField, Sum
+from django.db.models.functions import Trunc
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_date
+from django.utils.http import parse_etags
 from rest_framework import viewsets, mixins, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.views import APIView
 from .models import (
     City, ServiceType, Advantage, ServiceTypeAdvantage,
-    ApplicationStatus, EducationLevel, Specialization,
+    ApplicationStatus, ApplicationStatusTransition, EducationLevel, Specialization,
     MilitaryBranch, Rank, HealthStatusChoice,
-    Application
+    Application, ApplicationCounter, ApplicationDailyStat, Attachment, UploadSession
 )
 from .serializers import (
     CitySerializer, ServiceTypeSerializer, AdvantageSerializer,
     ServiceTypeAdvantageSerializer, ApplicationStatusSerializer,
+    ApplicationStatusTransitionSerializer,
     EducationLevelSerializer, SpecializationSerializer,
     MilitaryBranchSerializer, RankSerializer,
-    HealthStatusChoiceSerializer, ApplicationSerializer
+    HealthStatusChoiceSerializer, ApplicationSerializer,
+    AttachmentSerializer, UploadSessionSerializer
 )
-from .permissions import IsOwnerAndEditable
+from .export import build_xlsx, stream_csv
+from .filters import ApplicationFilter, facet_counts
+from .pagination import ApplicationCursorPagination
+from .search import SEARCH_LIMIT, SEARCH_MAX_LIMIT, search_applications
+from .services import bulk_change_status
+from .uploads import append_chunk, finalize_upload, write_chunk
+from .permissions import IsAttachmentOwner, IsOwnerAndEditable, IsUploadEditable
+from core.cache import REFERENCE_CACHE_TIMEOUT, combined_key, get_reference_map
+from core.mixins import CachedListMixin
+from core.sendfile import sendfile_response
 
 # 1. Справочники
-class CityViewSet(viewsets.ModelViewSet):
+class CityViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = City.objects.all()
     serializer_class = CitySerializer
     permission_classes = [permissions.IsAdminUser]
 
 
-class ServiceTypeViewSet(viewsets.ReadOnlyModelViewSet):
+class ServiceTypeViewSet(CachedListMixin, viewsets.ReadOnlyModelViewSet):
     queryset = ServiceType.objects.all()
     serializer_class = ServiceTypeSerializer
     permission_classes = [permissions.AllowAny]
 
 
-class AdvantageViewSet(viewsets.ModelViewSet):
+class AdvantageViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = Advantage.objects.all()
     serializer_class = AdvantageSerializer
     permission_classes = [permissions.IsAdminUser]
@@ -43,42 +72,138 @@ class ServiceTypeAdvantageViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAdminUser]
 
 
-class ApplicationStatusViewSet(viewsets.ModelViewSet):
+class ApplicationStatusViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = ApplicationStatus.objects.all()
     serializer_class = ApplicationStatusSerializer
     permission_classes = [permissions.IsAdminUser]
 
 
-class EducationLevelViewSet(viewsets.ModelViewSet):
+class ApplicationStatusTransitionViewSet(viewsets.ModelViewSet):
+    queryset = ApplicationStatusTransition.objects.all()
+    serializer_class = ApplicationStatusTransitionSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+
+class EducationLevelViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = EducationLevel.objects.all()
     serializer_class = EducationLevelSerializer
     permission_classes = [permissions.IsAdminUser]
 
 
-class SpecializationViewSet(viewsets.ModelViewSet):
+class SpecializationViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = Specialization.objects.all()
     serializer_class = SpecializationSerializer
     permission_classes = [permissions.IsAdminUser]
 
 
-class MilitaryBranchViewSet(viewsets.ModelViewSet):
+class MilitaryBranchViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = MilitaryBranch.objects.all()
     serializer_class = MilitaryBranchSerializer
     permission_classes = [permissions.IsAdminUser]
 
 
-class RankViewSet(viewsets.ModelViewSet):
+class RankViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = Rank.objects.all()
     serializer_class = RankSerializer
     permission_classes = [permissions.IsAdminUser]
 
 
-class HealthStatusChoiceViewSet(viewsets.ModelViewSet):
+class HealthStatusChoiceViewSet(CachedListMixin, viewsets.ModelViewSet):
     queryset = HealthStatusChoice.objects.all()
     serializer_class = HealthStatusChoiceSerializer
     permission_classes = [permissions.IsAdminUser]
 
 
+# Состав «бандла» справочников для формы заявки: ключ ответа -> (модель, сериализатор)
+DICTIONARY_BUNDLE = {
+    'cities': (City, CitySerializer),
+    'service_types': (ServiceType, ServiceTypeSerializer),
+    'education_levels': (EducationLevel, EducationLevelSerializer),
+    'specializations': (Specialization, SpecializationSerializer),
+    'military_branches': (MilitaryBranch, MilitaryBranchSerializer),
+    'ranks': (Rank, RankSerializer),
+    'health_statuses': (HealthStatusChoice, HealthStatusChoiceSerializer),
+    'statuses': (ApplicationStatus, ApplicationStatusSerializer),
+}
+
+
+def _build_dictionary_bundle():
+    """
+    Собирает все справочники в один JSON и возвращает (etag, body, gzip_body).
+    Результат кэшируется, пока не изменится версия любого справочника.
+    """
+    models = [model for model, _ in DICTIONARY_BUNDLE.values()]
+    key = combined_key(models, 'bundle')
+    bundle = cache.get(key)
+    if bundle is None:
+        data = {
+            name: serializer(model.objects.all(), many=True).data
+            for name, (model, serializer) in DICTIONARY_BUNDLE.items()
+        }
+        body = json.dumps(
+            data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8')
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()
+        bundle = (etag, body, gzip.compress(body, compresslevel=6))
+        cache.set(key, bundle, REFERENCE_CACHE_TIMEOUT)
+    return bundle
+
+
+def _accepts_gzip(accept_encoding):
+    """
+    Принимает ли клиент gzip по Accept-Encoding — с учётом q-значений
+    («gzip;q=0» — явный отказ) и «*» для не перечисленных кодировок.
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+class DictionaryBundleView(APIView):
+    """
+    GET /api/dictionaries/ — все справочники формы заявки одним ответом.
+    ETag — хэш содержимого; при совпадении If-None-Match отдаём 304.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        etag, body, gzip_body = _build_dictionary_bundle()
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            etags = parse_etags(if_none_match)
+            if '*' in etags or etag in etags or f'W/{etag}' in etags:
+                response = HttpResponseNotModified()
+                response['ETag'] = etag
+                patch_vary_headers(response, ('Accept-Encoding',))
+                return response
+
+        if _accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            response = HttpResponse(gzip_body, content_type='application/json; charset=utf-8')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(body, content_type='application/json; charset=utf-8')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
 # 2. Пользовательские заявки
 class ApplicationViewSet(viewsets.ModelViewSet):
     """
@@ -88,8 +213,9 @@ class ApplicationViewSet(viewsets.ModelViewSet):
       POST /applications/communications/
       POST /applications/conscription/
     """
-    queryset = Application.objects.all()
+    queryset = Application.objects.with_related()
     serializer_class = ApplicationSerializer
+    pagination_class = ApplicationCursorPagination
     permission_classes = [permissions.IsAuthenticated, IsOwnerAndEditable]
 
     def get_queryset(self):
@@ -134,28 +260,340 @@ class ApplicationViewSet(viewsets.ModelViewSet):
 
 
 # 3. Admin API для заявок
+
+# Шаг агрегации для /admin/applications/timeseries/
+TIMESERIES_INTERVALS = ('day', 'week', 'month')
+
+
+def _parse_ids(value):
+    """
+    Список id без повторов или None, если value — не список целых чисел.
+    Строку не перебираем посимвольно ("15" — не [1, 5]), дробные и
+    булевы значения не приводим.
+    """
+    if not isinstance(value, (list, tuple)):
+        return None
+    ids = []
+    for item in value:
+        if isinstance(item, str) and item.isascii() and item.isdigit():
+            item = int(item)
+        if isinstance(item, bool) or not isinstance(item, int):
+            return None
+        ids.append(item)
+    return list(dict.fromkeys(ids))
+
+
 class AdminApplicationViewSet(viewsets.ModelViewSet):
     """
     Только для staff:
       GET    /admin/applications/
       PUT/PATCH /admin/applications/{id}/
       POST   /admin/applications/bulk_update_status/
+      GET    /admin/applications/export/?file_format=csv|xlsx
+      GET    /admin/applications/counters/
+      GET    /admin/applications/timeseries/?date_from=&date_to=&interval=day|week|month
+      GET    /admin/applications/search/?q=&limit=
+      GET    /admin/applications/facets/?<те же фильтры, что у списка>
     """
-    queryset = Application.objects.all()
+    queryset = Application.objects.with_related()
     serializer_class = ApplicationSerializer
+    pagination_class = ApplicationCursorPagination
     permission_classes = [permissions.IsAdminUser]
+    filterset_class = ApplicationFilter
+
+    def perform_update(self, serializer):
+        # событие истории статусов пишет автора из modified_by
+        serializer.save(modified_by=self.request.user)
 
     @action(detail=False, methods=['post'], url_path='bulk_update_status')
     def bulk_update_status(self, request):
-        ids = request.data.get('ids', [])
+        if hasattr(request.data, 'getlist'):
+            # форма: ids=1&ids=2 (get() вернул бы только последний)
+            ids = request.data.getlist('ids')
+        else:
+            ids = request.data.get('ids', [])
         new_status = request.data.get('status')
         comment = request.data.get('admin_comment', '')
         if not ids or not new_status:
             return Response({'detail': 'ids и status обязательны'}, status=400)
-        apps = self.get_queryset().filter(id__in=ids)
-        apps.update(
-            status_id=ApplicationStatus.objects.get(code=new_status).id,
-            admin_comment=comment,
-            modified_by=request.user
+        ids = _parse_ids(ids)
+        if ids is None:
+            return Response({'detail': 'ids должны быть списком целых чисел'}, status=400)
+        status_obj = ApplicationStatus.objects.filter(code=new_status).first()
+        if status_obj is None:
+            return Response({'detail': f'Статус «{new_status}» не найден'}, status=400)
+
+        changed = bulk_change_status(ids, status_obj, comment, request.user)
+        updated_ids = [app_id for app_id, _ in changed]
+        updated = set(updated_ids)
+        return Response({
+            'updated': len(updated_ids),
+            'updated_ids': updated_ids,
+            # не найдены, удалены, уже в этом статусе или переход запрещён
+            'skipped_ids': [i for i in ids if i not in updated],
+        })
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Потоковая выгрузка с теми же фильтрами, что и у списка.
+        Память не растёт с числом заявок: строки читаются серверным курсором.
+        """
+        file_format = request.query_params.get('file_format', 'csv')
+        queryset = self.filter_queryset(Application.objects.for_export())
+        filename = f"applications_{timezone.now():%Y%m%d_%H%M}"
+
+        if file_format == 'csv':
+            response = StreamingHttpResponse(
+                stream_csv(queryset), content_type='text/csv; charset=utf-8'
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+            return response
+
+        if file_format == 'xlsx':
+            try:
+                output = build_xlsx(queryset)
+            except ImportError:
+                return Response({'detail': 'Экспорт в XLSX недоступен: не установлен openpyxl'}, status=400)
+            return FileResponse(
+                output, as_attachment=True, filename=f"{filename}.xlsx",
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            )
+
+        return Response({'detail': 'file_format должен быть csv или xlsx'}, status=400)
+
+    @action(detail=False, methods=['get'], url_path='counters')
+    def counters(self, request):
+        """
+        Количество «живых» заявок по статусу, типу службы и городам —
+        из предрасчитанной таблицы ApplicationCounter, без сканирования заявок.
+        """
+        references = {
+            ApplicationCounter.STATUS: get_reference_map(ApplicationStatus),
+            ApplicationCounter.SERVICE_TYPE: get_reference_map(ServiceType),
+            ApplicationCounter.BIRTH_CITY: get_reference_map(City),
+            ApplicationCounter.DESIRED_CITY: get_reference_map(City),
+        }
+        data = {dimension: [] for dimension in references}
+        for counter in ApplicationCounter.objects.filter(count__gt=0).order_by('dimension', '-count'):
+            obj = references[counter.dimension].get(counter.bucket)
+            data[counter.dimension].append({
+                'id': counter.bucket or None,
+                'name': obj.name if obj is not None else None,
+                'count': counter.count,
+            })
+        return Response(data)
+
+    @action(detail=False, methods=['get'], url_path='facets')
+    def facets(self, request):
+        """
+        Счётчики для каждого значения фильтров (статус, тип службы, флаги…)
+        при текущих фильтрах — одним агрегирующим запросом.
+        """
+        filterset = ApplicationFilter(request.query_params, queryset=Application.objects.all())
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=400)
+        return Response(facet_counts(Application.objects.all(), filterset))
+
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        """
+        Быстрый поиск: префикс ИИН/телефона или ФИО/email с опечатками,
+        лучшие совпадения первыми. Без пагинации — только первые limit.
+        """
+        term = request.query_params.get('q', '').strip()
+        if len(term) < 2:
+            return Response({'detail': 'q — не короче 2 символов'}, status=400)
+        try:
+            limit = min(int(request.query_params.get('limit', SEARCH_LIMIT)), SEARCH_MAX_LIMIT)
+        except ValueError:
+            return Response({'detail': 'limit должен быть целым числом'}, status=400)
+
+        found = list(search_applications(self.get_queryset(), term)[:max(limit, 1)])
+        data = self.get_serializer(found, many=True).data
+        for item, app in zip(data, found):
+            item['rank'] = app.rank
+        return Response({'results': data})
+
+    @action(detail=False, methods=['get'], url_path='timeseries')
+    def timeseries(self, request):
+        """
+        Число поданных заявок по периодам, типу службы и текущему статусу —
+        из суточной сводки ApplicationDailyStat (по умолчанию последние 30 дней).
+        Необязательные фильтры: service_type, status (коды).
+        """
+        params = request.query_params
+        interval = params.get('interval', 'day')
+        if interval not in TIMESERIES_INTERVALS:
+            return Response({'detail': 'interval должен быть day, week или month'}, status=400)
+        try:
+            date_to = parse_date(params['date_to']) if 'date_to' in params else timezone.localdate()
+            date_from = parse_date(params['date_from']) if 'date_from' in params else date_to - timedelta(days=29)
+        except ValueError:
+            date_from = date_to = None
+        if date_from is None or date_to is None:
+            return Response({'detail': 'date_from и date_to — даты в формате YYYY-MM-DD'}, status=400)
+
+        service_types = get_reference_map(ServiceType)
+        statuses = get_reference_map(ApplicationStatus)
+        stats = ApplicationDailyStat.objects.filter(day__range=(date_from, date_to))
+        if 'service_type' in params:
+            stats = stats.filter(service_type__code=params['service_type'])
+        if 'status' in params:
+            stats = stats.filter(status__code=params['status'])
+        rows = (
+            stats.annotate(period=Trunc('day', interval, output_field=DateField()))
+            .values('period', 'service_type_id', 'status_id')
+            .annotate(total=Sum('count'))
+            .order_by('period', 'service_type_id', 'status_id')
         )
-        return Response({'updated': apps.count()})
+        return Response({
+            'interval': interval,
+            'date_from': date_from,
+            'date_to': date_to,
+            'results': [
+                {
+                    'period': row['period'],
+                    'service_type': getattr(service_types.get(row['service_type_id']), 'code', None),
+                    'status': getattr(statuses.get(row['status_id']), 'code', None),
+                    'count': row['total'],
+                }
+                for row in rows
+            ],
+        })
+
+
+# 4. Докачиваемая загрузка вложений
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Загрузка больших файлов кусками с продолжением после обрыва:
+      POST   /uploads/                — открыть сессию {application, filename, size[, sha256, attachment_type]}
+      GET    /uploads/{id}/           — текущий offset, чтобы продолжить
+      PUT    /uploads/{id}/chunk/     — сырые байты куска, заголовок Upload-Offset
+      POST   /uploads/{id}/finalize/  — проверить SHA-256 и создать Attachment заявки
+      DELETE /uploads/{id}/           — отменить загрузку
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated, IsUploadEditable]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return UploadSession.objects.none()
+        qs = UploadSession.objects.select_related('application__status')
+        user = self.request.user
+        return qs if user.is_staff else qs.filter(created_by=user)
+
+    def _lock_session(self):
+        # блокируем строку сессии на время коротких проверок и записи в БД
+        return self.get_queryset().select_for_update().get(pk=self.get_object().pk)
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user, modified_by=self.request.user)
+
+    def perform_destroy(self, instance):
+        if os.path.exists(instance.temp_path):
+            os.remove(instance.temp_path)
+        instance.delete()
+
+    @action(detail=True, methods=['put'], url_path='chunk')
+    def chunk(self, request, pk=None):
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'detail': 'Нужны заголовки Upload-Offset и Content-Length'}, status=400)
+        if not 0 < length <= settings.UPLOAD_CHUNK_MAX_SIZE:
+            return Response(
+                {'detail': f'Размер куска — от 1 до {settings.UPLOAD_CHUNK_MAX_SIZE} байт'}, status=400
+            )
+
+        # 1) проверки под короткой блокировкой
+        with transaction.atomic():
+            session = self._lock_session()
+            if session.attachment_id:
+                return Response({'detail': 'Загрузка уже завершена'}, status=409)
+            if offset != session.offset:
+                return Response(
+                    {'detail': 'Неверное смещение', 'offset': session.offset}, status=409
+                )
+            if offset + length > session.size:
+                return Response({'detail': 'Кусок выходит за размер файла'}, status=400)
+
+        # 2) приём байтов от клиента — вне транзакции
+        chunk_path, received = write_chunk(session, request.stream, length)
+        try:
+            # 3) compare-and-swap: смещение сдвигает только один из
+            #    параллельных запросов с тем же offset, он же и пишет в файл
+            with transaction.atomic():
+                moved = UploadSession.objects.filter(
+                    pk=session.pk, offset=offset, attachment__isnull=True
+                ).update(
+                    offset=offset + received, modified_by=request.user, modified_at=timezone.now()
+                )
+                if moved:
+                    append_chunk(session, chunk_path, offset)
+        finally:
+            os.remove(chunk_path)
+
+        if not moved:
+            session.refresh_from_db(fields=['offset'])
+            return Response({'detail': 'Неверное смещение', 'offset': session.offset}, status=409)
+        return Response({'offset': offset + received, 'size': session.size})
+
+    @action(detail=True, methods=['post'], url_path='finalize')
+    def finalize(self, request, pk=None):
+        with transaction.atomic():
+            session = self._lock_session()
+            if session.attachment_id:
+                return Response({'detail': 'Загрузка уже завершена'}, status=409)
+            if session.offset != session.size:
+                return Response(
+                    {'detail': 'Файл загружен не полностью', 'offset': session.offset}, status=409
+                )
+            try:
+                attachment = finalize_upload(session, request.user)
+            except ValueError as exc:
+                return Response({'detail': str(exc), 'offset': 0}, status=400)
+
+        serializer = AttachmentSerializer(attachment, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+# 5. Скачивание вложений
+class AttachmentViewSet(viewsets.GenericViewSet):
+    """
+    GET /attachments/{id}/download/?variant=file|preview|thumbnail
+    Проверяем права в Django, а байты отдаёт веб-сервер (X-Accel-Redirect /
+    X-Sendfile, см. SENDFILE_BACKEND); поддерживается Range.
+    """
+    serializer_class = AttachmentSerializer
+    permission_classes = [permissions.IsAuthenticated, IsAttachmentOwner]
+    VARIANTS = ('file', 'preview', 'thumbnail')
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Attachment.objects.none()
+        qs = Attachment.objects.select_related('application')
+        user = self.request.user
+        return qs if user.is_staff else qs.filter(application__user=user)
+
+    @action(detail=True, methods=['get'], url_path='download')
+    def download(self, request, pk=None):
+        attachment = self.get_object()
+        variant = request.query_params.get('variant', 'file')
+        if variant not in self.VARIANTS:
+            return Response({'detail': 'variant: file, preview или thumbnail'}, status=400)
+        field = getattr(attachment, variant)
+        if not field:
+            return Response({'detail': 'Файл ещё не готов'}, status=404)
+        if not field.storage.exists(field.name):
+            return Response({'detail': 'Файл не найден'}, status=404)
+
+        ext = os.path.splitext(field.name)[1]
+        filename = f"{attachment.attachment_type or 'attachment'}_{attachment.pk}"
+        if variant != 'file':
+            filename += f"_{variant}"
+        return sendfile_response(request, field.storage, field.name, filename + ext)
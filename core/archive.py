@@ -0,0 +1,64 @@
+# core/archive.py
+
+from django.db import models
+from django.utils import timezone
+
+
+class ArchiveAccessor:
+    """
+    Model.archived_objects — менеджер архивной таблицы модели,
+    по аналогии с all_objects: Application.archived_objects.filter(user_id=...).
+    """
+    def __get__(self, instance, owner):
+        return owner.archive_model._default_manager
+
+
+def archive_model(model, exclude=(), indexed=()):
+    """
+    Строит модель архивной таблицы <таблица>_archive с теми же колонками,
+    что у model (кроме exclude), и привязывает её как model.archive_model.
+
+    В архиве нет ограничений: первичный ключ переносится как есть, связи
+    становятся обычными колонками <поле>_id без FK (родитель мог уйти в
+    архив или быть удалён), unique и индексы сняты — кроме полей indexed.
+    """
+    attrs = {
+        '__module__': model.__module__,
+        'Meta': type('Meta', (), {
+            'app_label': model._meta.app_label,
+            'db_table': f"{model._meta.db_table}_archive",
+        }),
+    }
+    for field in model._meta.concrete_fields:
+        if field.name in exclude:
+            continue
+        if field.primary_key:
+            attrs[field.attname] = models.BigIntegerField(primary_key=True)
+        elif field.is_relation:
+            attrs[field.attname] = models.BigIntegerField(
+                null=field.null, db_index=field.name in indexed
+            )
+        else:
+            _, _, args, kwargs = field.deconstruct()
+            for option in ('unique', 'db_index', 'validators', 'auto_now', 'auto_now_add'):
+                kwargs.pop(option, None)
+            attrs[field.attname] = type(field)(*args, db_index=field.name in indexed, **kwargs)
+    attrs['archived_at'] = models.DateTimeField(default=timezone.now)
+
+    archive = type(f"Archived{model.__name__}", (models.Model,), attrs)
+    model.archive_model = archive
+    model.archived_objects = ArchiveAccessor()
+    return archive
+
+
+def copy_to_archive(queryset):
+    """
+    Копирует строки queryset в архивную таблицу его модели (без удаления).
+    Возвращает число скопированных строк.
+    """
+    archive = queryset.model.archive_model
+    names = [f.attname for f in archive._meta.concrete_fields if f.name != 'archived_at']
+    now = timezone.now()
+    rows = [archive(archived_at=now, **row) for row in queryset.order_by().values(*names)]
+    archive._default_manager.bulk_create(rows)
+    return len(rows)
@@ -0,0 +1,72 @@
+# core/cache.py
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Время жизни закэшированных ответов справочников (сек.).
+# Ограничивает «устаревание», если кэш не общий между процессами.
+REFERENCE_CACHE_TIMEOUT = getattr(settings, 'REFERENCE_CACHE_TIMEOUT', 300)
+
+
+def _version_key(model, pk=None):
+    key = f"refcache:version:{model._meta.label_lower}"
+    return key if pk is None else f"{key}:{pk}"
+
+
+def get_version(model, pk=None):
+    """
+    Текущая версия данных модели (или одной её записи, если задан pk).
+    Если счётчика в кэше нет (первый запуск, вытеснение), стартуем
+    с метки времени, чтобы не совпасть со старыми ключами.
+    """
+    key = _version_key(model, pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_version(model, pk=None):
+    """
+    Увеличивает версию модели (или записи pk) — все ключи, построенные
+    на старой версии, перестают использоваться.
+    """
+    key = _version_key(model, pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def versioned_key(model, *parts):
+    """
+    Ключ кэша, привязанный к текущей версии модели.
+    """
+    suffix = ":".join(str(p) for p in parts)
+    return f"refcache:{model._meta.label_lower}:{get_version(model)}:{suffix}"
+
+
+def combined_key(models, *parts):
+    """
+    Ключ для данных, собранных из нескольких справочников:
+    меняется, как только меняется версия любого из них.
+    """
+    versions = ".".join(str(get_version(m)) for m in models)
+    suffix = ":".join(str(p) for p in parts)
+    return f"refcache:combined:{versions}:{suffix}"
+
+
+def get_reference_map(model, key='pk'):
+    """
+    Словарь «значение key -> объект» по всем «живым» записям справочника.
+    Один запрос на промах кэша, дальше — из кэша до смены версии модели.
+    """
+    cache_key = versioned_key(model, 'map', key)
+    mapping = cache.get(cache_key)
+    if mapping is None:
+        mapping = {getattr(obj, key): obj for obj in model.objects.all()}
+        cache.set(cache_key, mapping, REFERENCE_CACHE_TIMEOUT)
+    return mapping
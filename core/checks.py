@@ -0,0 +1,31 @@
+# core/checks.py
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Бэкенды, у которых у каждого процесса своё содержимое
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Версии моделей и записей (core.cache) должны быть общими для всех
+    воркеров, иначе сброс кэша виден только изменившему процессу.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f"Кэш по умолчанию ({backend}) не общий между процессами.",
+        hint=(
+            "При нескольких воркерах укажите CACHE_BACKEND (Redis, Memcached). "
+            "Иначе деактивация пользователя и смена прав доходят до других "
+            "воркеров только через AUTH_USER_CACHE_TTL, правки справочников — "
+            "через REFERENCE_CACHE_TIMEOUT."
+        ),
+        id='core.W001',
+    )]
@@ -0,0 +1,66 @@
+# core/fields.py
+
+from django.utils.encoding import smart_str
+from rest_framework import serializers
+
+from .cache import get_reference_map
+
+
+def parse_pk(value):
+    """
+    pk из целого или строки из цифр, иначе None. int() молча обрезал бы 1.9
+    до 1 и принял бы True как 1.
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        return int(value)
+    return None
+
+
+class ReferenceField(serializers.RelatedField):
+    """
+    Ссылка на справочник по pk или slug-полю (key). Значение проверяется по
+    закэшированной карте get_reference_map, а не отдельным SELECT — все
+    справочные поля запроса обходятся одной выборкой на справочник при
+    промахе кэша и ни одной при попадании. Ошибки — как у
+    PrimaryKeyRelatedField / SlugRelatedField.
+    """
+    default_error_messages = {
+        'does_not_exist': 'Invalid pk "{pk_value}" - object does not exist.',
+        'slug_does_not_exist': 'Object with {slug_name}={value} does not exist.',
+        'invalid': 'Invalid value.',
+    }
+
+    def __init__(self, model, key='pk', **kwargs):
+        self.model = model
+        self.key = key
+        # queryset нужен только для choices (browsable API, схема)
+        kwargs.setdefault('queryset', model.objects.all())
+        super().__init__(**kwargs)
+
+    def use_pk_only_optimization(self):
+        # pk берём из <поле>_id, не загружая сам объект
+        return self.key == 'pk'
+
+    def to_internal_value(self, data):
+        mapping = get_reference_map(self.model, self.key)
+        if self.key == 'pk':
+            pk = parse_pk(data)
+            if pk is None:
+                self.fail('invalid')
+            obj = mapping.get(pk)
+            if obj is None:
+                self.fail('does_not_exist', pk_value=data)
+            return obj
+        if not isinstance(data, str):
+            self.fail('invalid')
+        obj = mapping.get(data)
+        if obj is None:
+            self.fail('slug_does_not_exist', slug_name=self.key, value=smart_str(data))
+        return obj
+
+    def to_representation(self, value):
+        if self.key == 'pk':
+            return value.pk
+        return getattr(value, self.key)
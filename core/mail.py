@@ -0,0 +1,18 @@
+# core/mail.py
+
+from django.conf import settings
+
+from .models import OutgoingEmail
+
+
+def queue_mail(subject, message, recipient_list, from_email=None):
+    """
+    Замена send_mail для запросов: кладёт письмо в очередь и сразу возвращается.
+    Вызывайте внутри той же транзакции, что и данные, на которые письмо ссылается.
+    """
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL or '',
+        recipients=list(recipient_list),
+    )
@@ -0,0 +1,104 @@
+# core/management/commands/send_queued_mail.py
+
+import time
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import OutgoingEmail
+
+MAX_ATTEMPTS = 5
+# задержка перед повтором: 1, 2, 4, 8 ... минут, но не больше часа
+BACKOFF_BASE = timedelta(minutes=1)
+BACKOFF_MAX = timedelta(hours=1)
+
+
+def backoff(attempts):
+    return min(BACKOFF_BASE * (2 ** (attempts - 1)), BACKOFF_MAX)
+
+
+class Command(BaseCommand):
+    help = (
+        "Отправляет письма из очереди OutgoingEmail пачками через одно "
+        "SMTP-соединение; неудачные — с повтором и нарастающей задержкой."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help="Работать постоянно, а не один проход")
+        parser.add_argument('--interval', type=float, default=5.0, help="Пауза при пустой очереди, сек.")
+        parser.add_argument(
+            '--backend',
+            help="EMAIL_BACKEND для отправки (например, console или filebased для тестов)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = self.drain(options['batch_size'], options['backend'])
+            if sent or failed:
+                self.stdout.write(f"Отправлено: {sent}, ошибок: {failed}")
+            if not options['loop']:
+                break
+            if not (sent or failed):
+                time.sleep(options['interval'])
+
+    @transaction.atomic
+    def drain(self, batch_size, backend=None):
+        # skip_locked — несколько воркеров не возьмут одни и те же письма
+        batch = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmail.STATUS_PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if not batch:
+            return 0, 0
+
+        sent = failed = 0
+        connection = get_connection(backend, fail_silently=False)
+        try:
+            connection.open()
+        except Exception as exc:
+            # сервер недоступен — откладываем всю пачку
+            for email in batch:
+                self._mark_failed(email, exc)
+            failed = len(batch)
+        else:
+            for email in batch:
+                try:
+                    EmailMessage(
+                        subject=email.subject,
+                        body=email.body,
+                        from_email=email.from_email or None,
+                        to=email.recipients,
+                        connection=connection,
+                    ).send()
+                except Exception as exc:
+                    failed += 1
+                    self._mark_failed(email, exc)
+                    # соединение могло оборваться — переоткрываем для следующих писем
+                    try:
+                        connection.close()
+                        connection.open()
+                    except Exception:
+                        pass
+                else:
+                    sent += 1
+                    email.status = OutgoingEmail.STATUS_SENT
+                    email.sent_at = timezone.now()
+            connection.close()
+
+        OutgoingEmail.objects.bulk_update(
+            batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+        return sent, failed
+
+    def _mark_failed(self, email, exc):
+        email.attempts += 1
+        email.last_error = f"{type(exc).__name__}: {exc}"
+        if email.attempts >= MAX_ATTEMPTS:
+            email.status = OutgoingEmail.STATUS_FAILED
+        else:
+            email.next_attempt_at = timezone.now() + backoff(email.attempts)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='city',
+            name='exist',
+            field=models.BooleanField(default=True),
+        ),
+    ]
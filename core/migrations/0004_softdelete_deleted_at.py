@@ -0,0 +1,26 @@
+# Generated by Django 4.2.20 on 2026-10-17 19:55
+
+from django.db import migrations, models
+
+
+def fill_deleted_at(apps, schema_editor):
+    # до этой миграции момент удаления не хранился — берём последнее изменение
+    for model in apps.get_app_config('core').get_models():
+        if any(f.name == 'deleted_at' for f in model._meta.fields):
+            model._base_manager.filter(exist=False).update(deleted_at=models.F('modified_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_city_exist_no_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_deleted_at, migrations.RunPython.noop),
+    ]
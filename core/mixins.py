@@ -0,0 +1,39 @@
+# core/mixins.py
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+from .cache import REFERENCE_CACHE_TIMEOUT, versioned_key
+
+
+class CachedListMixin:
+    """
+    Отдаёт list() справочника из кэша готовыми байтами JSON.
+    Ключ привязан к версии модели (см. core.cache), поэтому правка записи
+    админом сразу делает старый ответ недоступным.
+    Кэшируется только JSON-ответ; browsable API рендерится как обычно.
+    """
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, JSONRenderer):
+            return super().list(request, *args, **kwargs)
+
+        model = self.get_queryset().model
+        query = request.query_params.urlencode()
+        key = versioned_key(model, 'list', request.accepted_media_type, query)
+        body = cache.get(key)
+        if body is None:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            body = renderer.render(
+                response.data, request.accepted_media_type, self.get_renderer_context()
+            )
+            cache.set(key, body, REFERENCE_CACHE_TIMEOUT)
+
+        content_type = renderer.media_type
+        if renderer.charset:
+            # у JSONRenderer charset=None: JSON всегда UTF-8
+            content_type += f"; charset={renderer.charset}"
+        return HttpResponse(body, content_type=content_type)
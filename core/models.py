@@ -1,9 +1,11 @@
 # core/models.py
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
+from .cache import bump_version
+
 class AuditModel(models.Model):
     """
     Абстрактная модель для аудита: кто/когда создал и редактировал запись.
@@ -37,14 +39,37 @@ class SoftDeleteModel(models.Model):
     Абстрактная модель для soft-delete: вместо физического удаления
     выставляем exist=False.
     """
-    exist = models.BooleanField(default=True, db_index=True)
+    # без индекса: «живых» строк почти всегда большинство — вместо этого
+    # у больших таблиц частичные индексы WHERE exist
+    exist = models.BooleanField(default=True)
+    # когда запись soft-удалили; по нему archive_soft_deleted отбирает строки
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     objects = SoftDeleteManager()   # «живые» записи
     all_objects = models.Manager()  # все, включая «удалённые»
 
+    # Справочники выставляют True: любое сохранение или soft-delete
+    # увеличивает версию модели и сбрасывает закэшированные списки.
+    cache_versioned = False
+
     class Meta:
         abstract = True
 
+    def save(self, *args, **kwargs):
+        if self.exist:
+            self.deleted_at = None
+        elif self.deleted_at is None:
+            self.deleted_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'exist' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'deleted_at'}
+        super().save(*args, **kwargs)
+        if self.cache_versioned:
+            # после коммита, чтобы параллельный запрос не закэшировал
+            # старые данные под новой версией
+            model = type(self)
+            transaction.on_commit(lambda: bump_version(model))
+
     def delete(self, using=None, keep_parents=False):
         # soft-delete
         self.exist = False
@@ -53,5 +78,40 @@ class SoftDeleteModel(models.Model):
 class City(AuditModel, SoftDeleteModel):
     name = models.CharField(max_length=100, unique=True)
 
+    cache_versioned = True
+
+    def __str__(self):
+        return self.name
+
+class OutgoingEmail(models.Model):
+    """
+    Очередь исходящих писем: HTTP-запрос только сохраняет письмо,
+    отправляет его команда send_queued_mail.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Ожидает отправки'),
+        (STATUS_SENT, 'Отправлено'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.JSONField(help_text="Список адресов получателей")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outgoing_email_queue_idx'),
+        ]
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"{self.subject} → {', '.join(self.recipients)} ({self.status})"
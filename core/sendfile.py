@@ -0,0 +1,77 @@
+# core/sendfile.py
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+BLOCK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def sendfile_response(request, storage, name, filename=None):
+    """
+    Отдаёт файл из хранилища после проверки прав во view.
+    SENDFILE_BACKEND:
+      'nginx'  — X-Accel-Redirect на internal-location SENDFILE_NGINX_PREFIX,
+      'apache' — X-Sendfile с абсолютным путём,
+      ''       — сам Django (для разработки): FileResponse или 206 по Range.
+    В первых двух случаях байты (и Range) отдаёт веб-сервер, воркер Python свободен.
+    """
+    filename = filename or os.path.basename(name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    backend = getattr(settings, 'SENDFILE_BACKEND', '')
+
+    if backend in ('nginx', 'apache'):
+        response = HttpResponse(content_type=content_type)
+        if backend == 'nginx':
+            response['X-Accel-Redirect'] = settings.SENDFILE_NGINX_PREFIX + quote(name)
+        else:
+            response['X-Sendfile'] = storage.path(name)
+        response['Content-Disposition'] = content_disposition_header(False, filename)
+        return response
+
+    size = storage.size(name)
+    range_header = request.META.get('HTTP_RANGE', '').strip()
+    match = RANGE_RE.match(range_header) if range_header else None
+    if match and any(match.groups()):
+        start, end = match.groups()
+        if start:
+            start, end = int(start), min(int(end) if end else size - 1, size - 1)
+        else:
+            # bytes=-N — последние N байт
+            start, end = max(size - int(end), 0), size - 1
+        if start > end or start >= size:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        fh = storage.open(name, 'rb')
+        fh.seek(start)
+        response = StreamingHttpResponse(
+            _read_range(fh, end - start + 1), status=206, content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    else:
+        # FileResponse использует wsgi.file_wrapper (sendfile у gunicorn/uwsgi)
+        response = FileResponse(storage.open(name, 'rb'), content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = content_disposition_header(False, filename)
+    return response
+
+
+def _read_range(fh, length):
+    try:
+        while length > 0:
+            block = fh.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        fh.close()
@@ -0,0 +1,114 @@
+# core/storage.py
+
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOCK_SIZE = 64 * 1024
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище с адресацией по содержимому: имя файла — SHA-256 его байтов
+    (cas/ab/cd/<sha256>.<ext>). Одинаковые файлы хранятся один раз, сколько
+    бы записей на них ни ссылалось. Хэш считается потоково, при записи.
+    Если у content есть атрибут sha256 (уже посчитан вызывающим) — он
+    используется как есть.
+    Счётчик ссылок — число «живых» записей с этим хэшем; неиспользуемые
+    файлы удаляет команда gc_attachment_blobs.
+    """
+    prefix = 'cas'
+
+    def blob_name(self, digest, ext=''):
+        return f"{self.prefix}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    @classmethod
+    def digest_from_name(cls, name):
+        """SHA-256 из имени файла или '' для файлов не из этого хранилища."""
+        if not name or not name.startswith(cls.prefix + '/'):
+            return ''
+        return os.path.splitext(os.path.basename(name))[0]
+
+    def get_available_name(self, name, max_length=None):
+        # имя всё равно заменяется хэшем в _save
+        return name
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1].lower()
+        digest = getattr(content, 'sha256', None)
+
+        if hasattr(content, 'temporary_file_path'):
+            source = content.temporary_file_path()
+            if digest is None:
+                digest = _hash_path(source)
+            target = self.blob_name(digest, ext)
+            if not self._reuse(target):
+                self._ensure_dir(target)
+                # переименование, если на том же диске
+                file_move_safe(source, self.path(target), allow_overwrite=True)
+                self._finish(target)
+            return target
+
+        tmp_dir = self.path(f"{self.prefix}/tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        hasher = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    hasher.update(chunk)
+                    fh.write(chunk)
+            target = self.blob_name(hasher.hexdigest(), ext)
+            if self._reuse(target):
+                os.remove(tmp_path)
+            else:
+                self._ensure_dir(target)
+                # атомарно; параллельная запись того же содержимого безопасна
+                os.replace(tmp_path, self.path(target))
+                self._finish(target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return target
+
+    def _reuse(self, name):
+        """
+        Файл уже есть — отмечаем его как недавно использованный (mtime),
+        чтобы сборщик мусора не удалил его, пока новая ссылка не закоммичена.
+        """
+        path = self.path(name)
+        if not os.path.exists(path):
+            return False
+        os.utime(path)
+        return True
+
+    def _ensure_dir(self, name):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+
+    def _finish(self, name):
+        if self.file_permissions_mode is not None:
+            os.chmod(self.path(name), self.file_permissions_mode)
+
+
+def _hash_path(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(BLOCK_SIZE), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def attachment_storage():
+    # вызываемый объект — чтобы миграции ссылались на функцию, а не на экземпляр
+    return content_addressed_storage
@@ -1,3 +1,108 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from smtplib import SMTPException
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .checks import check_shared_cache
+from .fields import ReferenceField
+from .mail import queue_mail
+from .management.commands.send_queued_mail import MAX_ATTEMPTS
+from .models import City, OutgoingEmail
+
+
+class FailingBackend(BaseEmailBackend):
+    """SMTP-сервер, отклоняющий все письма."""
+
+    def send_messages(self, email_messages):
+        raise SMTPException("сервер недоступен")
+
+
+def drain(**options):
+    call_command('send_queued_mail', stdout=io.StringIO(), **options)
+
+
+class OutboxTests(TestCase):
+    def test_queue_mail_does_not_send(self):
+        queue_mail("Тема", "Текст", ['a@example.com'])
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutgoingEmail.objects.get().status, OutgoingEmail.STATUS_PENDING)
+
+    def test_drain_sends_pending_mail(self):
+        queue_mail("Тема", "Текст", ['a@example.com', 'b@example.com'])
+        drain()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['a@example.com', 'b@example.com'])
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.STATUS_SENT)
+        self.assertIsNotNone(email.sent_at)
+
+        drain()  # отправленное повторно не уходит
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_failure_is_retried_with_backoff_then_given_up(self):
+        queue_mail("Тема", "Текст", ['a@example.com'])
+        drain(backend='core.tests.FailingBackend')
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.STATUS_PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('SMTPException', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+        for _ in range(MAX_ATTEMPTS - 1):
+            OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+            drain(backend='core.tests.FailingBackend')
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.STATUS_FAILED)
+        self.assertEqual(email.attempts, MAX_ATTEMPTS)
+
+    def test_not_yet_due_mail_waits(self):
+        queue_mail("Тема", "Текст", ['a@example.com'])
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+        drain()
+        self.assertEqual(mail.outbox, [])
+
+
+class ReferenceFieldTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.city = City.objects.create(name='Астана')
+
+    def test_pk_accepts_int_and_digit_string(self):
+        field = ReferenceField(City)
+        self.assertEqual(field.to_internal_value(self.city.pk), self.city)
+        self.assertEqual(field.to_internal_value(str(self.city.pk)), self.city)
+        with self.assertRaises(ValidationError):
+            field.to_internal_value(self.city.pk + 1000)
+
+    def test_pk_rejects_other_types(self):
+        field = ReferenceField(City)
+        for value in (float(self.city.pk) + 0.9, True, f' {self.city.pk}', '-1', '1e0', None, [1]):
+            with self.subTest(value=value), self.assertRaises(ValidationError) as ctx:
+                field.to_internal_value(value)
+            self.assertEqual(ctx.exception.detail[0].code, 'invalid')
+
+    def test_slug_key(self):
+        field = ReferenceField(City, key='name')
+        self.assertEqual(field.to_internal_value('Астана'), self.city)
+        with self.assertRaises(ValidationError):
+            field.to_internal_value('Алматы')
+        with self.assertRaises(ValidationError):
+            field.to_internal_value(self.city.pk)
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+    def test_process_local_cache_is_reported(self):
+        self.assertEqual([w.id for w in check_shared_cache(None)], ['core.W001'])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost',
+    }})
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
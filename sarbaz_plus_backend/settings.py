@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # поиск: SearchVector, триграммы
     
     # наши приложения
     'accounts.apps.AccountsConfig',
@@ -53,6 +54,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.JWTRefreshMiddleware',  # продление access-токена из кук
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -66,6 +68,8 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:5500",
     "http://127.0.0.1:5500"
 ]
+# Тем же фронтендам — проходить CSRF-проверку (Origin) для запросов с JWT-кукой
+CSRF_TRUSTED_ORIGINS = CORS_ALLOWED_ORIGINS
 
 # -----------------------------
 from corsheaders.defaults import default_headers, default_methods
@@ -79,7 +83,8 @@ CORS_ALLOW_METHODS = list(default_methods)  # GET, POST, OPTIONS и т.д.
 REST_FRAMEWORK = {
     # Стандартная аутентификация — JWT
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT, пользователь — из кэша процесса (см. accounts/authentication.py)
+        'accounts.authentication.CachedJWTAuthentication',
     ],
     # По умолчанию все запросы требуют авторизации,
     # если не прописано AllowAny или другая пермишн-класс
@@ -102,11 +107,28 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     # Включаем чёрный список при отзыве токенов
     'TOKEN_OBTAIN_SERIALIZER': 'rest_framework_simplejwt.serializers.TokenObtainPairSerializer',
-    'TOKEN_REFRESH_SERIALIZER': 'rest_framework_simplejwt.serializers.TokenRefreshSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.BloomTokenRefreshSerializer',
+    'TOKEN_BLACKLIST_SERIALIZER': 'accounts.serializers.BloomTokenBlacklistSerializer',
     'BLACKLIST_AFTER_ROTATION': True,
     'ROTATE_REFRESH_TOKENS': False,
 }
 
+# Кэш пользователей для CachedJWTAuthentication: размер (в записях) и TTL (сек.).
+# При кэше в памяти процесса (LocMem) деактивация пользователя доходит до
+# остальных воркеров только через TTL
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', 10000))
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 60))
+
+# Фильтр Блума по чёрному списку refresh-токенов: ёмкость (в jti), доля ложных
+# срабатываний, интервал (сек.) догрузки новых записей из БД, перекрытие
+# догрузки по blacklisted_at (сек., больше самой долгой транзакции) и
+# интервал (сек.) полной перестройки
+BLACKLIST_BLOOM_CAPACITY = int(os.getenv('BLACKLIST_BLOOM_CAPACITY', 1_000_000))
+BLACKLIST_BLOOM_ERROR_RATE = float(os.getenv('BLACKLIST_BLOOM_ERROR_RATE', 0.001))
+BLACKLIST_BLOOM_SYNC_INTERVAL = float(os.getenv('BLACKLIST_BLOOM_SYNC_INTERVAL', 5))
+BLACKLIST_BLOOM_SYNC_OVERLAP = float(os.getenv('BLACKLIST_BLOOM_SYNC_OVERLAP', 60))
+BLACKLIST_BLOOM_REBUILD_INTERVAL = float(os.getenv('BLACKLIST_BLOOM_REBUILD_INTERVAL', 3600))
+
 
 ROOT_URLCONF = 'sarbaz_plus_backend.urls'
 
@@ -144,6 +166,20 @@ DATABASES = {
 }
 
 
+# Кэш (справочники, версии моделей).
+# По умолчанию — в памяти процесса; при нескольких воркерах укажите общий
+# бэкенд (Redis/Memcached), иначе сброс версии виден только своему процессу.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'sarbaz-plus'),
+    }
+}
+
+# Сколько секунд хранить готовые ответы справочников
+REFERENCE_CACHE_TIMEOUT = int(os.getenv('REFERENCE_CACHE_TIMEOUT', 300))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -180,6 +216,26 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Загруженные файлы (вложения заявок)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', str(BASE_DIR / 'media'))
+
+# Куски докачиваемых загрузок до finalize (лучше на том же диске, что MEDIA_ROOT:
+# тогда готовый файл переносится переименованием, без копирования)
+UPLOAD_SESSION_DIR = os.getenv('UPLOAD_SESSION_DIR', os.path.join(MEDIA_ROOT, 'upload_sessions'))
+UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', 100 * 1024 * 1024))
+UPLOAD_CHUNK_MAX_SIZE = int(os.getenv('UPLOAD_CHUNK_MAX_SIZE', 8 * 1024 * 1024))
+
+# Через сколько дней soft-удалённые заявки и вложения уходят в архивные
+# таблицы (manage.py archive_soft_deleted)
+ARCHIVE_RETENTION_DAYS = int(os.getenv('ARCHIVE_RETENTION_DAYS', 90))
+
+# Отдача вложений веб-сервером после проверки прав:
+# 'nginx' (X-Accel-Redirect), 'apache' (X-Sendfile) или '' — сам Django (разработка).
+# Для nginx: location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+SENDFILE_BACKEND = os.getenv('SENDFILE_BACKEND', '')
+SENDFILE_NGINX_PREFIX = os.getenv('SENDFILE_NGINX_PREFIX', '/protected-media/')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -219,5 +275,10 @@ JWT_REFRESH_COOKIE_NAME = os.getenv('JWT_REFRESH_COOKIE_NAME', 'refresh_token')
 JWT_COOKIE_HTTPONLY = os.getenv('JWT_COOKIE_HTTPONLY') == 'True'
 JWT_COOKIE_SECURE = os.getenv('JWT_COOKIE_SECURE') == 'True'
 JWT_COOKIE_SAMESITE = os.getenv('JWT_COOKIE_SAMESITE', 'Lax')
+# JWTRefreshMiddleware продлевает access-токен, если до истечения меньше этого
+JWT_REFRESH_THRESHOLD = timedelta(seconds=int(os.getenv('JWT_REFRESH_THRESHOLD', 300)))
+
+# Для filebased-бэкенда (send_queued_mail --backend django.core.mail.backends.filebased.EmailBackend)
+EMAIL_FILE_PATH = os.getenv('EMAIL_FILE_PATH', str(BASE_DIR / 'sent_emails'))
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'   # для теста чтобы код не уходил на реальную почту
\ No newline at end of file
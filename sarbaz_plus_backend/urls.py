@@ -24,6 +24,7 @@ router.register(r'service-types', app_views.ServiceTypeViewSet, basename='servic
 router.register(r'advantages', app_views.AdvantageViewSet)
 router.register(r'service-type-advantages', app_views.ServiceTypeAdvantageViewSet)
 router.register(r'statuses', app_views.ApplicationStatusViewSet)
+router.register(r'status-transitions', app_views.ApplicationStatusTransitionViewSet)
 router.register(r'education-levels', app_views.EducationLevelViewSet)
 router.register(r'specializations', app_views.SpecializationViewSet)
 router.register(r'military-branches', app_views.MilitaryBranchViewSet)
@@ -33,6 +34,10 @@ router.register(r'health-statuses', app_views.HealthStatusChoiceViewSet)
 # User API
 router.register(r'applications', app_views.ApplicationViewSet, basename='application')
 
+# Вложения: докачиваемая загрузка и скачивание
+router.register(r'uploads', app_views.UploadSessionViewSet, basename='upload')
+router.register(r'attachments', app_views.AttachmentViewSet, basename='attachment')
+
 # Admin API (под префиксом /admin/applications/)
 router.register(r'admin/applications', app_views.AdminApplicationViewSet, basename='admin-applications')
 
@@ -43,6 +48,9 @@ urlpatterns = [
     # аутентификация
     path('api/auth/', include('accounts.urls')),
 
+    # Все справочники формы одним запросом
+    path('api/dictionaries/', app_views.DictionaryBundleView.as_view(), name='dictionary-bundle'),
+
     # CRUD-заявки
     path('api/', include(router.urls)),
 